@@ -0,0 +1,92 @@
+# Compare the grid compositors: PIL (paste, then convert to tensor) vs tensor (slice assignment)
+#
+# usage, from the repo root:
+#   python -m benchmark.grid_compositing [--rows 8] [--cols 8] [--size 512] [--repeat 3]
+
+import argparse
+import time
+import tracemalloc
+import numpy as np
+import torch  # type: ignore
+from PIL import Image
+
+from src.python.shared.cell_store import MemoryCellStore
+from src.python.shared.grid import Grid
+from src.python.shared.plot_data import PlotConfigGridData, PlotConfigHFData, PlotVars
+from src.python.shared.utils import pillow_to_tensor
+
+
+def make_cells(rows: int, cols: int, size: int) -> MemoryCellStore:
+    rng = np.random.default_rng(0)
+    cells = MemoryCellStore()
+    for r in range(rows):
+        for c in range(cols):
+            cells.put(
+                r,
+                c,
+                Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8)),
+            )
+    return cells
+
+
+def render_pil(grid: Grid, cells, headers, plot_vars) -> torch.Tensor:
+    return pillow_to_tensor(grid.make(cells, *headers, plot_vars))
+
+
+def render_tensor(grid: Grid, cells, headers, plot_vars) -> torch.Tensor:
+    return torch.from_numpy(grid.make_array(cells, *headers, plot_vars)).unsqueeze(0)
+
+
+def measure(fn, repeat: int, *args) -> tuple[float, float, torch.Tensor]:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+        del result
+    # peak memory allocated during one run (numpy and PIL allocations are traced)
+    tracemalloc.start()
+    result = fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return (best, peak, result)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=8)
+    parser.add_argument('--cols', type=int, default=8)
+    parser.add_argument('--size', type=int, default=512)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    cells = make_cells(args.rows, args.cols, args.size)
+    headers = (
+        ['col {}'.format(c) for c in range(args.cols)],
+        ['row {}'.format(r) for r in range(args.rows)],
+    )
+    plot_vars = PlotVars(1, 1)
+    config_hf = PlotConfigHFData(text_center='page {current_page} / {total_pages}')
+
+    print(
+        'grid: {} x {} cells of {}px, best of {}'.format(
+            args.rows, args.cols, args.size, args.repeat
+        )
+    )
+    results = []
+    for name, fn in [('pil', render_pil), ('tensor', render_tensor)]:
+        grid = Grid(PlotConfigGridData(), config_hf, config_hf)
+        duration, peak, result = measure(
+            fn, args.repeat, grid, cells, headers, plot_vars
+        )
+        results.append(result)
+        print(
+            '{:>8}: {:8.3f}s  peak {:8.1f} MB  output {}'.format(
+                name, duration, peak / 1024 / 1024, tuple(result.shape)
+            )
+        )
+    print('identical output: {}'.format(torch.equal(*results)))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,21 +6,115 @@ function isQueueMessage(message) {
         typeof msg.index[0] === 'number' &&
         Array.isArray(msg.total) &&
         msg.total.length === 1 &&
-        typeof msg.total[0] === 'number');
+        typeof msg.total[0] === 'number' &&
+        (msg.prefetch === undefined ||
+            (Array.isArray(msg.prefetch) &&
+                msg.prefetch.length === 1 &&
+                typeof msg.prefetch[0] === 'number')) &&
+        (msg.waiting === undefined ||
+            (Array.isArray(msg.waiting) &&
+                msg.waiting.length === 1 &&
+                typeof msg.waiting[0] === 'number')));
 }
 function queueMessageToData(message) {
     return {
         index: message.index[0],
         total: message.total[0],
+        prefetch: Math.max(1, message.prefetch?.[0] ?? 1),
+        waiting: message.waiting?.[0],
     };
 }
+let captured = undefined;
+let queueHooked = false;
+let queueLock = Promise.resolve();
+function queueTracked(app) {
+    if (!queueHooked) {
+        queueHooked = true;
+        const originalQueuePrompt = api.queuePrompt;
+        api.queuePrompt = async function (...args) {
+            const response = await originalQueuePrompt.apply(this, args);
+            captured?.push(response.prompt_id);
+            return response;
+        };
+    }
+    const ids = queueLock.then(async () => {
+        captured = [];
+        try {
+            await app.queuePrompt(0, 1);
+            return captured;
+        }
+        finally {
+            captured = undefined;
+        }
+    });
+    queueLock = ids.then(() => { }, () => { });
+    return ids;
+}
 export function QUEUE_STATUS(node, inputName, _inputData, app) {
     if (!app)
         throw new Error('QUEUE_STATUS: app is undefined');
     const widget = node.addWidget('button', inputName, 0, () => { });
+    let queued = undefined;
+    let run = 0;
+    const ahead = new Set();
+    const stale = new Set();
+    let stopping = false;
+    let executingPrompt = undefined;
+    api.addEventListener('execution_start', ({ detail }) => {
+        executingPrompt = detail.prompt_id;
+    });
     const reset = () => {
         widget.value = Math.floor(Math.random() * 10e9) * -1;
         widget.total = undefined;
+        queued = undefined;
+        run += 1;
+    };
+    let queuing = Promise.resolve();
+    const queueUntil = (last) => {
+        queuing = queuing.then(async () => {
+            while (queued !== undefined && queued < last) {
+                queued += 1;
+                widget.value = queued;
+                for (const id of await queueTracked(app))
+                    ahead.add(id);
+            }
+        });
+    };
+    const queueLater = (index, delay) => {
+        const current = run;
+        setTimeout(() => {
+            if (run !== current || queued === undefined)
+                return;
+            queuing = queuing.then(async () => {
+                if (run !== current)
+                    return;
+                widget.value = index;
+                for (const id of await queueTracked(app))
+                    ahead.add(id);
+            });
+        }, delay * 1000);
+    };
+    const stop = async (label) => {
+        widget.label = label;
+        const running = queued !== undefined;
+        reset();
+        if (!running)
+            return;
+        stopping = true;
+        try {
+            await queuing;
+            for (const id of ahead)
+                stale.add(id);
+            ahead.clear();
+            const { Pending } = await api.getQueue();
+            for (const item of Pending) {
+                if (stale.delete(item.prompt[1]))
+                    await api.deleteItem('queue', item.prompt[1]);
+            }
+        }
+        finally {
+            stopping = false;
+        }
     };
     reset();
     widget.label = 'Ready';
@@ -34,15 +128,22 @@ export function QUEUE_STATUS(node, inputName, _inputData, app) {
         originalOnExecuted?.apply(this, message);
         if (isQueueMessage(message)) {
             const data = queueMessageToData(message);
-            if (!widget.total)
-                widget.total = data.total;
+            if (stopping || (executingPrompt && stale.delete(executingPrompt)))
+                return;
+            if (executingPrompt)
+                ahead.delete(executingPrompt);
+            widget.total = data.total;
+            queued = Math.max(queued ?? data.index, data.index);
+            if (data.waiting !== undefined) {
+                widget.label = `Waiting for files: ${data.index} processed`;
+                queueLater(data.index, data.waiting);
+                return;
+            }
+            widget.label = `Processing: ${data.index + 1} / ${widget.total}`;
             if (data.index < data.total - 1) {
-                widget.value = data.index + 1;
-                widget.label = `Processing: ${widget.value} / ${widget.total}`;
-                app.queuePrompt(0, 1);
+                queueUntil(Math.min(data.index + data.prefetch, data.total - 1));
             }
             else {
-                widget.label = `Processing: ${widget.value + 1} / ${widget.total}`;
                 api.addEventListener('execution_success', () => {
                     widget.label = `Complete: ${widget.total} / ${widget.total}`;
                     reset();
@@ -53,12 +154,8 @@ export function QUEUE_STATUS(node, inputName, _inputData, app) {
     const original_api_interrupt = api.interrupt;
     api.interrupt = async function (...args) {
         await original_api_interrupt.apply(this, ...args);
-        widget.label = 'Interrupted';
-        reset();
+        await stop('Interrupted');
     };
-    api.addEventListener('execution_error', () => {
-        widget.label = 'Error detected';
-        reset();
-    });
+    api.addEventListener('execution_error', () => stop('Error detected'));
     return widget;
 }
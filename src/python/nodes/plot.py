@@ -1,17 +1,47 @@
 from comfy_execution.graph import ExecutionBlocker  # type: ignore
+from server import PromptServer  # type: ignore
+import folder_paths  # type: ignore
 import torch  # type: ignore
-from math import ceil
+import numpy as np
+from PIL import Image
+import os
+import json
+import time
 
 from ..collection.register_nodes import register_node
-from ..shared.utils import ANY_TYPE
+from ..shared.utils import ANY_TYPE, PREFETCH_INPUT, tensor_to_pillow
 from ..shared.plot_data import (
     DimData,
+    PlanStep,
     XYPlotQueueData,
     PlotConfigHFData,
     PlotConfigGridData,
+    PlotConfigRenderData,
     PlotVars,
 )
 from ..shared.pager import Pager
+from ..shared.pager_registry import (
+    evict_pagers,
+    get_pager,
+    register_pager,
+    release_pager,
+    release_pagers,
+    was_released,
+)
+from ..shared.tiles import register_tiled_page
+from ..shared.render_worker import submit_render
+from ..shared.checkpoint import PlotCheckpoint, make_run_id
+from ..shared.shard_store import ShardStore
+from ..shared.server_events import add_event_listener
+from ..shared.plot_archive import PlotArchive, new_archive_name
+from ..shared.planner import ORDERS, DEFAULT_ORDER, SwitchCostEstimator, make_plan
+from ..shared.plan_estimate import auto_page_dims, estimate_plan
+from ..shared.cell_cache import (
+    CellCache,
+    get_cell_cache,
+    make_cell_key,
+    workflow_fingerprint,
+)
 
 # common tooltips
 TOOLTIP_XY_PLOT_DATA = (
@@ -27,6 +57,72 @@ TOOLTIP_HF_PLACEHOLDERS = (
     'the following placeholders are accepted: {current_page}, {total_pages}'
 )
 TOOLTIP_PLOT_CONFIG_GRID = 'plot configuration for the grid'
+TOOLTIP_PLOT_CONFIG_RENDER = 'plot configuration for the rendering process'
+
+
+def tiles_url(page_id: str) -> str:
+    return '/comfylab/tiles/{}.dzi'.format(page_id)
+
+
+# resume mode: checkpoints are kept in the user directory, so they survive restarts
+# in multi-worker mode, each worker has its own progress
+def get_checkpoint(run_id: str, worker: tuple[int, int] = None) -> PlotCheckpoint:
+    return PlotCheckpoint(
+        os.path.join(folder_paths.get_user_directory(), 'comfylab', 'xy_plot_runs'),
+        run_id if worker is None else '{}_w{}'.format(run_id, worker[0]),
+    )
+
+
+# multi-worker mode: cells are gathered in the user directory, which must be shared by the workers
+def get_shard_store(run_id: str, session: str = None) -> ShardStore:
+    return ShardStore(
+        os.path.join(folder_paths.get_user_directory(), 'comfylab', 'xy_plot_shards'),
+        run_id,
+        session,
+    )
+
+
+# the frontend restarts the plots of a client after an interruption or an error (from scratch, or from their
+# saved progress in resume mode): their pages in progress are released right away
+def on_execution_event(event: str, data: dict, sid: str = None):
+    if event in ('execution_interrupted', 'execution_error'):
+        release_pagers(sid)
+    elif event == 'execution_start':
+        evict_pagers()
+
+
+add_event_listener(on_execution_event)
+
+
+# completed runs kept by XY Plot: Render for XY Plot: Re-render, in the user directory
+def get_plot_archive() -> PlotArchive:
+    return PlotArchive(
+        os.path.join(folder_paths.get_user_directory(), 'comfylab', 'xy_plot_archive')
+    )
+
+
+# archive name of the runs in progress, by (render node id, run id)
+archive_names = {}
+
+
+# same naming scheme as the standard Save Image node
+def get_output_path(filename_prefix: str) -> str:
+    full_output_folder, filename, counter, _, _ = folder_paths.get_save_image_path(
+        filename_prefix, folder_paths.get_output_directory()
+    )
+    return os.path.join(full_output_folder, '{}_{:05}_.png'.format(filename, counter))
+
+
+# size of the images received by XY Plot: Render, by queue node id: used to shape the pages of the next runs
+observed_cell_sizes = {}
+
+
+# cell cache: also kept in the user directory, shared by all plots
+def get_plot_cell_cache(plot_config_render: PlotConfigRenderData) -> CellCache:
+    return get_cell_cache(
+        os.path.join(folder_paths.get_user_directory(), 'comfylab', 'xy_plot_cache'),
+        plot_config_render.cell_cache_mb * 1024 * 1024,
+    )
 
 
 @register_node('XY Plot: Queue', 'plot')
@@ -69,18 +165,137 @@ class XYPlotQueue:
                         'tooltip': 'optional: if > 0, max number of dim2 values per page',
                     },
                 ),
+                'batch_size': (
+                    'INT',
+                    {
+                        'default': 1,
+                        'min': 1,
+                        'tooltip': "optional: if > 1, number of consecutive dim2 values processed by each prompt, sent as list to 'dim2_batch' output\nXY Plot: Render then expects a batch of images, one per dim2 value",
+                    },
+                ),
+                'resume': (
+                    'BOOLEAN',
+                    {
+                        'default': False,
+                        'tooltip': 'optional: save the progress, so an interrupted plot restarts from the first missing image instead of the beginning\nthe plot is identified by the lists and page settings, XY Plot: Render settings must not change',
+                    },
+                ),
+                'traversal': (
+                    list(ORDERS.keys()) + ['auto'],
+                    {
+                        'default': DEFAULT_ORDER,
+                        'tooltip': "optional: order in which the values are processed\n'dim1 outer': for each dim1 value, all dim2 values (default)\n'dim2 outer': for each dim2 value, all dim1 values\n'snake': the inner loop alternates its direction, so consecutive lines share their boundary value (one switch less)\n'auto': the order minimizing the switch costs, pages being always processed one at a time",
+                    },
+                ),
+                'dim1_switch_cost': (
+                    'FLOAT',
+                    {
+                        'default': 0,
+                        'min': 0,
+                        'step': 0.1,
+                        'tooltip': "optional: 'auto' traversal, time (in seconds) taken by a dim1 value change, e.g. loading a checkpoint\n0: estimated from the measured duration of the previous prompts",
+                    },
+                ),
+                'dim2_switch_cost': (
+                    'FLOAT',
+                    {
+                        'default': 0,
+                        'min': 0,
+                        'step': 0.1,
+                        'tooltip': "optional: 'auto' traversal, time (in seconds) taken by a dim2 value change\n0: estimated from the measured duration of the previous prompts",
+                    },
+                ),
+                'dry_run': (
+                    'BOOLEAN',
+                    {
+                        'default': False,
+                        'tooltip': "optional: do not process anything, only send the plan to 'plan' output: schedule, page sizes, estimated peak RAM and duration",
+                    },
+                ),
+                'cell_width': (
+                    'INT',
+                    {
+                        'default': 1024,
+                        'min': 1,
+                        'tooltip': 'optional: expected width of the generated images, for estimates',
+                    },
+                ),
+                'cell_height': (
+                    'INT',
+                    {
+                        'default': 1024,
+                        'min': 1,
+                        'tooltip': 'optional: expected height of the generated images, for estimates',
+                    },
+                ),
+                'plot_config_grid': (
+                    'PLOT_CONFIG_GRID',
+                    {
+                        'tooltip': 'optional: same grid configuration as XY Plot: Render, for estimates'
+                    },
+                ),
+                'plot_config_render': (
+                    'PLOT_CONFIG_RENDER',
+                    {
+                        'tooltip': 'optional: same rendering configuration as XY Plot: Render, for estimates'
+                    },
+                ),
+                'max_page_megapixels': (
+                    'FLOAT',
+                    {
+                        'default': 0,
+                        'min': 0,
+                        'step': 0.1,
+                        'tooltip': "optional: if > 0, pages are shaped to fit this size (in megapixels), in place of 'max per page' values (which remain upper limits)\nbased on the size of the images received by XY Plot: Render in the previous run, or else the declared cell width / height",
+                    },
+                ),
+                'max_page_mb': (
+                    'INT',
+                    {
+                        'default': 0,
+                        'min': 0,
+                        'tooltip': "optional: if > 0, pages are shaped to fit this estimated peak memory (in MB), in place of 'max per page' values (which remain upper limits)\nbased on the size of the images received by XY Plot: Render in the previous run, or else the declared cell width / height",
+                    },
+                ),
+                'worker_id': (
+                    'INT',
+                    {
+                        'default': 0,
+                        'min': 0,
+                        'tooltip': 'optional: multi-worker mode, id of this ComfyUI instance (from 0 to worker count - 1)',
+                    },
+                ),
+                'worker_count': (
+                    'INT',
+                    {
+                        'default': 1,
+                        'min': 1,
+                        'tooltip': 'optional: if > 1, the plot is shared by several ComfyUI instances of the same host, running the same workflow with their own worker id\neach one processes its part of the cells, and the instance completing a page renders it (instances must share the same user directory)',
+                    },
+                ),
+                'prefetch': PREFETCH_INPUT,
             },
+            'hidden': {'unique_id': 'UNIQUE_ID'},
         }
 
     FUNCTION = 'run'
-    RETURN_TYPES = ('XY_PLOT_DATA', ANY_TYPE, ANY_TYPE)
-    RETURN_NAMES = ('xy_plot_data', 'dim1_value', 'dim2_value')
+    RETURN_TYPES = ('XY_PLOT_DATA', ANY_TYPE, ANY_TYPE, 'LIST', 'STRING')
+    RETURN_NAMES = ('xy_plot_data', 'dim1_value', 'dim2_value', 'dim2_batch', 'plan')
     OUTPUT_TOOLTIPS = (
         TOOLTIP_XY_PLOT_DATA,
         'dim1 value (not typed)',
-        'dim2 value (not typed)',
+        'dim2 value (not typed), first value of the batch in batch mode',
+        'dim2 values of the current batch (batch mode)',
+        'dry run: plan of the XY plot, as JSON (dim1 as rows, default header formats)',
     )
-    DESCRIPTION = 'Loop through all values of dim1, optionally combined with dim2 values, and send them to outputs.\nIMPORTANT: for a given dim1 value, all dim2 values are first iterated, before going to the next dim1 value.\nSo it is advised to associate slow operations (e.g. loading checkpoints) to dim1, to ensure better performance.'
+    DESCRIPTION = "Loop through all values of dim1, optionally combined with dim2 values, and send them to outputs.\nIMPORTANT: by default, for a given dim1 value, all dim2 values are first iterated, before going to the next dim1 value.\nSo it is advised to associate slow operations (e.g. loading checkpoints) to dim1, to ensure better performance, or to let the 'auto' traversal choose the order."
+
+    # schedule of the current run, and measured step durations to estimate switch costs
+    plan = None
+    plan_settings = None
+    estimator = None
+    last_step = None  # (queue index, step, start time)
+    shard_session = None
 
     def run(
         self,
@@ -89,93 +304,243 @@ class XYPlotQueue:
         max_dim2_per_page: int,
         index: int,
         dim2: list[str] = [''],
+        batch_size: int = 1,
+        resume: bool = False,
+        traversal: str = DEFAULT_ORDER,
+        dim1_switch_cost: float = 0,
+        dim2_switch_cost: float = 0,
+        dry_run: bool = False,
+        cell_width: int = 1024,
+        cell_height: int = 1024,
+        plot_config_grid: PlotConfigGridData = PlotConfigGridData(),
+        plot_config_render: PlotConfigRenderData = PlotConfigRenderData(),
+        max_page_megapixels: float = 0,
+        max_page_mb: int = 0,
+        worker_id: int = 0,
+        worker_count: int = 1,
+        prefetch: int = 1,
+        unique_id: str = None,
     ):
-        if index < 0:  # value has been reset (completion, interrupt, errors)
-            index = 0
-
         if len(dim2) == 0:
             dim2 = ['']
+        if worker_id >= worker_count:
+            raise Exception(
+                'XY Plot: worker id must be lower than the worker count ({})'.format(
+                    worker_count
+                )
+            )
+        worker = (worker_id, worker_count) if worker_count > 1 else None
 
-        # to simplify code below
-        size = (len(dim1), len(dim2))
-        dim1_limited = max_dim1_per_page > 0 and max_dim1_per_page < size[0]
-        dim2_limited = max_dim2_per_page > 0 and max_dim2_per_page < size[1]
-
-        # calculate total
-        total = size[0] * size[1]
-
-        # check if we have finished
-        complete = index == total - 1
-
-        # max page dimensions, but not necessarily the current page ones: the last one may be smaller
-        max_page_dims = (
-            max_dim1_per_page if dim1_limited else size[0],
-            max_dim2_per_page if dim2_limited else size[1],
+        # pages shaped by a budget, or by the max nb of values per page
+        page_settings = (
+            (max_dim1_per_page, max_dim2_per_page),
+            (max_page_megapixels, max_page_mb),
+            (cell_width, cell_height),
+            plot_config_grid,
+            plot_config_render,
         )
 
-        # page index and total nb of pages
-        total_pages = (
-            ceil(size[0] / max_page_dims[0]),
-            ceil(size[1] / max_page_dims[1]),
-        )
-        # compute the index and dimension of the current page for dim1 first
-        current_page_index_dim1 = int(index / (size[1] * max_page_dims[0]))
-        current_page_dims_dim1 = min(
-            max_page_dims[0], size[0] - current_page_index_dim1 * max_page_dims[0]
-        )
+        if dry_run:
+            # nothing is sent to the other outputs, and there is no queue status to trigger the next prompt
+            plan = make_plan(
+                (len(dim1), len(dim2)),
+                self.get_max_per_page(unique_id, dim1, dim2, *page_settings),
+                batch_size,
+                traversal,
+                self.get_switch_costs(dim1_switch_cost, dim2_switch_cost),
+            )
+            estimate = estimate_plan(
+                plan,
+                (
+                    ['{}'.format(value) for value in dim1],
+                    ['{}'.format(value) for value in dim2],
+                ),
+                (cell_width, cell_height),
+                plot_config_grid=plot_config_grid,
+                plot_config_render=plot_config_render,
+                cell_time=self.estimator.cell_time() if self.estimator else 0,
+            )
+            blocked = (ExecutionBlocker(None),) * 4
+            return (*blocked, json.dumps(estimate, indent=2))
 
-        # compute the index and dimension of the current page for dim2
-        current_page = (
-            current_page_index_dim1,
-            int(
-                (index - current_page_index_dim1 * size[1] * max_page_dims[0])
-                / (current_page_dims_dim1 * max_page_dims[1])
+        order = traversal
+        max_per_page = None
+        run_id = None
+        if resume or worker:
+            run_id = make_run_id(
+                dim1,
+                dim2,
+                max_dim1_per_page,
+                max_dim2_per_page,
+                batch_size,
+                max_page_megapixels,
+                max_page_mb,
+                *([worker_count] if worker else []),
             )
-            % size[1],
-        )
-        current_page_dims = (
-            current_page_dims_dim1,
-            min(max_page_dims[1], size[1] - current_page[1] * max_page_dims[1]),
-        )
+            if resume and index < 0:
+                # restart from the first prompt not processed by a previous execution, with the same plan
+                state = get_checkpoint(run_id, worker).load_state()
+                if state:
+                    index = state['next_index']
+                    order = state.get('order') or order
+                    if state.get('max_per_page'):
+                        max_per_page = tuple(state['max_per_page'])
 
-        # sequential index and dim1/dim2 indexes in current page
-        index_in_page_seq = (
-            index
-            - current_page[0] * size[1] * max_page_dims[0]
-            - current_page[1] * current_page_dims[0] * max_page_dims[1]
-        )
-        index_in_page = (
-            int(index_in_page_seq / current_page_dims[1]),
-            int(index_in_page_seq % current_page_dims[1]),
-        )
+        if index < 0:  # value has been reset (completion, interrupt, errors)
+            index = 0
+        # first prompt of the run (also when queued with index 0 by the backend auto queue)
+        restart = index == 0
 
-        # get value from each list, given the paged index
-        values = (
-            dim1[
-                int(index_in_page_seq / current_page_dims[1])
-                + current_page[0] * max_page_dims[0]
-            ],
-            dim2[
-                int(index_in_page_seq % current_page_dims[1])
-                + current_page[1] * max_page_dims[1]
-            ],
-        )
+        # the schedule is only planned when a run starts: it must not change while running
+        size = (len(dim1), len(dim2))
+        settings = (size, page_settings, batch_size, order, worker)
+        if self.plan is None or restart or settings != self.plan_settings:
+            if max_per_page is None:
+                max_per_page = self.get_max_per_page(
+                    unique_id, dim1, dim2, *page_settings
+                )
+            switch_costs = self.get_switch_costs(dim1_switch_cost, dim2_switch_cost)
+            self.plan = make_plan(size, max_per_page, batch_size, order, switch_costs)
+            if worker:
+                # all workers must split the same schedule: the first one to start the session decides
+                shards = get_shard_store(run_id)
+                self.shard_session = shards.join(worker[0], restart)
+                agreed = shards.agree_plan(
+                    {
+                        'order': self.plan.order,
+                        'max_per_page': list(max_per_page),
+                        'switch_costs': list(switch_costs),
+                    }
+                )
+                self.plan = make_plan(
+                    size,
+                    tuple(agreed['max_per_page']),
+                    batch_size,
+                    agreed['order'],
+                    tuple(agreed['switch_costs']),
+                )
+            self.plan_settings = settings
+            self.last_step = None
+        plan = self.plan
+        share = self.get_share(plan.total, worker)
+        if len(share) == 0:
+            # more workers than prompts: nothing to do
+            return (ExecutionBlocker(None),) * 5
+        step = plan.steps[share[index]]
+        self.measure_step(share[index], step)
+
+        # check if we have finished
+        complete = index == len(share) - 1
+
+        # get values from each list
+        values = (dim1[step.dim1], dim2[step.dim2 : step.dim2 + step.length])
 
-        # build data sent to XYPlotRender
+        # build data sent to XYPlotRender: indexes in the current page
+        offsets = plan.page_offsets(step.page)
+        page_dims = plan.page_dims(step.page)
         xy_plot_data = XYPlotQueueData(
-            index_in_page_seq,
-            current_page[0] * total_pages[1] + current_page[1],
-            total_pages[0] * total_pages[1],
+            step.index,
+            plan.page_index(step.page),
+            plan.page_count,
             complete,
-            DimData(index_in_page[0], current_page_dims[0], values[0]),
-            DimData(index_in_page[1], current_page_dims[1], values[1]),
+            DimData(
+                step.dim1 - offsets[0],
+                page_dims[0],
+                values[0],
+                dim1[offsets[0] : offsets[0] + page_dims[0]],
+            ),
+            DimData(
+                step.dim2 - offsets[1],
+                page_dims[1],
+                values[1][0],
+                dim2[offsets[1] : offsets[1] + page_dims[1]],
+            ),
+            values[1] if batch_size > 1 else None,
+            run_id,
+            index,
+            plan.order,
+            plan.max_page_dims,
+            resume,
+            worker,
+            self.shard_session if worker else None,
         )
 
         return {
-            'result': (xy_plot_data, values[0], values[1]),
-            'ui': {'index': [index], 'total': [total]},
+            'result': (
+                xy_plot_data,
+                values[0],
+                values[1][0],
+                values[1],
+                ExecutionBlocker(None),
+            ),
+            'ui': {'index': [index], 'total': [len(share)], 'prefetch': [prefetch]},
         }
 
+    # prompts processed by the queue: in multi-worker mode, each worker processes a contiguous part
+    # of the schedule, so it keeps the benefits of the traversal order
+    @staticmethod
+    def get_share(total: int, worker: tuple[int, int]) -> range:
+        if worker is None:
+            return range(total)
+        return range(
+            total * worker[0] // worker[1], total * (worker[0] + 1) // worker[1]
+        )
+
+    # max nb of dim1 / dim2 values per page, derived from the page budget if any
+    def get_max_per_page(
+        self,
+        unique_id: str,
+        dim1: list,
+        dim2: list,
+        max_per_page: tuple[int, int],
+        budget: tuple[float, int],
+        declared_cell_size: tuple[int, int],
+        plot_config_grid: PlotConfigGridData,
+        plot_config_render: PlotConfigRenderData,
+    ) -> tuple[int, int]:
+        if budget[0] <= 0 and budget[1] <= 0:
+            return max_per_page
+        return auto_page_dims(
+            (len(dim1), len(dim2)),
+            max_per_page,
+            *budget,
+            (
+                ['{}'.format(value) for value in dim1],
+                ['{}'.format(value) for value in dim2],
+            ),
+            observed_cell_sizes.get(unique_id, declared_cell_size),
+            plot_config_grid,
+            plot_config_render,
+        )
+
+    # switch costs set by the user, or else learned from previous steps
+    def get_switch_costs(
+        self, dim1_switch_cost: float, dim2_switch_cost: float
+    ) -> tuple[float, float]:
+        learned = self.estimator.estimate() if self.estimator else (0, 0)
+        return (dim1_switch_cost or learned[0], dim2_switch_cost or learned[1])
+
+    # duration of a step: time between the start of consecutive prompts
+    def measure_step(self, index: int, step: PlanStep):
+        now = time.perf_counter()
+        if self.last_step and self.last_step[0] == index - 1:
+            previous_index, previous_step, start = self.last_step
+            if self.estimator is None:
+                self.estimator = SwitchCostEstimator()
+            self.estimator.record(
+                self.step_switches(previous_index, previous_step),
+                now - start,
+                previous_step.length,
+            )
+        self.last_step = (index, step, now)
+
+    # dims whose value changed with the step
+    def step_switches(self, index: int, step: PlanStep) -> tuple[bool, bool]:
+        if index == 0:
+            return (True, True)
+        previous = self.plan.steps[index - 1]
+        return (previous.dim1 != step.dim1, previous.dim2 != step.dim2)
+
 
 @register_node('XY Plot: Render', 'plot')
 class XYPlotRender:
@@ -187,7 +552,8 @@ class XYPlotRender:
         return {
             'required': {
                 'xy_plot_data': ('XY_PLOT_DATA', {'tooltip': TOOLTIP_XY_PLOT_DATA}),
-                'image': ('IMAGE',),
+                # lazy: not generated if the cells are found in the cell cache
+                'image': ('IMAGE', {'lazy': True}),
                 'dim1_header_format': (
                     'STRING',
                     {
@@ -225,21 +591,47 @@ class XYPlotRender:
                     'PLOT_CONFIG_HF',
                     {'tooltip': 'optional: plot configuration for the page footer'},
                 ),
+                'plot_config_render': (
+                    'PLOT_CONFIG_RENDER',
+                    {'tooltip': 'optional: ' + TOOLTIP_PLOT_CONFIG_RENDER},
+                ),
             },
+            'hidden': {'unique_id': 'UNIQUE_ID', 'prompt': 'PROMPT'},
         }
 
     FUNCTION = 'run'
-    RETURN_TYPES = ('IMAGE', 'IMAGE')
-    RETURN_NAMES = ('grid', 'image')
+    RETURN_TYPES = ('IMAGE', 'IMAGE', 'STRING')
+    RETURN_NAMES = ('grid', 'image', 'grid_path')
     OUTPUT_TOOLTIPS = (
-        'grid page',
+        "grid page (or its preview, if saved as PNG file by 'Plot Config: Render')",
         'individual image, as received in input',
+        "path of the grid page, if saved as PNG file by 'Plot Config: Render'",
     )
     DESCRIPTION = 'Render the generated images as grids.\nOptional configuration is available to customize the look of the grid, and page header / footer.'
 
-    # Pager object, to hold each individual images and build the grid
+    # Pager object of the page being processed, to hold each individual images and build the grid
+    # (between executions, pages in progress are held by the pager registry)
     pager = None
 
+    # the image is only needed if one of the cells is not in the cell cache
+    def check_lazy_status(
+        self,
+        xy_plot_data: XYPlotQueueData,
+        image: torch.Tensor = None,
+        plot_config_render=PlotConfigRenderData(),
+        prompt: dict = None,
+        unique_id: str = None,
+        **kwargs,
+    ):
+        if image is not None:
+            return []
+        keys = self.get_cell_keys(xy_plot_data, plot_config_render, prompt, unique_id)
+        if keys:
+            cache = get_plot_cell_cache(plot_config_render)
+            if all(key in cache for key in keys):
+                return []
+        return ['image']
+
     def run(
         self,
         xy_plot_data: XYPlotQueueData,
@@ -250,31 +642,511 @@ class XYPlotRender:
         plot_config_grid=PlotConfigGridData(),
         plot_config_header=None,
         plot_config_footer=None,
+        plot_config_render=PlotConfigRenderData(),
+        unique_id=None,
+        prompt=None,
     ):
-        if xy_plot_data.index == 0:
+        keys = self.get_cell_keys(xy_plot_data, plot_config_render, prompt, unique_id)
+        if keys:
+            cache = get_plot_cell_cache(plot_config_render)
+            if image is None:
+                image = self.load_cells(cache, keys)
+            else:
+                for key, frame in zip(keys, image):
+                    cache.put(key, np.asarray(tensor_to_pillow(frame)))
+        if prompt and unique_id in prompt and isinstance(image, torch.Tensor):
+            queue_node_id = prompt[unique_id]['inputs']['xy_plot_data'][0]
+            observed_cell_sizes[queue_node_id] = (image.shape[2], image.shape[1])
+
+        checkpoint = None
+        if xy_plot_data.resume:
+            checkpoint = get_checkpoint(xy_plot_data.run_id, xy_plot_data.worker)
+        configs = (plot_config_grid, plot_config_header, plot_config_footer)
+        key = (unique_id, xy_plot_data.run_id)
+        if plot_config_render.keep_runs and xy_plot_data.queue_index == 0:
+            # the run starts: its pages are archived under a new name, or its run id (shared by the workers)
+            archive_names[key] = xy_plot_data.run_id or new_archive_name()
+            get_plot_archive().reopen_run(archive_names[key])
+
+        if xy_plot_data.worker:
+            result = self.add_shard_cells(
+                xy_plot_data,
+                image,
+                (dim1_header_format, dim2_header_format),
+                direction,
+                unique_id,
+                plot_config_render,
+                *configs,
+            )
+            if checkpoint:
+                self.save_progress(checkpoint, xy_plot_data)
+            return result
+
+        # pages in progress are held by the registry, by node and run: several plots do not clobber each other,
+        # and the pages of abandoned plots are released
+        self.pager = get_pager(key)
+
+        # new run or new page: cells may arrive in any order, and retried prompts just replace their cells,
+        # so the current pager is kept as long as the page is the same
+        if (
+            self.pager is None
+            or self.pager.page != (xy_plot_data.run_id, xy_plot_data.current_page)
+            or xy_plot_data.queue_index == 0
+        ):
+            if (
+                self.pager is None
+                and checkpoint is None
+                and xy_plot_data.index > 0
+                and was_released(key)
+            ):
+                raise Exception(
+                    'XY Plot: the images of the current page have been released (interruption, RAM budget or idle timeout), please restart the plot, or enable resume mode'
+                )
             self.pager = Pager(
-                xy_plot_data, (dim1_header_format, dim2_header_format), direction
+                xy_plot_data,
+                (dim1_header_format, dim2_header_format),
+                direction,
+                plot_config_grid,
+                plot_config_render,
+                checkpoint,
             )
+            # also releases images / scratch files from the previous page
+            register_pager(key, self.pager, PromptServer.instance.client_id)
+            if checkpoint and xy_plot_data.index == 0:
+                checkpoint.clear_cells()
+            elif checkpoint:
+                # resumed run: the pager does not hold the previous cells of the page
+                self.pager.restore_checkpoint(xy_plot_data)
 
         # add image to pager
         self.pager.add(xy_plot_data, image)
+        evict_pagers(key)
+        if isinstance(image, list):
+            # cached images of different sizes: cannot be sent as a batch
+            image = ExecutionBlocker(None)
 
         # check if page is complete
         if not self.pager.complete:
-            # block downstream nodes for grid output, just send the individual image
-            return {'result': (ExecutionBlocker(None), image)}
-        else:
-            grid = self.pager.make_grid(
-                PlotVars(xy_plot_data.current_page + 1, xy_plot_data.total_pages),
-                plot_config_grid,
-                plot_config_header,
-                plot_config_footer,
+            if checkpoint:
+                self.save_progress(checkpoint, xy_plot_data)
+            # block downstream nodes for grid outputs, just send the individual image
+            result = {'result': (ExecutionBlocker(None), image, ExecutionBlocker(None))}
+            if self.pager.preview_due():
+                result['ui'] = {
+                    'images': [self.save_preview(self.pager.make_preview())]
+                }
+            self.pager = None
+            return result
+
+        result = self.render_grid(
+            xy_plot_data, image, unique_id, plot_config_render, *configs
+        )
+        # resume mode: the page is only done once its grid is rendered
+        if checkpoint:
+            self.save_progress(checkpoint, xy_plot_data)
+        # the page is done: release it, unless handed over to a background job or to the tiled page
+        release_pager(key, close=self.pager is not None)
+        self.pager = None
+        return result
+
+    # multi-worker mode: cells are put in the shared store, and the worker completing a page renders it
+    def add_shard_cells(
+        self,
+        xy_plot_data: XYPlotQueueData,
+        image: torch.Tensor,
+        header_formats: tuple[str, str],
+        direction: bool,
+        unique_id: str,
+        plot_config_render: PlotConfigRenderData,
+        plot_config_grid: PlotConfigGridData,
+        *configs,
+    ):
+        shards = get_shard_store(xy_plot_data.run_id, xy_plot_data.shard_session)
+        page = xy_plot_data.current_page
+        batch = Pager.batch_values(xy_plot_data, image)
+        for i in range(len(batch)):
+            shards.put_cell(
+                page,
+                xy_plot_data.dim1.index,
+                xy_plot_data.dim2.index + i,
+                tensor_to_pillow(image[i]),
             )
-            # complete, send grid + individual image
-            return (
-                grid,
+        if isinstance(image, list):
+            # cached images of different sizes: cannot be sent as a batch
+            image = ExecutionBlocker(None)
+
+        cell_count = xy_plot_data.dim1.length * xy_plot_data.dim2.length
+        if not shards.claim_page(page, cell_count, xy_plot_data.worker[0]):
+            return {'result': (ExecutionBlocker(None), image, ExecutionBlocker(None))}
+
+        # headers are known from the dim values of the page
+        self.pager = Pager(
+            xy_plot_data,
+            header_formats,
+            direction,
+            plot_config_grid,
+            plot_config_render,
+        )
+        try:
+            for dim1_index, dim2_index in shards.cells(page):
+                self.pager.add_image(
+                    dim1_index,
+                    dim2_index,
+                    shards.load_cell(page, dim1_index, dim2_index),
+                )
+            result = self.render_grid(
+                xy_plot_data,
                 image,
+                unique_id,
+                plot_config_render,
+                plot_config_grid,
+                *configs,
+            )
+        except Exception:
+            shards.release_page(page)
+            if self.pager:
+                self.pager.close()
+                self.pager = None
+            raise
+        shards.finish_page(page, xy_plot_data.total_pages)
+        # the pager only holds a page while rendering it
+        if self.pager:
+            self.pager.close()
+            self.pager = None
+        return result
+
+    # cell cache: one key per cell processed by the prompt, None if the cache is disabled
+    # the key identifies the workflow producing the image, and the dim values
+    @staticmethod
+    def get_cell_keys(
+        xy_plot_data: XYPlotQueueData,
+        plot_config_render: PlotConfigRenderData,
+        prompt: dict,
+        unique_id: str,
+    ) -> list[str]:
+        if not plot_config_render.cell_cache or not prompt or unique_id not in prompt:
+            return None
+        queue_node_id = prompt[unique_id]['inputs']['xy_plot_data'][0]
+        fingerprint = workflow_fingerprint(prompt, unique_id, 'image', queue_node_id)
+        if not xy_plot_data.dim2_batch:
+            return [
+                make_cell_key(
+                    fingerprint, xy_plot_data.dim1.value, xy_plot_data.dim2.value
+                )
+            ]
+        # batch mode: the generated image may depend on its position in the batch
+        batch = xy_plot_data.dim2_batch
+        return [
+            make_cell_key(fingerprint, xy_plot_data.dim1.value, value, i, len(batch))
+            for i, value in enumerate(batch)
+        ]
+
+    # images from the cell cache, as a batch (or a list, if their sizes differ)
+    @staticmethod
+    def load_cells(cache: CellCache, keys: list[str]):
+        frames = []
+        for key in keys:
+            frame = cache.get(key)
+            if frame is None:
+                raise Exception(
+                    'XY Plot: image not found in the cell cache anymore, please queue the plot again'
+                )
+            frames.append(torch.from_numpy(frame.astype(np.float32) / 255.0))
+        if all(frame.shape == frames[0].shape for frame in frames):
+            return torch.stack(frames)
+        return frames
+
+    def render_grid(
+        self,
+        xy_plot_data: XYPlotQueueData,
+        image: torch.Tensor,
+        unique_id: str,
+        plot_config_render: PlotConfigRenderData,
+        *configs,
+    ):
+        plot_vars = PlotVars(xy_plot_data.current_page + 1, xy_plot_data.total_pages)
+        if plot_config_render.background and plot_config_render.output == 'png file':
+            # hand the complete page over to the render worker, so the next prompt can start right away
+            # the pager now belongs to the job, which notifies the frontend when the file is written
+            path = get_output_path(plot_config_render.filename_prefix)
+            # reserve the file name right away: the counter is based on the existing files
+            open(path, 'xb').close()
+            pager, self.pager = self.pager, None
+            try:
+                submit_render(
+                    self.render_page,
+                    unique_id,
+                    xy_plot_data,
+                    pager,
+                    path,
+                    plot_vars,
+                    plot_config_render,
+                    *configs,
+                )
+            except Exception:
+                pager.close()
+                os.remove(path)
+                raise
+            return {'result': (ExecutionBlocker(None), image, path)}
+
+        if plot_config_render.keep_runs:
+            self.archive_page(
+                xy_plot_data, unique_id, plot_config_render.keep_runs, self.pager
+            )
+        if plot_config_render.output == 'png file':
+            # stream the grid to disk, and only send a preview
+            path = get_output_path(plot_config_render.filename_prefix)
+            grid = self.pager.save_grid(path, plot_vars, *configs)
+        else:
+            path = ''
+            grid = self.pager.make_grid(plot_vars, *configs)
+        # complete, send grid + individual image
+        result = (grid, image, path)
+        if not plot_config_render.tiles:
+            return result
+
+        # keep the page browsable as deep zoom tiles: the cells are handed over to the tiled page
+        page_id = register_tiled_page(self.pager.detach_tiled_page(plot_vars, *configs))
+        self.pager = None
+        return {'result': result, 'ui': {'tiles': [tiles_url(page_id)]}}
+
+    # resume mode: the prompt is processed, the next one will restart from there
+    def save_progress(self, checkpoint: PlotCheckpoint, xy_plot_data: XYPlotQueueData):
+        next_index = xy_plot_data.queue_index + 1
+        if xy_plot_data.complete:
+            checkpoint.delete()
+            return
+        if self.pager and not self.pager.complete:
+            self.pager.save_checkpoint(
+                next_index, xy_plot_data.order, xy_plot_data.max_per_page
+            )
+        else:
+            # page complete: the next prompt starts a new one
+            checkpoint.save_state(
+                {
+                    'next_index': next_index,
+                    'order': xy_plot_data.order,
+                    'max_per_page': xy_plot_data.max_per_page,
+                }
+            )
+
+    # background job: save the grid and archive the page, then notify the frontend
+    # on failure, the reserved (or partly written) file is removed, and the frontend notified too
+    @staticmethod
+    def render_page(
+        node_id: str,
+        xy_plot_data: XYPlotQueueData,
+        pager: Pager,
+        path: str,
+        plot_vars: PlotVars,
+        plot_config_render: PlotConfigRenderData,
+        *configs,
+    ):
+        try:
+            pager.save_grid(path, plot_vars, *configs)
+            if plot_config_render.keep_runs:
+                XYPlotRender.archive_page(
+                    xy_plot_data, node_id, plot_config_render.keep_runs, pager
+                )
+            event = {'node': node_id, 'path': path}
+            if plot_config_render.tiles:
+                page_id = register_tiled_page(
+                    pager.detach_tiled_page(plot_vars, *configs)
+                )
+                event['tiles'] = tiles_url(page_id)
+        except Exception as e:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            PromptServer.instance.send_sync(
+                'comfylab.grid_render_failed',
+                {'node': node_id, 'path': path, 'error': str(e)},
+            )
+            raise
+        finally:
+            pager.close()
+        PromptServer.instance.send_sync('comfylab.grid_rendered', event)
+
+    # progress preview, shown by the node like the standard Preview Image node does (temp folder)
+    @staticmethod
+    def save_preview(image: Image.Image) -> dict:
+        full_output_folder, filename, counter, subfolder, _ = (
+            folder_paths.get_save_image_path(
+                'ComfyLab/xy_plot_progress',
+                folder_paths.get_temp_directory(),
+                image.width,
+                image.height,
+            )
+        )
+        file = '{}_{:05}_.png'.format(filename, counter)
+        image.save(os.path.join(full_output_folder, file), compress_level=1)
+        return {'filename': file, 'subfolder': subfolder, 'type': 'temp'}
+
+    # keep the cells of the complete page, so the run can be rendered again by XY Plot: Re-render
+    # (called by the render worker for background pages)
+    @staticmethod
+    def archive_page(
+        xy_plot_data: XYPlotQueueData, unique_id: str, keep_runs: int, pager: Pager
+    ):
+        key = (unique_id, xy_plot_data.run_id)
+        archive = get_plot_archive()
+        name = archive_names.setdefault(key, xy_plot_data.run_id or new_archive_name())
+        archive.save_page(
+            name,
+            xy_plot_data.current_page,
+            xy_plot_data.total_pages,
+            xy_plot_data.dim1.values or pager.dim1.headers,
+            xy_plot_data.dim2.values or pager.dim2.headers,
+            pager.cell_images(),
+        )
+        if archive.finish_run(name, xy_plot_data.total_pages, keep_runs):
+            archive_names.pop(key, None)
+
+
+@register_node('XY Plot: Re-render', 'plot')
+class XYPlotRerender:
+    def __init__(self):
+        pass
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            'required': {
+                'run': (
+                    'INT',
+                    {
+                        'default': 1,
+                        'min': 1,
+                        'tooltip': "run to render again, among the ones kept by XY Plot: Render ('keep runs' option of Plot Config: Render)\n1: the last complete run, 2: the one before...",
+                    },
+                ),
+                'dim1_header_format': (
+                    'STRING',
+                    {
+                        'default': '{dim1}',
+                        'tooltip': "template text to be displayed as dim1 header.\nthe '{dim1'} placeholder will be replaced by the current value.\nUse '\\n' for multiline text.",
+                    },
+                ),
+                'dim2_header_format': (
+                    'STRING',
+                    {
+                        'default': '{dim2}',
+                        'tooltip': "template text to be displayed as dim2 header.\nthe '{dim2'} placeholder will be replaced by the current value.\nUse '\\n' for multiline text.",
+                    },
+                ),
+                'direction': (
+                    'BOOLEAN',
+                    {
+                        'default': True,
+                        'label_on': 'dim1 as rows',
+                        'label_off': 'dim1 as cols',
+                        'tooltip': 'display dim1 values as rows or columns',
+                    },
+                ),
+            },
+            'optional': {
+                'plot_config_grid': (
+                    'PLOT_CONFIG_GRID',
+                    {'tooltip': 'optional: ' + TOOLTIP_PLOT_CONFIG_GRID},
+                ),
+                'plot_config_header': (
+                    'PLOT_CONFIG_HF',
+                    {'tooltip': 'optional: plot configuration for the page header'},
+                ),
+                'plot_config_footer': (
+                    'PLOT_CONFIG_HF',
+                    {'tooltip': 'optional: plot configuration for the page footer'},
+                ),
+                'plot_config_render': (
+                    'PLOT_CONFIG_RENDER',
+                    {'tooltip': 'optional: ' + TOOLTIP_PLOT_CONFIG_RENDER},
+                ),
+            },
+            'hidden': {'unique_id': 'UNIQUE_ID', 'prompt': 'PROMPT'},
+        }
+
+    FUNCTION = 'run'
+    RETURN_TYPES = ('IMAGE', 'IMAGE', 'STRING')
+    RETURN_NAMES = ('grid', 'transposed_grid', 'grid_path')
+    OUTPUT_IS_LIST = (True, True, True)
+    OUTPUT_TOOLTIPS = (
+        "grid pages (or their previews, if saved as PNG files by 'Plot Config: Render')",
+        'grid pages with the other direction (only rendered if the output is linked)',
+        "paths of the grid pages (both directions), if saved as PNG files by 'Plot Config: Render'",
+    )
+    DESCRIPTION = 'Render again the grids of a previous run of XY Plot: Render, with other settings, without generating the images again.'
+
+    def run(
+        self,
+        run: int,
+        dim1_header_format: str,
+        dim2_header_format: str,
+        direction: bool,
+        plot_config_grid=PlotConfigGridData(),
+        plot_config_header=None,
+        plot_config_footer=None,
+        plot_config_render=PlotConfigRenderData(),
+        unique_id=None,
+        prompt=None,
+    ):
+        archive = get_plot_archive()
+        runs = archive.runs()
+        if run > len(runs):
+            raise Exception(
+                "XY Plot: {} complete run(s) kept, see 'keep runs' option of Plot Config: Render".format(
+                    len(runs)
+                )
+            )
+        name = runs[run - 1]
+
+        directions = [direction]
+        if self.is_output_linked(prompt, unique_id, 1):
+            directions.append(not direction)
+        configs = (plot_config_grid, plot_config_header, plot_config_footer)
+        grids = ([], [])
+        paths = []
+        for page in archive.load_pages(name):
+            cells = list(archive.load_cells(name, page['page']))
+            xy_plot_data = XYPlotQueueData(
+                0,
+                page['page'],
+                page['total_pages'],
+                True,
+                DimData(0, len(page['dim1_values']), None, page['dim1_values']),
+                DimData(0, len(page['dim2_values']), None, page['dim2_values']),
             )
+            plot_vars = PlotVars(page['page'] + 1, page['total_pages'])
+            for i, dim1_as_rows in enumerate(directions):
+                pager = Pager(
+                    xy_plot_data,
+                    (dim1_header_format, dim2_header_format),
+                    dim1_as_rows,
+                    plot_config_grid,
+                    plot_config_render,
+                )
+                for dim1_index, dim2_index, image in cells:
+                    pager.add_image(dim1_index, dim2_index, image)
+                if plot_config_render.output == 'png file':
+                    path = get_output_path(plot_config_render.filename_prefix)
+                    grids[i].append(pager.save_grid(path, plot_vars, *configs))
+                    paths.append(path)
+                else:
+                    grids[i].append(pager.make_grid(plot_vars, *configs))
+                    paths.append('')
+                pager.close()
+        return (grids[0], grids[1], paths)
+
+    # True if a node of the prompt takes the given output as input
+    @staticmethod
+    def is_output_linked(prompt: dict, unique_id: str, output: int) -> bool:
+        if not prompt:
+            return True
+        return any(
+            value == [unique_id, output]
+            for node in prompt.values()
+            for value in node['inputs'].values()
+        )
 
 
 @register_node('Plot Config: Grid', 'plot')
@@ -347,6 +1219,40 @@ class PlotConfigGrid:
                     },
                 ),
             },
+            'optional': {
+                'max_cell_width': (
+                    'INT',
+                    {
+                        'default': 0,
+                        'min': 0,
+                        'tooltip': 'if > 0, images wider than this are downscaled (keeping ratio) when received',
+                    },
+                ),
+                'max_cell_height': (
+                    'INT',
+                    {
+                        'default': 0,
+                        'min': 0,
+                        'tooltip': 'if > 0, images taller than this are downscaled (keeping ratio) when received',
+                    },
+                ),
+                'max_page_megapixels': (
+                    'FLOAT',
+                    {
+                        'default': 0,
+                        'min': 0,
+                        'step': 0.1,
+                        'tooltip': 'if > 0, max total size of the images of a page, in megapixels (headers excluded): each image is downscaled to its share when received',
+                    },
+                ),
+                'cell_layout': (
+                    ['uniform', 'packed'],
+                    {
+                        'default': 'uniform',
+                        'tooltip': 'uniform: all cells have the size of the largest image\npacked: each column has the width of its widest image, and each row the height of its tallest one (smaller pages with images of mixed sizes / ratios)',
+                    },
+                ),
+            },
         }
 
     FUNCTION = 'run'
@@ -366,6 +1272,10 @@ class PlotConfigGrid:
         pad_row_headers: int,
         wrap_col_headers: int,
         wrap_row_headers: int,
+        max_cell_width: int = 0,
+        max_cell_height: int = 0,
+        max_page_megapixels: float = 0,
+        cell_layout: str = 'uniform',
     ):
         plot_config_grid = PlotConfigGridData(
             gap=gap,
@@ -377,6 +1287,10 @@ class PlotConfigGrid:
             pad_row_headers=pad_row_headers,
             wrap_col_headers=wrap_col_headers,
             wrap_row_headers=wrap_row_headers,
+            max_cell_width=max_cell_width,
+            max_cell_height=max_cell_height,
+            max_page_megapixels=max_page_megapixels,
+            cell_layout=cell_layout,
         )
         return (plot_config_grid,)
 
@@ -478,6 +1392,173 @@ class PlotConfigHF:
         return (plot_config_hf,)
 
 
+@register_node('Plot Config: Render', 'plot')
+class PlotConfigRender:
+    def __init__(self):
+        pass
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            'required': {
+                'compositing': (
+                    ['deferred', 'incremental'],
+                    {
+                        'default': 'deferred',
+                        'tooltip': "'deferred': keep all images, and build the grid when the page is complete\n'incremental': paste each image into the grid as soon as it is received, so it can be freed right away",
+                    },
+                ),
+                'cell_store': (
+                    ['memory', 'mmap', 'disk'],
+                    {
+                        'default': 'memory',
+                        'tooltip': "deferred compositing only, where to keep images until the page is complete:\n'memory': all in RAM\n'mmap': in RAM up to the budget, then in a single scratch file\n'disk': in RAM up to the budget, then one scratch file per image",
+                    },
+                ),
+                'ram_budget_mb': (
+                    'INT',
+                    {
+                        'default': 2048,
+                        'min': 0,
+                        'tooltip': "'mmap' / 'disk' cell stores only: max memory (MB) used by images before spilling them to disk",
+                    },
+                ),
+                'scratch_dir': (
+                    'STRING',
+                    {
+                        'default': '',
+                        'tooltip': "'mmap' / 'disk' cell stores only: folder for scratch files, leave empty to use the system temp folder",
+                    },
+                ),
+                'compositor': (
+                    ['tensor', 'pil'],
+                    {
+                        'default': 'tensor',
+                        'tooltip': "deferred compositing only, how the grid is built:\n'tensor': images copied directly into the output tensor (faster, less memory)\n'pil': grid built as PIL image, then converted",
+                    },
+                ),
+                'output': (
+                    ['image', 'png file'],
+                    {
+                        'default': 'image',
+                        'tooltip': "'image': the grid is sent as IMAGE output\n'png file': the grid is written to a PNG file, one row of images at a time (for giant grids), and only a preview is sent as IMAGE",
+                    },
+                ),
+                'filename_prefix': (
+                    'STRING',
+                    {
+                        'default': 'ComfyLab/xy_plot',
+                        'tooltip': "'png file' output only: filename prefix, relative to the ComfyUI output folder",
+                    },
+                ),
+                'preview_size': (
+                    'INT',
+                    {
+                        'default': 1024,
+                        'min': 64,
+                        'tooltip': "max width / height of the previews: grid preview sent as IMAGE with the 'png file' output, and progress previews of the page in progress",
+                    },
+                ),
+                'tiles': (
+                    'BOOLEAN',
+                    {
+                        'default': False,
+                        'tooltip': 'keep the last completed pages browsable as deep zoom (DZI) tiles, rendered on demand by the backend\nthe images are kept (in the cell store) until the page is released',
+                    },
+                ),
+                'background': (
+                    'BOOLEAN',
+                    {
+                        'default': False,
+                        'tooltip': "'png file' output only: write the grid in a background thread, so the next images can be generated meanwhile\nthe grid output is not sent, and the file is complete when the 'comfylab.grid_rendered' event is received by the frontend",
+                    },
+                ),
+                'cell_cache': (
+                    'BOOLEAN',
+                    {
+                        'default': False,
+                        'tooltip': 'keep the generated images on disk, identified by the workflow and dim values: when a plot is run again (e.g. with an extra value), the known images are reused instead of being generated again\nnote: the queue still runs one prompt per cell, in which only the nodes needed by XY Plot: Render are skipped',
+                    },
+                ),
+                'cell_cache_mb': (
+                    'INT',
+                    {
+                        'default': 4096,
+                        'min': 1,
+                        'tooltip': 'max disk space used by the cell cache, the least recently used images being deleted beyond',
+                    },
+                ),
+                'keep_runs': (
+                    'INT',
+                    {
+                        'default': 0,
+                        'min': 0,
+                        'tooltip': 'nb of complete runs whose images are kept on disk, so they can be rendered again with other settings by XY Plot: Re-render (0: none)',
+                    },
+                ),
+                'progress_seconds': (
+                    'INT',
+                    {
+                        'default': 0,
+                        'min': 0,
+                        'tooltip': "show a low-res preview of the page in progress on XY Plot: Render, at most every n seconds (0: disabled)\nmade of thumbnails of the images received so far, see 'preview size'",
+                    },
+                ),
+                'progress_cells': (
+                    'INT',
+                    {
+                        'default': 0,
+                        'min': 0,
+                        'tooltip': "show a low-res preview of the page in progress on XY Plot: Render, every n images received (0: disabled)\nmade of thumbnails of the images received so far, see 'preview size'",
+                    },
+                ),
+            },
+        }
+
+    FUNCTION = 'run'
+    RETURN_TYPES = ('PLOT_CONFIG_RENDER',)
+    RETURN_NAMES = ('plot_config_render',)
+    OUTPUT_TOOLTIPS = (TOOLTIP_PLOT_CONFIG_RENDER,)
+    DESCRIPTION = 'Various options to tune how the grid is rendered (speed, memory).'
+
+    def run(
+        self,
+        compositing: str,
+        cell_store: str,
+        ram_budget_mb: int,
+        scratch_dir: str,
+        compositor: str,
+        output: str,
+        filename_prefix: str,
+        preview_size: int,
+        tiles: bool,
+        background: bool,
+        cell_cache: bool,
+        cell_cache_mb: int,
+        keep_runs: int,
+        progress_seconds: int,
+        progress_cells: int,
+    ):
+        plot_config_render = PlotConfigRenderData(
+            compositing=compositing,
+            cell_store=cell_store,
+            ram_budget_mb=ram_budget_mb,
+            scratch_dir=scratch_dir,
+            compositor=compositor,
+            output=output,
+            filename_prefix=filename_prefix,
+            preview_size=preview_size,
+            tiles=tiles,
+            background=background,
+            cell_cache=cell_cache,
+            cell_cache_mb=cell_cache_mb,
+            keep_runs=keep_runs,
+            progress_seconds=progress_seconds,
+            progress_cells=progress_cells,
+        )
+        return (plot_config_render,)
+
+
 @register_node('XY Plot: Split Data', 'plot')
 class XYPlotDataSplit:
     def __init__(self):
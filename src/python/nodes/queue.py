@@ -1,11 +1,35 @@
 from typing import Any
 from pathlib import Path
-import glob
+import os
 from PIL import Image
+from comfy_execution.graph import ExecutionBlocker  # type: ignore
+import folder_paths  # type: ignore
 
 
 from ..collection.register_nodes import register_node
-from ..shared.utils import ANY_TYPE, pillow_to_tensor
+from ..shared.folder_index import FolderIndex, FolderWatch, LazyFolderIndex
+from ..shared.utils import ANY_TYPE, PREFETCH_INPUT, pillow_to_tensor
+
+
+# folder indexes of File / Image Queue, kept between scans
+def get_file_index_dir() -> str:
+    return os.path.join(folder_paths.get_user_directory(), 'comfylab', 'file_index')
+
+
+LAZY_INDEX_INPUT = (
+    'BOOLEAN',
+    {
+        'default': False,
+        'tooltip': "huge folders: the file list is kept on disk instead of memory, and built in the background, so the first files are processed while the rest of the folder is still being scanned\nuntil the scan is complete, 'total' is the nb of files found so far",
+    },
+)
+WATCH_INPUT = (
+    'BOOLEAN',
+    {
+        'default': False,
+        'tooltip': "watch the folder: new files are appended to the queue as they land, and once all files are processed, the queue waits for new ones instead of completing (the prompt queued for the next file polls the folder, and is queued again later, less and less often, if nothing landed)\n'total' is the nb of files found so far + 1 (the file waited for)\nnot compatible with lazy index",
+    },
+)
 
 
 @register_node('Generic Queue', 'queue')
@@ -24,6 +48,7 @@ class GenericQueue:
             },
             'optional': {
                 'index': ('QUEUE_STATUS', {'tooltip': 'current queue status'}),
+                'prefetch': PREFETCH_INPUT,
             },
         }
 
@@ -33,7 +58,7 @@ class GenericQueue:
     OUTPUT_TOOLTIPS = ('current value (not typed)', 'current index', 'total elements')
     DESCRIPTION = 'Loop through all values of input list, and send them to output.'
 
-    def run(self, input_list: list[Any], index: int):
+    def run(self, input_list: list[Any], index: int, prefetch: int = 1):
         if index < 0:  # value has been reset (completion, interrupt, errors)
             index = 0
 
@@ -42,7 +67,7 @@ class GenericQueue:
             raise Exception('Empty input list')
         return {
             'result': (input_list[index], index + 1, total),
-            'ui': {'index': [index], 'total': [total]},
+            'ui': {'index': [index], 'total': [total], 'prefetch': [prefetch]},
         }
 
 
@@ -77,6 +102,9 @@ class FileQueue:
             },
             'optional': {
                 'index': ('QUEUE_STATUS', {'tooltip': 'current queue status'}),
+                'prefetch': PREFETCH_INPUT,
+                'lazy_index': LAZY_INDEX_INPUT,
+                'watch': WATCH_INPUT,
             },
         }
 
@@ -98,18 +126,29 @@ class FileQueue:
         'current index',
         'total files',
     )
-    DESCRIPTION = 'Loop through all files in folder matching the pattern(s).'
+    DESCRIPTION = 'Loop through all files in folder matching the pattern(s).\nIn watch mode, the queue never completes: it processes new files as they land in the folder, until interrupted.'
 
     # stored scanned files
     root = ''
     files = []
     total = -1
+    # lazy index mode: files indexed on disk, in the background
+    lazy = None
+    # watch mode: files appended as they land
+    watcher = None
 
     def scan_folder(
-        self, folder: str, pattern: str, recursive: bool
+        self,
+        folder: str,
+        pattern: str,
+        recursive: bool,
+        lazy_index: bool = False,
+        watch: bool = False,
     ) -> tuple[Path, list[Path], int]:
         self.files = []
         self.total = -1
+        self.watcher = None
+        self.release_index()
 
         # do not resolve, to ensure relative path is accurate
         self.root = Path(folder)
@@ -118,29 +157,60 @@ class FileQueue:
         if not self.root.is_dir():
             raise Exception("'{}' is not a directory".format(self.root))
 
-        patterns = pattern.split(',')
-        self.files = []
-        for p in patterns:
-            # it = self.root.rglob(p.strip()) if recursive else self.root.glob(p.strip())
-            # self.files += [file for file in it if file.is_file()]
-            p = p.strip()
-
-            # TODO: go back to Path().glob() with recurse_symlinks=True when Python version is > 3.13
-            # in the meantime, we use glob as it follows links by default
-            glob_pattern = self.root / '**' / p if recursive else self.root / p
-            matches = glob.glob(str(glob_pattern), recursive=recursive)
-            for match in matches:
-                file = Path(match)
-                if file.is_file():
-                    self.files.append(file)
-        # remove duplicates
-        self.files = list(set(self.files))
-        # list files in current folder first
-        self.files.sort(key=lambda f: [f.parent, f.name])
+        # the folder may be empty yet: files are waited for
+        if watch:
+            self.watcher = FolderWatch(
+                folder, pattern.split(','), recursive, get_file_index_dir()
+            )
+            self.files = self.watcher.files
+            return
+
+        if lazy_index:
+            self.lazy = LazyFolderIndex(
+                folder, pattern.split(','), recursive, get_file_index_dir()
+            )
+            self.lazy.start()
+            if self.lazy.wait(1) == 0:
+                raise Exception('No file found')
+            return
+
+        # all patterns are matched in a single traversal, and only the directories modified
+        # since the previous scan are listed again (files in current folder first)
+        index = FolderIndex(folder, pattern.split(','), recursive, get_file_index_dir())
+        self.files = index.scan()
         self.total = len(self.files)
         if len(self.files) == 0:
             raise Exception('No file found')
 
+    # file at index (None in watch mode, if it has not landed yet), and total nb of files
+    def get_file(self, index: int) -> tuple[Path, int]:
+        if self.watcher:
+            # the folder is only polled once the files listed so far are processed
+            if index >= len(self.files) - 1:
+                self.watcher.poll()
+            # one more file announced, so the queue goes on
+            total = len(self.files) + 1
+            return (self.files[index] if index < len(self.files) else None, total)
+        if not self.lazy:
+            return (self.files[index], self.total)
+        # wait for the next file too, so the total announces it (and the queue goes on) as long as files remain
+        total = self.lazy.wait(index + 2)
+        file = self.lazy.get(index)
+        if index + 1 >= total:
+            # last file: the scan is complete, and the queue too
+            self.release_index()
+        return (file, total)
+
+    # lazy index mode: stop the indexing thread, and delete the index files
+    def release_index(self):
+        if self.lazy:
+            self.lazy.close()
+            self.lazy = None
+
+    # the node is removed (or replaced) from the workflow
+    def __del__(self):
+        self.release_index()
+
     def run(
         self,
         folder: str,
@@ -148,15 +218,30 @@ class FileQueue:
         recursive: bool,
         with_extension: bool,
         index: int,
+        prefetch: int = 1,
+        lazy_index: bool = False,
+        watch: bool = False,
     ):
         if index < 0:  # value has been reset (completion, interrupt, errors)
             index = 0
 
-        # only scan files at the beginning
-        if index == 0:
-            self.scan_folder(folder, pattern, recursive)
+        # only scan files at the beginning (or again, if a lazy index was released and the last files are retried)
+        if index == 0 or (lazy_index and not watch and self.lazy is None):
+            self.scan_folder(folder, pattern, recursive, lazy_index, watch)
 
-        file = self.files[index]
+        file, total = self.get_file(index)
+        if file is None:
+            # nothing to process: the prompt ends right away, and the queue (QUEUE_STATUS widget
+            # or backend auto queue) queues the same index again after the given delay
+            return {
+                'result': (ExecutionBlocker(None),) * len(self.RETURN_TYPES),
+                'ui': {
+                    'index': [index],
+                    'total': [total],
+                    'prefetch': [prefetch],
+                    'waiting': [self.watcher.backoff()],
+                },
+            }
         return {
             'result': (
                 str(file.name) if with_extension else file.stem,
@@ -165,9 +250,9 @@ class FileQueue:
                 str(file.relative_to(self.root)),
                 str(file.parent.relative_to(self.root)),
                 index + 1,
-                self.total,
+                total,
             ),
-            'ui': {'index': [index], 'total': [self.total]},
+            'ui': {'index': [index], 'total': [total], 'prefetch': [prefetch]},
         }
 
 
@@ -202,6 +287,9 @@ class ImageQueue(FileQueue):
             },
             'optional': {
                 'index': ('QUEUE_STATUS', {'tooltip': 'current queue status'}),
+                'prefetch': PREFETCH_INPUT,
+                'lazy_index': LAZY_INDEX_INPUT,
+                'watch': WATCH_INPUT,
             },
         }
 
@@ -224,7 +312,7 @@ class ImageQueue(FileQueue):
         'current index',
         'total files',
     )
-    DESCRIPTION = 'Loop through all image files in folder matching the pattern(s).'
+    DESCRIPTION = 'Loop through all image files in folder matching the pattern(s).\nIn watch mode, the queue never completes: it processes new images as they land in the folder, until interrupted.'
 
     def run(
         self,
@@ -233,8 +321,23 @@ class ImageQueue(FileQueue):
         recursive: bool,
         with_extension: bool,
         index: int,
+        prefetch: int = 1,
+        lazy_index: bool = False,
+        watch: bool = False,
     ):
-        parent_run = super().run(folder, pattern, recursive, with_extension, index)
+        parent_run = super().run(
+            folder,
+            pattern,
+            recursive,
+            with_extension,
+            index,
+            prefetch,
+            lazy_index,
+            watch,
+        )
+
+        if 'waiting' in parent_run['ui']:
+            return parent_run
 
         file = parent_run['result'][1]
         img = Image.open(file)
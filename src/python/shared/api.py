@@ -3,11 +3,21 @@ import json5  # type: ignore
 import yaml
 import pyaml  # type: ignore
 import mimetypes
+import asyncio
 from pathlib import Path
-from aiohttp.web import Request, json_response  # type: ignore
+from aiohttp.web import Request, Response, json_response  # type: ignore
 from server import PromptServer  # type: ignore
 
 from ..shared.json_validation import validate, SchemaError, InvalidStructureError
+from ..shared.auto_queue import get_driver, list_drivers, start_driver
+from ..shared.tiles import get_tiled_page
+from ..shared.planner import DEFAULT_ORDER, make_plan
+from ..shared.plan_estimate import estimate_plan
+from ..shared.plot_data import (
+    PlotConfigGridData,
+    PlotConfigHFData,
+    PlotConfigRenderData,
+)
 
 routes = PromptServer.instance.routes
 
@@ -153,6 +163,146 @@ async def config_validate(request: Request):
         )
 
 
+# deep zoom (DZI) descriptor of a completed grid page
+@routes.get('/comfylab/tiles/{page_id}.dzi')
+async def tiles_descriptor(request: Request):
+    page = get_tiled_page(request.match_info['page_id'])
+    if not page:
+        return send_error(status=404, reason='Page not found')
+    return Response(text=page.dzi(), content_type='application/xml')
+
+
+# deep zoom tile, rendered on demand
+@routes.get('/comfylab/tiles/{page_id}_files/{level}/{col}_{row}.{format}')
+async def tiles_tile(request: Request):
+    page = get_tiled_page(request.match_info['page_id'])
+    if not page:
+        return send_error(status=404, reason='Page not found')
+    try:
+        level, col, row = (
+            int(request.match_info[key]) for key in ['level', 'col', 'row']
+        )
+        # rendering is CPU-bound: do not block the server event loop
+        content = await asyncio.get_running_loop().run_in_executor(
+            None, page.tile_bytes, level, col, row
+        )
+    except (ValueError, KeyError):
+        return send_error(status=404, reason='Tile not found')
+    except Exception as e:
+        return send_error(status=500, reason=str(e))
+    return Response(body=content, content_type='image/' + page.format)
+
+
+# XY plot dim: either a list of values, or their number
+def plan_values(dim) -> list:
+    if isinstance(dim, int):
+        return list(range(dim))
+    if not isinstance(dim, list) or len(dim) == 0:
+        raise ValueError('dims must be non-empty lists, or lengths')
+    return dim
+
+
+def make_plan_estimate(body: dict) -> dict:
+    dim1_format = body.get('dim1_header_format', '{dim1}')
+    dim2_format = body.get('dim2_header_format', '{dim2}')
+    headers = (
+        [dim1_format.format(dim1=value) for value in plan_values(body['dim1'])],
+        [dim2_format.format(dim2=value) for value in plan_values(body.get('dim2', 1))],
+    )
+    plan = make_plan(
+        (len(headers[0]), len(headers[1])),
+        (body.get('max_dim1_per_page', 0), body.get('max_dim2_per_page', 0)),
+        body.get('batch_size', 1),
+        body.get('traversal', DEFAULT_ORDER),
+        (body.get('dim1_switch_cost', 0), body.get('dim2_switch_cost', 0)),
+    )
+    header = body.get('plot_config_header')
+    footer = body.get('plot_config_footer')
+    return estimate_plan(
+        plan,
+        headers,
+        (body.get('cell_width', 1024), body.get('cell_height', 1024)),
+        body.get('direction', True),
+        PlotConfigGridData(**body.get('plot_config_grid', {})),
+        PlotConfigHFData(**header) if header else None,
+        PlotConfigHFData(**footer) if footer else None,
+        PlotConfigRenderData(**body.get('plot_config_render', {})),
+        body.get('cell_time', 0),
+    )
+
+
+# plan of an XY plot, before running it: schedule, page sizes, estimated peak RAM and duration
+# dims are given either as lists of values, or as their lengths; other settings are optional,
+# with the same names and defaults as the nodes inputs (configs as dicts)
+@routes.post('/comfylab/xy_plan')
+async def xy_plan(request: Request):
+    try:
+        body = await request.json()
+        if not 'dim1' in body.keys():
+            return send_error(status=500, reason='dim1 missing in request')
+        # headers are rendered to get the page sizes: do not block the server event loop
+        estimate = await asyncio.get_running_loop().run_in_executor(
+            None, make_plan_estimate, body
+        )
+    except (TypeError, ValueError, KeyError) as e:
+        return send_error(status=415, reason='Invalid plan settings', message=str(e))
+    except Exception as e:
+        return send_error(status=500, reason=str(e))
+    return send_success(**estimate)
+
+
+# drive a queue node from the backend: the prompt (API format) is queued again with the next index each time
+# the node reports its progress, until the end of its list, an interruption or an error
+# body: prompt, node_id (the queue node), optional client_id, extra_data, start (first index),
+# prefetch (nb of prompts queued ahead, default: the prefetch input of the node)
+@routes.post('/comfylab/auto_queue')
+async def auto_queue_start(request: Request):
+    try:
+        body = await request.json()
+        driver = await start_driver(
+            body['prompt'],
+            body['node_id'],
+            body.get('client_id'),
+            body.get('extra_data'),
+            int(body.get('start', 0)),
+            int(body['prefetch']) if 'prefetch' in body else None,
+        )
+    except (TypeError, ValueError, KeyError) as e:
+        return send_error(
+            status=415, reason='Invalid auto queue request', message=str(e)
+        )
+    except Exception as e:
+        return send_error(status=500, reason=str(e))
+    info = driver.info()
+    if info['status'] == 'error':
+        return send_error(status=400, reason='Prompt not queued', **info)
+    return send_success(**info)
+
+
+@routes.get('/comfylab/auto_queue')
+async def auto_queue_list(request: Request):
+    return send_success(drivers=[driver.info() for driver in list_drivers()])
+
+
+# progress of a driver: status (running, complete, interrupted, error, stopped), last index reported, total...
+@routes.get('/comfylab/auto_queue/{driver_id}')
+async def auto_queue_status(request: Request):
+    driver = get_driver(request.match_info['driver_id'])
+    if not driver:
+        return send_error(status=404, reason='Auto queue not found')
+    return send_success(**driver.info())
+
+
+# stop queuing: prompts not started yet are removed from the queue, the current one is not interrupted
+@routes.post('/comfylab/auto_queue/{driver_id}/stop')
+async def auto_queue_stop(request: Request):
+    driver = get_driver(request.match_info['driver_id'])
+    if not driver:
+        return send_error(status=404, reason='Auto queue not found')
+    driver.cancel()
+    return send_success(**driver.info())
+
+
 def load_api():
     # print('### ComfyLab: API loaded')
     pass
@@ -0,0 +1,286 @@
+from collections import OrderedDict
+import asyncio
+import copy
+import logging
+import threading
+import time
+import uuid
+import aiohttp  # type: ignore
+from server import PromptServer  # type: ignore
+
+from .server_events import add_event_listener
+
+# nb of finished drivers kept, to report their status
+MAX_FINISHED_DRIVERS = 64
+
+
+# backend driver of a queue node (Generic / File / Image Queue, XY Plot: Queue): queues the prompt again
+# with the next indexes each time the node reports its progress, like the QUEUE_STATUS widget does from the browser,
+# but without depending on a browser tab
+# prompt: in API format, as sent to the /prompt route
+# prefetch: nb of prompts queued ahead of the current one (None: as reported by the node)
+class AutoQueueDriver:
+    def __init__(
+        self,
+        server,
+        prompt: dict,
+        node_id: str,
+        client_id: str = None,
+        extra_data: dict = None,
+        prefetch: int = None,
+    ):
+        self.server = server
+        self.id = uuid.uuid4().hex
+        self.prompt = prompt
+        self.node_id = str(node_id)
+        # events of the driven prompts are sent to this client only: without one, they would be broadcast,
+        # and open browser tabs would queue the workflow again from their QUEUE_STATUS widgets
+        self.client_id = client_id or 'comfylab-auto-queue-{}'.format(self.id)
+        self.extra_data = extra_data or {}
+        self.prefetch = prefetch
+        self.status = 'running'
+        self.error = None
+        # last index reported by the node, and total
+        self.index = None
+        self.total = None
+        # watch mode (File / Image Queue): delay before queuing again the index waited for, None if not waiting
+        self.waiting = None
+        # prompt id -> index, for the prompts queued and not finished yet
+        self.pending = {}
+        # prompts in which the node reported its progress
+        self.reported = set()
+        self.queued = 0
+        # last index queued: prompts are queued one at a time, in order
+        self.queued_index = None
+        self.queue_lock = asyncio.Lock()
+        self.last_prompt = None
+        self.started = time.time()
+        self.updated = self.started
+        self.lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.status == 'running'
+
+    def info(self) -> dict:
+        with self.lock:
+            return {
+                'id': self.id,
+                'status': self.status,
+                'error': self.error,
+                'node_id': self.node_id,
+                'client_id': self.client_id,
+                'index': self.index,
+                'total': self.total,
+                'waiting': self.waiting,
+                'queued': self.queued,
+                'pending': len(self.pending),
+                'prefetch': self.prefetch,
+                'started': self.started,
+                'updated': self.updated,
+            }
+
+    # queue the prompt for the given index
+    async def queue(self, index: int):
+        prompt = copy.deepcopy(self.prompt)
+        prompt[self.node_id]['inputs']['index'] = index
+        # the prompt id is chosen here, so events of the prompt are recognized even if it starts executing
+        # before the response is received
+        prompt_id = str(uuid.uuid4())
+        with self.lock:
+            if not self.running:
+                return
+            self.pending[prompt_id] = index
+            self.queued += 1
+            self.queued_index = index
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                    server_url(self.server) + '/prompt',
+                    json={
+                        'prompt': prompt,
+                        'prompt_id': prompt_id,
+                        'client_id': self.client_id,
+                        'extra_data': self.extra_data,
+                    },
+                    ssl=False,
+                ) as response:
+                    result = await response.json(content_type=None)
+        except Exception as e:
+            self._stop('error', 'cannot queue prompt: {}'.format(e))
+            return
+        if 'prompt_id' not in result:
+            error = result.get('error', {})
+            message = error.get('message') if isinstance(error, dict) else str(error)
+            self._stop('error', message or 'invalid prompt', result.get('node_errors'))
+            return
+        # older ComfyUI versions choose the prompt id themselves
+        with self.lock:
+            if result['prompt_id'] != prompt_id and prompt_id in self.pending:
+                self.pending[result['prompt_id']] = self.pending.pop(prompt_id)
+            stopped = not self.running
+        # stopped while queuing
+        if stopped:
+            self._delete_prompts([result['prompt_id']])
+
+    # queue the next indexes, up to the given one
+    async def queue_until(self, last: int):
+        async with self.queue_lock:
+            while self.running and self.queued_index < last:
+                await self.queue(self.queued_index + 1)
+
+    # watch mode: the node has nothing to process yet, the same index is queued again after a delay
+    async def queue_later(self, index: int, delay: float):
+        await asyncio.sleep(delay)
+        async with self.queue_lock:
+            if self.running:
+                await self.queue(index)
+
+    # stop driving: the prompts still in the ComfyUI queue are removed
+    def cancel(self):
+        self._stop('stopped')
+
+    # execution event, for any prompt (called from the execution thread)
+    def on_event(self, event: str, data: dict):
+        prompt_id = data.get('prompt_id') if isinstance(data, dict) else None
+        with self.lock:
+            if not self.running or prompt_id not in self.pending:
+                return
+            self.updated = time.time()
+
+        if event == 'executed' and str(data.get('node')) == self.node_id:
+            output = data.get('output') or {}
+            try:
+                index, total = output['index'][0], output['total'][0]
+            except (KeyError, IndexError, TypeError):
+                return
+            waiting = output.get('waiting', [None])[0]
+            with self.lock:
+                self.index, self.total = index, total
+                self.waiting = waiting
+                if self.prefetch is None:
+                    self.prefetch = max(1, output.get('prefetch', [1])[0])
+                self.reported.add(prompt_id)
+                if index >= total - 1 and waiting is None:
+                    self.last_prompt = prompt_id
+            if waiting is not None:
+                asyncio.run_coroutine_threadsafe(
+                    self.queue_later(index, waiting), self.server.loop
+                )
+            elif index < total - 1:
+                asyncio.run_coroutine_threadsafe(
+                    self.queue_until(min(index + self.prefetch, total - 1)),
+                    self.server.loop,
+                )
+        elif event == 'execution_success' or (
+            event == 'executing' and data.get('node') is None
+        ):
+            with self.lock:
+                self.pending.pop(prompt_id, None)
+                reported = prompt_id in self.reported
+                self.reported.discard(prompt_id)
+            if prompt_id == self.last_prompt:
+                self._stop('complete')
+            elif not reported:
+                # the next index would never be queued
+                self._stop('error', 'the queue node did not report its progress')
+        elif event == 'execution_interrupted':
+            self._stop('interrupted')
+        elif event == 'execution_error':
+            self._stop('error', data.get('exception_message'))
+
+    def _stop(self, status: str, error: str = None, node_errors: dict = None):
+        with self.lock:
+            if not self.running:
+                return
+            self.status = status
+            self.error = error
+            if node_errors:
+                self.error = '{} {}'.format(error, node_errors)
+            self.updated = time.time()
+            pending = list(self.pending.keys())
+            self.pending = {}
+        self._delete_prompts(pending)
+        if status != 'complete':
+            logging.info(
+                'ComfyLab: auto queue {} {}{}'.format(
+                    self.id, status, ': {}'.format(self.error) if self.error else ''
+                )
+            )
+        finish_driver(self)
+
+    # remove prompts from the ComfyUI queue, if they are still there (not started yet)
+    def _delete_prompts(self, prompt_ids: list[str]):
+        for prompt_id in prompt_ids:
+            self.server.prompt_queue.delete_queue_item(
+                lambda item, prompt_id=prompt_id: item[1] == prompt_id
+            )
+
+
+# base URL of the ComfyUI server, to queue prompts through its own route
+def server_url(server) -> str:
+    address = server.address
+    if address in ('', '0.0.0.0', '::'):
+        address = '127.0.0.1'
+    if ':' in address:
+        address = '[{}]'.format(address)
+    try:
+        from comfy.cli_args import args  # type: ignore
+
+        scheme = 'https' if args.tls_keyfile and args.tls_certfile else 'http'
+    except Exception:
+        scheme = 'http'
+    return '{}://{}:{}'.format(scheme, address, server.port)
+
+
+# running and finished drivers, by id
+drivers = OrderedDict()
+drivers_lock = threading.Lock()
+
+
+async def start_driver(
+    prompt: dict,
+    node_id: str,
+    client_id: str = None,
+    extra_data: dict = None,
+    start: int = 0,
+    prefetch: int = None,
+) -> AutoQueueDriver:
+    if not isinstance(prompt, dict) or str(node_id) not in prompt:
+        raise ValueError("node '{}' not found in prompt".format(node_id))
+    driver = AutoQueueDriver(
+        PromptServer.instance, prompt, node_id, client_id, extra_data, prefetch
+    )
+    with drivers_lock:
+        drivers[driver.id] = driver
+    await driver.queue(start)
+    return driver
+
+
+def get_driver(driver_id: str) -> AutoQueueDriver:
+    with drivers_lock:
+        return drivers.get(driver_id)
+
+
+def list_drivers() -> list[AutoQueueDriver]:
+    with drivers_lock:
+        return list(drivers.values())
+
+
+# only the most recent finished drivers are kept
+def finish_driver(driver: AutoQueueDriver):
+    with drivers_lock:
+        drivers.move_to_end(driver.id)
+        finished = [id for id, d in drivers.items() if not d.running]
+        for id in finished[:-MAX_FINISHED_DRIVERS]:
+            del drivers[id]
+
+
+# execution events of any prompt, dispatched to the running drivers
+def on_queue_event(event: str, data: dict, sid: str = None):
+    for driver in list_drivers():
+        if driver.running:
+            driver.on_event(event, data)
+
+
+add_event_listener(on_queue_event)
@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+
+
+def is_link(value) -> bool:
+    return (
+        isinstance(value, list)
+        and len(value) == 2
+        and isinstance(value[0], str)
+        and isinstance(value[1], int)
+    )
+
+
+# ids of all the nodes a node depends on (itself included)
+# the nodes only reached through the excluded ones are left out, as well as the excluded ones
+def get_ancestors(prompt: dict, node_id: str, excluded: set[str] = ()) -> set[str]:
+    ancestors = set()
+    stack = [node_id]
+    while stack:
+        current = stack.pop()
+        if current in ancestors or current in excluded or current not in prompt:
+            continue
+        ancestors.add(current)
+        stack += [v[0] for v in prompt[current]['inputs'].values() if is_link(v)]
+    return ancestors
+
+
+# identify the part of the workflow producing a node input: the nodes it depends on, with their settings
+# the queue node, and the nodes only feeding the input through it, are left out, as their contribution is
+# the dim values (a node also feeding the input another way, e.g. a loader, is part of the fingerprint)
+def workflow_fingerprint(
+    prompt: dict, node_id: str, input_name: str, queue_node_id: str
+) -> str:
+    link = prompt[node_id]['inputs'][input_name]
+    nodes = {
+        n: {'class_type': prompt[n]['class_type'], 'inputs': prompt[n]['inputs']}
+        for n in get_ancestors(prompt, link[0], {queue_node_id})
+    }
+    data = json.dumps([link, nodes], sort_keys=True, default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+# key of a cell: the workflow fingerprint, and the dim values (plus anything else the image depends on)
+# note: values are compared through their text representation
+def make_cell_key(fingerprint: str, *values) -> str:
+    data = repr((fingerprint, *values))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+# generated images, stored as uint8 frames (one .npy file each), addressed by cell key
+# the least recently used ones are deleted above the size budget
+class CellCache:
+    def __init__(self, root: str, max_size: int):
+        self.root = Path(root)
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        # key -> file size, least recently used first
+        self.entries = None
+        self.size = 0
+
+    def __contains__(self, key: str) -> bool:
+        with self.lock:
+            return key in self._index()
+
+    # None if not cached
+    def get(self, key: str) -> np.ndarray:
+        with self.lock:
+            if key not in self._index():
+                return None
+            self.entries.move_to_end(key)
+            path = self._path(key)
+        try:
+            frame = np.load(path)
+            # keep track of use across restarts
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return frame
+
+    def put(self, key: str, frame: np.ndarray):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename, so an interruption never leaves a truncated frame
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as file:
+            np.save(file, np.ascontiguousarray(frame, dtype=np.uint8))
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            entries = self._index()
+            self.size -= entries.pop(key, 0)
+            entries[key] = path.stat().st_size
+            self.size += entries[key]
+            self._evict()
+
+    def _evict(self):
+        while self.size > self.max_size and len(self.entries) > 1:
+            key, size = self.entries.popitem(last=False)
+            self.size -= size
+            self._path(key).unlink(missing_ok=True)
+
+    # index built from the existing files on first use, by last use
+    def _index(self) -> OrderedDict:
+        if self.entries is None:
+            files = []
+            if self.root.is_dir():
+                for path in self.root.glob('*/*.npy'):
+                    stat = path.stat()
+                    files.append((stat.st_mtime, path.stem, stat.st_size))
+            self.entries = OrderedDict((key, size) for _, key, size in sorted(files))
+            self.size = sum(self.entries.values())
+            self._evict()
+        return self.entries
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / '{}.npy'.format(key)
+
+
+cell_caches = {}
+cell_caches_lock = threading.Lock()
+
+
+# one cache per folder, shared by all nodes
+def get_cell_cache(root: str, max_size: int) -> CellCache:
+    with cell_caches_lock:
+        if root not in cell_caches:
+            cell_caches[root] = CellCache(root, max_size)
+        cache = cell_caches[root]
+    with cache.lock:
+        cache.max_size = max_size
+    return cache
@@ -0,0 +1,234 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+import tempfile
+from PIL import Image
+import numpy as np
+
+from .plot_data import PlotConfigRenderData
+
+
+def image_nbytes(image: Image.Image) -> int:
+    return image.size[0] * image.size[1] * len(image.getbands())
+
+
+# hold the images of a grid page, addressed by (row, col)
+class CellStore(ABC):
+    def __init__(self):
+        self.sizes = {}
+
+    def put(self, row: int, col: int, image: Image.Image):
+        self.sizes[(row, col)] = image.size
+        self._put((row, col), image)
+
+    def get(self, row: int, col: int) -> Image.Image:
+        return self._get((row, col))
+
+    # image size, without loading the image
+    def size(self, row: int, col: int) -> tuple[int, int]:
+        return self.sizes[(row, col)]
+
+    def keys(self) -> list[tuple[int, int]]:
+        return list(self.sizes.keys())
+
+    def __contains__(self, key: tuple[int, int]) -> bool:
+        return key in self.sizes
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    # RAM used by the images
+    @abstractmethod
+    def memory_usage(self) -> int:
+        pass
+
+    # release resources (memory, scratch files)
+    def close(self):
+        self.sizes = {}
+
+    @abstractmethod
+    def _put(self, key: tuple[int, int], image: Image.Image):
+        pass
+
+    @abstractmethod
+    def _get(self, key: tuple[int, int]) -> Image.Image:
+        pass
+
+
+# all images kept in memory, as PIL images
+class MemoryCellStore(CellStore):
+    def __init__(self):
+        super().__init__()
+        self.images = {}
+
+    def _put(self, key: tuple[int, int], image: Image.Image):
+        self.images[key] = image
+
+    def _get(self, key: tuple[int, int]) -> Image.Image:
+        return self.images[key]
+
+    def memory_usage(self) -> int:
+        return sum(image_nbytes(image) for image in self.images.values())
+
+    def close(self):
+        super().close()
+        self.images = {}
+
+
+# images kept in memory up to a RAM budget, the oldest ones being then spilled to disk
+class SpillingCellStore(CellStore):
+    def __init__(self, ram_budget: int, scratch_dir: str = ''):
+        super().__init__()
+        self.ram_budget = ram_budget
+        self.scratch_dir = scratch_dir or None  # None: system temp dir
+        self.ram_usage = 0
+        self.hot = OrderedDict()
+        # spilled images: key -> backend specific location
+        self.spilled = {}
+
+    def _put(self, key: tuple[int, int], image: Image.Image):
+        # re-adding a cell: forget the previous version
+        if key in self.hot:
+            self.ram_usage -= image_nbytes(self.hot.pop(key))
+        if key in self.spilled:
+            self._discard(key, self.spilled.pop(key))
+        self.hot[key] = image
+        self.ram_usage += image_nbytes(image)
+        while self.ram_usage > self.ram_budget and self.hot:
+            old_key, old_image = self.hot.popitem(last=False)
+            self.ram_usage -= image_nbytes(old_image)
+            self.spilled[old_key] = self._spill(old_key, np.asarray(old_image))
+
+    def _get(self, key: tuple[int, int]) -> Image.Image:
+        if key in self.hot:
+            return self.hot[key]
+        return Image.fromarray(self._load(key, self.spilled[key]))
+
+    def memory_usage(self) -> int:
+        return self.ram_usage
+
+    def close(self):
+        super().close()
+        self.hot = OrderedDict()
+        self.spilled = {}
+        self.ram_usage = 0
+
+    # write the frame to disk, and return whatever is needed to load it back
+    @abstractmethod
+    def _spill(self, key: tuple[int, int], frame: np.ndarray):
+        pass
+
+    @abstractmethod
+    def _load(self, key: tuple[int, int], location) -> np.ndarray:
+        pass
+
+    # the spilled frame is replaced: its disk space can be reused
+    @abstractmethod
+    def _discard(self, key: tuple[int, int], location):
+        pass
+
+
+# spilled images stored as raw uint8 frames, appended to a single scratch file
+# and read back through a memory map
+class MmapCellStore(SpillingCellStore):
+    def __init__(self, ram_budget: int, scratch_dir: str = ''):
+        super().__init__(ram_budget, scratch_dir)
+        self.file = None
+        self.file_size = 0
+        # slots of replaced frames, reused by the next frames which fit: (offset, nb of bytes)
+        self.free_slots = []
+
+    def _spill(self, key: tuple[int, int], frame: np.ndarray):
+        if self.file is None:
+            self.file = tempfile.TemporaryFile(
+                prefix='comfylab_cells_', dir=self.scratch_dir
+            )
+        offset = self._allocate(frame.nbytes)
+        self.file.seek(offset)
+        self.file.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+        self.file.flush()
+        return (offset, frame.shape)
+
+    # offset of the smallest free slot large enough (the rest of it remaining free), or the end of the file
+    def _allocate(self, nbytes: int) -> int:
+        fitting = [slot for slot in self.free_slots if slot[1] >= nbytes]
+        if not fitting:
+            offset = self.file_size
+            self.file_size += nbytes
+            return offset
+        slot = min(fitting, key=lambda slot: slot[1])
+        self.free_slots.remove(slot)
+        if slot[1] > nbytes:
+            self.free_slots.append((slot[0] + nbytes, slot[1] - nbytes))
+        return slot[0]
+
+    def _discard(self, key: tuple[int, int], location):
+        offset, shape = location
+        self.free_slots.append((offset, int(np.prod(shape))))
+
+    def _load(self, key: tuple[int, int], location) -> np.ndarray:
+        offset, shape = location
+        frame = np.memmap(
+            self.file, dtype=np.uint8, mode='r', offset=offset, shape=shape
+        )
+        # copy, so the map can be released right away
+        return np.array(frame)
+
+    def close(self):
+        super().close()
+        if self.file:
+            self.file.close()
+            self.file = None
+            self.file_size = 0
+            self.free_slots = []
+
+
+# spilled images stored as one uncompressed file per cell, in a temp dir
+class DiskCellStore(SpillingCellStore):
+    def __init__(self, ram_budget: int, scratch_dir: str = ''):
+        super().__init__(ram_budget, scratch_dir)
+        self.tmp_dir = None
+
+    def _spill(self, key: tuple[int, int], frame: np.ndarray):
+        if self.tmp_dir is None:
+            self.tmp_dir = tempfile.TemporaryDirectory(
+                prefix='comfylab_cells_', dir=self.scratch_dir
+            )
+        path = Path(self.tmp_dir.name) / '{}_{}.npy'.format(*key)
+        np.save(path, frame)
+        return path
+
+    def _load(self, key: tuple[int, int], location) -> np.ndarray:
+        return np.load(location)
+
+    def _discard(self, key: tuple[int, int], location):
+        location.unlink(missing_ok=True)
+
+    def close(self):
+        super().close()
+        if self.tmp_dir:
+            self.tmp_dir.cleanup()
+            self.tmp_dir = None
+
+
+CELL_STORES = {
+    'memory': MemoryCellStore,
+    'mmap': MmapCellStore,
+    'disk': DiskCellStore,
+}
+
+
+def make_cell_store(plot_config_render: PlotConfigRenderData) -> CellStore:
+    if plot_config_render.cell_store not in CELL_STORES:
+        raise ValueError(
+            "invalid cell store '{}': must be one of {}".format(
+                plot_config_render.cell_store, ', '.join(CELL_STORES.keys())
+            )
+        )
+    cls = CELL_STORES[plot_config_render.cell_store]
+    if cls is MemoryCellStore:
+        return cls()
+    return cls(
+        plot_config_render.ram_budget_mb * 1024 * 1024,
+        plot_config_render.scratch_dir,
+    )
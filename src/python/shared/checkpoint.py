@@ -0,0 +1,58 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import shutil
+from PIL import Image
+
+
+# identify an XY plot run by its settings: the same lists and page settings give the same run id
+# note: values are compared through their text representation
+def make_run_id(*settings) -> str:
+    return hashlib.sha1(repr(settings).encode('utf-8')).hexdigest()[:16]
+
+
+# progress of an XY plot run, persisted to resume it after an interruption or a restart:
+# the cells and headers of the current page, and the index of the next prompt to process
+class PlotCheckpoint:
+    def __init__(self, root: str, run_id: str):
+        self.run_id = run_id
+        self.dir = Path(root) / run_id
+        self.cells_dir = self.dir / 'cells'
+        self.state_path = self.dir / 'state.json'
+
+    # None if nothing has been saved yet (or the checkpoint is unreadable)
+    def load_state(self) -> dict:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def save_state(self, state: dict):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        # write then rename, so an interruption never leaves a truncated state
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(state, file)
+        os.replace(tmp_path, self.state_path)
+
+    def save_cell(self, row: int, col: int, image: Image.Image):
+        self.cells_dir.mkdir(parents=True, exist_ok=True)
+        image.save(self._cell_path(row, col), 'PNG', compress_level=1)
+
+    def load_cell(self, row: int, col: int) -> Image.Image:
+        with Image.open(self._cell_path(row, col)) as image:
+            image.load()
+            return image
+
+    # a new page starts: cells of the previous one are not needed anymore
+    def clear_cells(self):
+        shutil.rmtree(self.cells_dir, ignore_errors=True)
+
+    # the run is complete
+    def delete(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _cell_path(self, row: int, col: int) -> Path:
+        return self.cells_dir / '{}_{}.png'.format(row, col)
@@ -0,0 +1,370 @@
+from pathlib import Path
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+
+# directories modified this recently (in seconds) may still change within the same mtime tick:
+# their listing is not trusted, they are listed again on the next scan
+MTIME_GRACE = 2
+# watch mode: delay between polls of a drained folder (in seconds), doubled after each poll finding nothing
+WATCH_POLL_MIN = 0.5
+WATCH_POLL_MAX = 30
+# persisted indexes not used for this long (in seconds) are removed
+INDEX_MAX_AGE = 30 * 24 * 3600
+
+
+# files of a folder matching glob-like patterns, found in a single os.scandir() traversal for all patterns
+# the listing of each directory is kept (and persisted, if a cache folder is given) along with its mtime:
+# later scans only list again the directories whose mtime changed, the others just being stat'ed
+# same results as glob (each pattern being prefixed with '**/' if recursive): '*' does not match names starting
+# with '.', and '**' does not traverse hidden directories, unless a pattern part starting with '.' matches them
+# symlinks are followed; files are sorted by folder (files of the root folder first), then by name
+class FolderIndex:
+    def __init__(
+        self, root: str, patterns: list[str], recursive: bool, cache_dir: str = None
+    ):
+        # do not resolve, to keep the paths relative to the given root
+        self.root = Path(root)
+        # relative to the root: if recursive, a pattern matches at any depth ('**')
+        self.patterns = [
+            ('**',) * recursive + Path(p.strip()).parts
+            for p in patterns
+            if p.strip() not in ('', '.')
+        ]
+        self.recursive = recursive
+        self.cache_path = None
+        if cache_dir:
+            key = json.dumps([os.path.abspath(root), self.patterns, recursive])
+            self.cache_path = Path(cache_dir) / '{}.json'.format(
+                hashlib.sha1(key.encode('utf-8')).hexdigest()
+            )
+        # relative dir ('/' separated, '' for the root) -> (mtime, matching file names, subdir names)
+        self.dirs = self._load()
+
+    def scan(self) -> list[Path]:
+        self._update(self._walk())
+        return self.files()
+
+    # scan again, only returning the files added to the directories listed again (modified ones), in order
+    # the cost does not depend on the nb of files of the unmodified directories
+    def scan_new(self) -> list[Path]:
+        old_dirs = self.dirs
+        dirs = self._walk()
+        self._update(dirs)
+        new_files = []
+        for rel_dir in sorted(dirs.keys(), key=self._dir_key):
+            files = dirs[rel_dir][1]
+            old = old_dirs.get(rel_dir)
+            # unmodified directories keep their previous listing, see _walk
+            if old and old[1] is files:
+                continue
+            old_files = set(old[1]) if old else set()
+            path = self._dir_path(rel_dir)
+            new_files += [path / name for name in files if name not in old_files]
+        return new_files
+
+    # full paths of the indexed files, in order
+    def files(self) -> list[Path]:
+        return [
+            self._dir_path(rel_dir) / name
+            for rel_dir in self.sorted_dirs()
+            for name in self.dirs[rel_dir][1]
+        ]
+
+    # relative dirs, in file order (same order as Path: by parts, case-insensitive on Windows)
+    def sorted_dirs(self) -> list[str]:
+        return sorted(self.dirs.keys(), key=self._dir_key)
+
+    @staticmethod
+    def _dir_key(rel_dir: str) -> list[str]:
+        return [os.path.normcase(part) for part in rel_dir.split('/') if part]
+
+    def _update(self, dirs: dict):
+        if dirs != self.dirs:
+            self.dirs = dirs
+            self._save()
+
+    def _walk(self) -> dict:
+        now = time.time_ns()
+        dirs = {}
+        # parent dirs of each dir, by (device, inode): symlinks may create loops
+        stack = [('', os.stat(self.root), ())]
+        while stack:
+            rel_dir, stat, parents = stack.pop()
+            dir_id = (stat.st_dev, stat.st_ino)
+            if dir_id in parents:
+                continue
+            path = self._dir_path(rel_dir)
+            cached = self.dirs.get(rel_dir)
+            if cached and cached[0] == stat.st_mtime_ns:
+                files, subdirs = cached[1], cached[2]
+                subdir_stats = []
+                for name in subdirs:
+                    try:
+                        subdir_stats.append((name, os.stat(path / name)))
+                    except OSError:
+                        continue
+            else:
+                files, subdir_stats = self._list_dir(path, rel_dir)
+                subdirs = [name for name, _ in subdir_stats]
+
+            # a directory modified during the scan may be listed incompletely: do not trust its mtime
+            mtime = stat.st_mtime_ns
+            if now - mtime < MTIME_GRACE * 1e9:
+                mtime = None
+            dirs[rel_dir] = (mtime, files, subdirs)
+
+            for subdir, subdir_stat in self._subdirs(rel_dir, subdir_stats):
+                stack.append((subdir, subdir_stat, parents + (dir_id,)))
+        return dirs
+
+    # subdirs to traverse (relative path, stat), in order: only those which may hold matching files
+    def _subdirs(self, rel_dir: str, subdir_stats: list[tuple]) -> list[tuple]:
+        parts = tuple(rel_dir.split('/')) if rel_dir else ()
+        return [
+            (rel_dir + '/' + name if rel_dir else name, stat)
+            for name, stat in sorted(subdir_stats, key=lambda s: os.path.normcase(s[0]))
+            if any(
+                self._match_parts(parts + (name,), pattern, True)
+                for pattern in self.patterns
+            )
+        ]
+
+    # matching file names, and subdirs with their stat (DirEntry stat info is cached by os.scandir)
+    def _list_dir(self, path: Path, rel_dir: str) -> tuple[list[str], list[tuple]]:
+        parts = tuple(rel_dir.split('/')) if rel_dir else ()
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            subdirs.append((entry.name, entry.stat()))
+                        elif entry.is_file() and self._match(parts + (entry.name,)):
+                            files.append(entry.name)
+                    except OSError:
+                        # broken symlink, or removed meanwhile
+                        continue
+        except OSError:
+            pass
+        files.sort()
+        return (files, subdirs)
+
+    # the relative path of a file matches a pattern
+    def _match(self, parts: tuple[str, ...]) -> bool:
+        return any(self._match_parts(parts, pattern) for pattern in self.patterns)
+
+    # parts of a relative path match the pattern parts, as glob does
+    # prefix: parts of a directory, which may hold matching files (the pattern has parts left)
+    def _match_parts(
+        self, parts: tuple[str, ...], pattern: tuple[str, ...], prefix: bool = False
+    ) -> bool:
+        if not parts:
+            return bool(pattern) if prefix else pattern in ((), ('**',))
+        if not pattern:
+            return False
+        if pattern[0] == '**' and self.recursive:
+            # any nb of non-hidden directories (or files, if last)
+            return self._match_parts(parts, pattern[1:], prefix) or (
+                not parts[0].startswith('.')
+                and self._match_parts(parts[1:], pattern, prefix)
+            )
+        return self._match_name(parts[0], pattern[0]) and self._match_parts(
+            parts[1:], pattern[1:], prefix
+        )
+
+    # a name without wildcards is matched as is, even if hidden
+    @staticmethod
+    def _match_name(name: str, pattern: str) -> bool:
+        if not glob.has_magic(pattern):
+            return os.path.normcase(name) == os.path.normcase(pattern)
+        return fnmatch.fnmatch(name, pattern) and (
+            pattern.startswith('.') or not name.startswith('.')
+        )
+
+    def _dir_path(self, rel_dir: str) -> Path:
+        return self.root.joinpath(*rel_dir.split('/')) if rel_dir else self.root
+
+    def _load(self) -> dict:
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as file:
+                dirs = {d: tuple(v) for d, v in json.load(file).items()}
+            # still in use, see _prune
+            os.utime(self.cache_path)
+            return dirs
+        except (OSError, ValueError):
+            return {}
+
+    # write then rename, so an interruption never leaves a truncated file
+    def _save(self):
+        if not self.cache_path:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(
+            '{}.{}.tmp'.format(self.cache_path.name, os.getpid())
+        )
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.dirs, file, separators=(',', ':'))
+        os.replace(tmp_path, self.cache_path)
+        self._prune()
+
+    # remove the indexes of other folders / patterns not used for a long time
+    def _prune(self):
+        now = time.time()
+        for path in self.cache_path.parent.glob('*.json'):
+            try:
+                if now - path.stat().st_mtime > INDEX_MAX_AGE:
+                    path.unlink()
+            except OSError:
+                continue
+
+
+# file list of a folder kept on disk instead of memory: the relative paths are appended to a blob, and their
+# end offsets (uint64) to another file, so any path is read in O(1), whatever the number of files
+# paths are added by a background thread, in a sorted depth-first traversal (same order as FolderIndex):
+# the first files can be used while the rest of the tree is still being indexed
+class LazyFolderIndex(FolderIndex):
+    def __init__(
+        self, root: str, patterns: list[str], recursive: bool, index_dir: str = None
+    ):
+        super().__init__(root, patterns, recursive)
+        # temp files are created there, rather than in a temp folder which may be in RAM
+        self.index_dir = index_dir
+        self.count = 0
+        self.blob_size = 0
+        self.done = False
+        self.closed = False
+        self.error = None
+        # guards the counters and the files, shared by the indexing thread and the readers
+        self.condition = threading.Condition()
+        self.offsets = None
+        self.paths = None
+
+    def start(self):
+        if self.index_dir:
+            os.makedirs(self.index_dir, exist_ok=True)
+        # deleted on close
+        self.offsets = tempfile.TemporaryFile(dir=self.index_dir)
+        self.paths = tempfile.TemporaryFile(dir=self.index_dir)
+        threading.Thread(target=self._index, daemon=True).start()
+
+    # wait until count paths are indexed, or all of them: returns the nb of paths indexed
+    def wait(self, count: int) -> int:
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.count >= count or self.done or self.closed
+            )
+            if self.error:
+                raise self.error
+            return self.count
+
+    def get(self, index: int) -> Path:
+        if index >= self.wait(index + 1):
+            raise IndexError('file index {} out of range'.format(index))
+        # same lock as close, so the files cannot be closed during the read
+        with self.condition:
+            if self.closed:
+                raise Exception('File index closed')
+            if index == 0:
+                start = 0
+                self.offsets.seek(0)
+                (end,) = struct.unpack('<Q', self.offsets.read(8))
+            else:
+                self.offsets.seek((index - 1) * 8)
+                start, end = struct.unpack('<2Q', self.offsets.read(16))
+            self.paths.seek(start)
+            rel_path = self.paths.read(end - start).decode('utf-8', 'surrogatepass')
+        return self._dir_path(rel_path)
+
+    # stop indexing (the traversal ends with the current directory) and delete the files
+    def close(self):
+        with self.condition:
+            self.closed = True
+            for file in (self.offsets, self.paths):
+                if file:
+                    file.close()
+            self.offsets = None
+            self.paths = None
+            self.condition.notify_all()
+
+    def _index(self):
+        try:
+            stack = [('', os.stat(self.root), ())]
+            while stack and not self.closed:
+                rel_dir, stat, parents = stack.pop()
+                dir_id = (stat.st_dev, stat.st_ino)
+                if dir_id in parents:
+                    continue
+                files, subdir_stats = self._list_dir(self._dir_path(rel_dir), rel_dir)
+                self._append(
+                    [rel_dir + '/' + name if rel_dir else name for name in files]
+                )
+                # depth-first: the last pushed subdir is traversed first
+                for subdir, subdir_stat in reversed(
+                    self._subdirs(rel_dir, subdir_stats)
+                ):
+                    stack.append((subdir, subdir_stat, parents + (dir_id,)))
+        except Exception as e:
+            self.error = e
+        finally:
+            with self.condition:
+                self.done = True
+                self.condition.notify_all()
+
+    def _append(self, rel_paths: list[str]):
+        if not rel_paths:
+            return
+        blob = bytearray()
+        ends = []
+        for rel_path in rel_paths:
+            blob += rel_path.encode('utf-8', 'surrogatepass')
+            ends.append(self.blob_size + len(blob))
+        with self.condition:
+            if self.closed:
+                return
+            self.paths.seek(0, os.SEEK_END)
+            self.paths.write(blob)
+            self.paths.flush()
+            self.offsets.seek(0, os.SEEK_END)
+            self.offsets.write(struct.pack('<{}Q'.format(len(ends)), *ends))
+            self.offsets.flush()
+            self.blob_size += len(blob)
+            self.count += len(ends)
+            self.condition.notify_all()
+
+
+# files of a folder, watched for new ones: the folder is scanned again on demand (poll), only the directories
+# modified since the previous scan being listed again; new files are appended to the list, so the indexes
+# of the files already listed never change (removed files are kept)
+class FolderWatch:
+    def __init__(
+        self, root: str, patterns: list[str], recursive: bool, cache_dir: str = None
+    ):
+        self.index = FolderIndex(root, patterns, recursive, cache_dir)
+        self.files = self.index.scan()
+        self.known = set(self.files)
+        self.delay = WATCH_POLL_MIN
+
+    # nb of new files found
+    def poll(self) -> int:
+        new_files = [file for file in self.index.scan_new() if file not in self.known]
+        self.files.extend(new_files)
+        self.known.update(new_files)
+        if new_files:
+            self.delay = WATCH_POLL_MIN
+        return len(new_files)
+
+    # the folder is drained: delay before polling it again (in seconds), doubled each time until files land
+    def backoff(self) -> float:
+        delay = self.delay
+        self.delay = min(self.delay * 2, WATCH_POLL_MAX)
+        return delay
@@ -1,13 +1,317 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageColor, ImageDraw, ImageFont
 from pathlib import Path
+from collections import OrderedDict
 import textwrap
 import math
-from dataclasses import asdict
+import threading
+from dataclasses import asdict, dataclass
+import numpy as np
 
 from .plot_data import PlotConfigGridData, PlotConfigHFData, PlotVars
+from .cell_store import CellStore
+from .png_writer import PngWriter
 
 STATIC_DIR = (Path(__file__).parent.parent.parent.parent / 'static').resolve()
 
+# process-wide caches, shared by all grids and pages
+FONT_CACHE_SIZE = 32
+TEXT_CACHE_SIZE = 2048
+# (path, size) -> (mtime, font)
+font_cache = OrderedDict()
+# (text, font path, font mtime, font size, align, anchor, subpixel offset) -> (offset, mask)
+text_cache = OrderedDict()
+cache_lock = threading.Lock()
+
+
+def cache_get(cache: OrderedDict, key):
+    with cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def cache_set(cache: OrderedDict, key, value, max_size: int):
+    with cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+
+
+# load a TTF font, either one of the shipped fonts or a full path
+# fonts are cached, and reloaded if the file has been modified
+def load_font(font_name: str, font_size: int) -> ImageFont.FreeTypeFont:
+    full_path = (
+        STATIC_DIR / font_name if not Path(font_name).is_absolute() else Path(font_name)
+    )
+    try:
+        full_path = full_path.resolve(strict=True)
+        mtime = full_path.stat().st_mtime_ns
+    except:
+        raise Exception("TTF font not found: '{}'".format(full_path))
+
+    key = (str(full_path), font_size)
+    cached = cache_get(font_cache, key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    font = ImageFont.truetype(str(full_path), size=font_size)
+    # part of the text cache key, so texts are rendered again with a modified font
+    font.mtime = mtime
+    cache_set(font_cache, key, (mtime, font), FONT_CACHE_SIZE)
+    return font
+
+
+# same as ImageDraw.multiline_text(), but the rasterized text is cached as a mask,
+# so identical texts (e.g. headers repeated on each page) are only rendered once
+def draw_text(
+    image: Image.Image,
+    pos: tuple[float, float],
+    text: str,
+    font: ImageFont.FreeTypeFont,
+    color: str,
+    align: str = 'center',
+    anchor: str = 'mm',
+):
+    if not text:
+        return
+    # the subpixel part of the position changes the rendering, so it is part of the key
+    origin = (math.floor(pos[0]), math.floor(pos[1]))
+    subpixel = (pos[0] - origin[0], pos[1] - origin[1])
+    key = (
+        text,
+        font.path,
+        getattr(font, 'mtime', None),
+        font.size,
+        align,
+        anchor,
+        subpixel,
+    )
+    cached = cache_get(text_cache, key)
+    if cached is None:
+        # see: https://github.com/python-pillow/Pillow/discussions/7914#discussioncomment-8950499
+        # text anchors: https://pillow.readthedocs.io/en/stable/handbook/text-anchors.html
+        left, top, right, bottom = ImageDraw.Draw(
+            Image.new('L', (1, 1))
+        ).multiline_textbbox(subpixel, text, font=font, align=align, anchor=anchor)
+        offset = (math.floor(left), math.floor(top))
+        mask = Image.new(
+            'L', (math.ceil(right) - offset[0], math.ceil(bottom) - offset[1])
+        )
+        ImageDraw.Draw(mask).multiline_text(
+            (subpixel[0] - offset[0], subpixel[1] - offset[1]),
+            text,
+            font=font,
+            fill=255,
+            align=align,
+            anchor=anchor,
+        )
+        cached = (offset, mask)
+        cache_set(text_cache, key, cached, TEXT_CACHE_SIZE)
+
+    offset, mask = cached
+    image.paste(
+        ImageColor.getcolor(color, image.mode),
+        (origin[0] + offset[0], origin[1] + offset[1]),
+        mask,
+    )
+
+
+def create_image(size: tuple[int, int], bg_color: str) -> Image.Image:
+    if bg_color == 'transparent':
+        image = Image.new('RGBA', (size[0], size[1]))
+    else:
+        image = Image.new(
+            'RGB',
+            (size[0], size[1]),
+            color=bg_color,
+        )
+    return image
+
+
+# position of each column / row along an axis, from their sizes
+def track_offsets(sizes: list[int], gap: int) -> list[int]:
+    offsets = []
+    pos = 0
+    for size in sizes:
+        offsets.append(pos)
+        pos += size + gap
+    return offsets
+
+
+# total length of columns / rows along an axis
+def tracks_length(sizes: list[int], gap: int) -> int:
+    return sum(sizes) + (len(sizes) - 1) * gap
+
+
+# cells area of a grid page (without headers): the canvas is allocated as soon as the
+# cell size is known, then each image is pasted as it arrives, so it can be freed right away
+# cell_sizes: (col widths, row heights)
+# packed: each column / row is as large as its largest image, instead of all cells being as large as the largest one
+class GridCanvas:
+    def __init__(
+        self,
+        dims: tuple[int, int],
+        gap: int,
+        bg_color: str,
+        cell_sizes: tuple[list[int], list[int]] = None,
+        packed: bool = False,
+    ):
+        self.dims = dims  # (cols, rows)
+        self.gap = gap
+        self.bg_color = bg_color
+        self.packed = packed
+        self.col_widths = None
+        self.row_heights = None
+        self.image = None
+        # keep track of pasted image sizes, to move them if the canvas has to grow
+        self.image_sizes = {}
+        if cell_sizes:
+            self._allocate(*cell_sizes)
+
+    def paste(self, col: int, row: int, image: Image.Image):
+        col_widths, row_heights = self._fit(col, row, image.size)
+        if self.image is None:
+            self._allocate(col_widths, row_heights)
+        elif col_widths != self.col_widths or row_heights != self.row_heights:
+            self._grow(col_widths, row_heights)
+        if (col, row) in self.image_sizes:
+            # cell added again: clear the previous image, which may be bigger
+            size = self.image_sizes[(col, row)]
+            self.image.paste(
+                create_image(size, self.bg_color), self.cell_pos(col, row, size)
+            )
+        self.image.paste(image, self.cell_pos(col, row, image.size))
+        self.image_sizes[(col, row)] = image.size
+
+    # image pasted in a cell
+    def get(self, col: int, row: int) -> Image.Image:
+        size = self.image_sizes[(col, row)]
+        x, y = self.cell_pos(col, row, size)
+        return self.image.crop((x, y, x + size[0], y + size[1])).convert('RGB')
+
+    # top-left position of an image in the canvas, centered in its cell
+    def cell_pos(
+        self,
+        col: int,
+        row: int,
+        image_size: tuple[int, int],
+        offsets: tuple[list[int], list[int]] = None,
+    ) -> tuple[int, int]:
+        col_x, row_y = offsets or self.offsets
+        return (
+            col_x[col] + int((self.col_widths[col] - image_size[0]) / 2),
+            row_y[row] + int((self.row_heights[row] - image_size[1]) / 2),
+        )
+
+    # column / row sizes needed to hold an image in a cell
+    def _fit(
+        self, col: int, row: int, size: tuple[int, int]
+    ) -> tuple[list[int], list[int]]:
+        cols, rows = self.dims
+        col_widths = list(self.col_widths or [0] * cols)
+        row_heights = list(self.row_heights or [0] * rows)
+        if self.packed:
+            col_widths[col] = max(col_widths[col], size[0])
+            row_heights[row] = max(row_heights[row], size[1])
+        else:
+            col_widths = [max(col_widths[0], size[0])] * cols
+            row_heights = [max(row_heights[0], size[1])] * rows
+        return (col_widths, row_heights)
+
+    def _allocate(self, col_widths: list[int], row_heights: list[int]):
+        self.col_widths = col_widths
+        self.row_heights = row_heights
+        self.offsets = (
+            track_offsets(col_widths, self.gap),
+            track_offsets(row_heights, self.gap),
+        )
+        self.image = create_image(
+            (tracks_length(col_widths, self.gap), tracks_length(row_heights, self.gap)),
+            self.bg_color,
+        )
+
+    # a bigger image has been received: reallocate and move the already pasted ones
+    # (in packed mode, this happens each time a column or a row grows)
+    def _grow(self, col_widths: list[int], row_heights: list[int]):
+        old_image, old_offsets = self.image, self.offsets
+        old_sizes = (self.col_widths, self.row_heights)
+        self._allocate(col_widths, row_heights)
+        for (col, row), size in self.image_sizes.items():
+            x, y = (
+                old_offsets[0][col] + int((old_sizes[0][col] - size[0]) / 2),
+                old_offsets[1][row] + int((old_sizes[1][row] - size[1]) / 2),
+            )
+            self.image.paste(
+                old_image.crop((x, y, x + size[0], y + size[1])),
+                self.cell_pos(col, row, size),
+            )
+
+
+# position and size of all grid elements, to render the grid in parts
+@dataclass
+class GridLayout:
+    col_widths: list[int]
+    row_heights: list[int]
+    dims: tuple[int, int]  # (cols, rows)
+    gap: int
+    font: ImageFont.FreeTypeFont
+    margins: tuple[int, int]  # (top, left), for col / row headers
+    header: tuple[int, Image.Image]  # page header (height, image)
+    footer: tuple[int, Image.Image]  # page footer (height, image)
+
+    def __post_init__(self):
+        # position of columns / rows in the cells area
+        self.col_x = track_offsets(self.col_widths, self.gap)
+        self.row_y = track_offsets(self.row_heights, self.gap)
+
+    @property
+    def cells_size(self) -> tuple[int, int]:
+        return (
+            tracks_length(self.col_widths, self.gap),
+            tracks_length(self.row_heights, self.gap),
+        )
+
+    @property
+    def cells_origin(self) -> tuple[int, int]:
+        return (self.margins[1], self.header[0] + self.margins[0])
+
+    @property
+    def size(self) -> tuple[int, int]:
+        cells_size = self.cells_size
+        return (
+            cells_size[0] + self.margins[1],
+            self.header[0] + self.margins[0] + cells_size[1] + self.footer[0],
+        )
+
+    # position of an image in the page, centered in its cell
+    def cell_pos(
+        self, col: int, row: int, image_size: tuple[int, int]
+    ) -> tuple[int, int]:
+        return (
+            self.cells_origin[0]
+            + self.col_x[col]
+            + int((self.col_widths[col] - image_size[0]) / 2),
+            self.cells_origin[1]
+            + self.row_y[row]
+            + int((self.row_heights[row] - image_size[1]) / 2),
+        )
+
+    # horizontal bands covering the page: headers, each row of cells (with gap), footer
+    def bands(self) -> list[tuple[int, int]]:
+        bands = []
+        y = 0
+        if self.cells_origin[1] > 0:
+            bands.append((0, self.cells_origin[1]))
+            y = self.cells_origin[1]
+        for row in range(self.dims[1]):
+            height = self.row_heights[row] + (self.gap if row < self.dims[1] - 1 else 0)
+            bands.append((y, y + height))
+            y += height
+        if self.footer[0] > 0:
+            bands.append((y, y + self.footer[0]))
+        return bands
+
 
 class Grid:
     def __init__(
@@ -24,33 +328,40 @@ class Grid:
 
     def make(
         self,
-        image_matrix: list[list[Image.Image]],
+        cells: CellStore,
         col_headers: list[str],
         row_headers: list[str],
         plot_vars: PlotVars,
     ) -> Image.Image:
-        # keep a track to reuse later
-        self.headers = (col_headers, row_headers)
-        self.dims = (len(col_headers), len(row_headers))
-        cols, rows = self.dims
-        self.max_cell_size = self._calc_max_cell_size(image_matrix)
+        dims = (len(col_headers), len(row_headers))
 
         # build the grid image
-        grid_size = (
-            self.max_cell_size[0] * cols + (cols - 1) * self.config_grid.gap,
-            self.max_cell_size[1] * rows + (rows - 1) * self.config_grid.gap,
+        canvas = GridCanvas(
+            dims,
+            self.config_grid.gap,
+            self.config_grid.background_color,
+            self._calc_cell_sizes(cells, dims),
+            self.packed,
         )
-        grid_image = self._create_image(grid_size, self.config_grid.background_color)
+        # images are loaded one at a time, as they may have been spilled to disk
+        for r, c in cells.keys():
+            canvas.paste(c, r, cells.get(r, c))
 
-        for r, row in enumerate(image_matrix):
-            for c, image in enumerate(row):
-                x = c * (self.max_cell_size[0] + self.config_grid.gap) + int(
-                    (self.max_cell_size[0] - image.size[0]) / 2
-                )
-                y = r * (self.max_cell_size[1] + self.config_grid.gap) + int(
-                    (self.max_cell_size[1] - image.size[1]) / 2
-                )
-                grid_image.paste(image, (x, y))
+        return self.finish(canvas, col_headers, row_headers, plot_vars)
+
+    # add headers and page header / footer to an already filled canvas
+    def finish(
+        self,
+        canvas: GridCanvas,
+        col_headers: list[str],
+        row_headers: list[str],
+        plot_vars: PlotVars,
+    ) -> Image.Image:
+        # keep a track to reuse later
+        self.headers = (col_headers, row_headers)
+        self.dims = (len(col_headers), len(row_headers))
+        self.cell_sizes = (canvas.col_widths, canvas.row_heights)
+        grid_image = canvas.image
 
         # add headers; if header format for dim1/dim2 is empty, they will be silently ignored
         grid_image = self._add_headers(grid_image)
@@ -60,31 +371,240 @@ class Grid:
 
         return grid_image
 
-    def _calc_max_cell_size(
-        self, image_matrix: list[list[Image.Image]]
-    ) -> tuple[int, int]:
-        # scan all images to get max width / max height
-        max_size = (-1, -1)
-        # TODO: allow different row heights / col widths?
-        for row in image_matrix:
-            for image in row:
-                w, h = image.size
-                max_size = (max(max_size[0], w), max(max_size[1], h))
-
-        return max_size
+    # same result as make(), but written directly into a preallocated float32 array (H, W, C),
+    # ready to be wrapped as tensor: only the header strips are rendered with PIL,
+    # cells are copied by slice assignment
+    def make_array(
+        self,
+        cells: CellStore,
+        col_headers: list[str],
+        row_headers: list[str],
+        plot_vars: PlotVars,
+    ) -> np.ndarray:
+        layout = self._prepare_layout(
+            self._calc_cell_sizes(cells, (len(col_headers), len(row_headers))),
+            col_headers,
+            row_headers,
+            plot_vars,
+        )
+        width, height = layout.size
+        top_margin, left_margin = layout.margins
+        header_height, header_image = layout.header
+        footer_height, footer_image = layout.footer
+        bg_color = self.config_grid.background_color
 
-    def _create_image(self, size: tuple[int, int], bg_color: str) -> Image.Image:
+        # allocate the grid, filled with background color
         if bg_color == 'transparent':
-            image = Image.new('RGBA', (size[0], size[1]))
+            grid = np.zeros((height, width, 4), dtype=np.float32)
+        else:
+            grid = np.empty((height, width, 3), dtype=np.float32)
+            grid[:, :] = np.array(ImageColor.getrgb(bg_color)[:3], np.float32) / 255.0
+
+        # headers strips
+        if top_margin > 0:
+            strip = self._create_image((width, top_margin), bg_color)
+            self._draw_col_headers(strip, layout.font, layout.margins)
+            self._paste_array(grid, strip, (0, header_height))
+        if left_margin > 0:
+            strip = self._create_image((left_margin, layout.cells_size[1]), bg_color)
+            self._draw_row_headers(strip, layout.font, layout.margins, (0, top_margin))
+            self._paste_array(grid, strip, (0, layout.cells_origin[1]))
+
+        # page header / footer
+        if header_image:
+            self._paste_array(grid, header_image, (0, 0))
+        if footer_image:
+            self._paste_array(grid, footer_image, (0, height - footer_height))
+
+        # cells, loaded one at a time
+        for r, c in cells.keys():
+            image = cells.get(r, c)
+            self._paste_array(grid, image, layout.cell_pos(c, r, image.size))
+
+        return grid
+
+    # stream the grid to a PNG file, one band (row of cells) at a time, so the full grid is never held in memory
+    # cells are taken either from the cell store or from the canvas (incremental compositing)
+    # returns a downscaled preview of the grid
+    def write_png(
+        self,
+        path: str,
+        col_headers: list[str],
+        row_headers: list[str],
+        plot_vars: PlotVars,
+        cells: CellStore = None,
+        canvas: GridCanvas = None,
+        preview_size: int = 1024,
+    ) -> Image.Image:
+        layout = self.make_layout(col_headers, row_headers, plot_vars, cells, canvas)
+        width, height = layout.size
+        mode = 'RGBA' if self.config_grid.background_color == 'transparent' else 'RGB'
+
+        scale = min(1, preview_size / max(width, height))
+        preview_width = max(1, int(width * scale))
+        preview = self._create_image(
+            (preview_width, max(1, int(height * scale))),
+            self.config_grid.background_color,
+        )
+
+        with PngWriter(path, (width, height), mode) as writer:
+            for y0, y1 in layout.bands():
+                band = self.render_region(layout, (0, y0, width, y1), cells, canvas)
+                writer.write(band)
+                preview_y0, preview_y1 = int(y0 * scale), int(y1 * scale)
+                if preview_y1 > preview_y0:
+                    preview.paste(
+                        band.resize(
+                            (preview_width, preview_y1 - preview_y0),
+                            Image.Resampling.BILINEAR,
+                            reducing_gap=2.0,
+                        ),
+                        (0, preview_y0),
+                    )
+
+        return preview
+
+    # layout of the page, for cells taken either from the cell store or from the canvas,
+    # or for a given cell size, the same for all cells (estimates)
+    def make_layout(
+        self,
+        col_headers: list[str],
+        row_headers: list[str],
+        plot_vars: PlotVars,
+        cells: CellStore = None,
+        canvas: GridCanvas = None,
+        cell_size: tuple[int, int] = None,
+    ) -> GridLayout:
+        dims = (len(col_headers), len(row_headers))
+        if cell_size:
+            cell_sizes = ([cell_size[0]] * dims[0], [cell_size[1]] * dims[1])
+        elif canvas:
+            cell_sizes = (canvas.col_widths, canvas.row_heights)
         else:
-            image = Image.new(
-                'RGB',
-                (size[0], size[1]),
-                color=bg_color,
+            cell_sizes = self._calc_cell_sizes(cells, dims)
+        return self._prepare_layout(cell_sizes, col_headers, row_headers, plot_vars)
+
+    # render a part of the grid, box being (x0, y0, x1, y1) in page coordinates
+    # cells are taken either from the cell store or from the canvas (incremental compositing)
+    def render_region(
+        self,
+        layout: GridLayout,
+        box: tuple[int, int, int, int],
+        cells: CellStore = None,
+        canvas: GridCanvas = None,
+    ) -> Image.Image:
+        x0, y0, x1, y1 = box
+        image = self._create_image(
+            (x1 - x0, y1 - y0), self.config_grid.background_color
+        )
+
+        # cells
+        if canvas:
+            image.paste(
+                canvas.image,
+                (layout.cells_origin[0] - x0, layout.cells_origin[1] - y0),
+            )
+        elif cells is not None:
+            for r, c in cells.keys():
+                cell_w, cell_h = layout.col_widths[c], layout.row_heights[r]
+                cell_x, cell_y = layout.cell_pos(c, r, (cell_w, cell_h))
+                if (
+                    cell_x < x1
+                    and cell_x + cell_w > x0
+                    and cell_y < y1
+                    and cell_y + cell_h > y0
+                ):
+                    cell = cells.get(r, c)
+                    pos = layout.cell_pos(c, r, cell.size)
+                    image.paste(cell, (pos[0] - x0, pos[1] - y0))
+
+        # headers: texts outside the region are clipped
+        header_height = layout.header[0]
+        top_margin, left_margin = layout.margins
+        if top_margin > 0 and y0 < header_height + top_margin and y1 > header_height:
+            self._draw_col_headers(
+                image, layout.font, layout.margins, (x0, y0 - header_height)
             )
+        if left_margin > 0 and x0 < left_margin:
+            self._draw_row_headers(
+                image, layout.font, layout.margins, (x0, y0 - header_height)
+            )
+
+        # page header / footer
+        footer_height, footer_image = layout.footer
+        if layout.header[1] and y0 < header_height:
+            image.paste(layout.header[1], (-x0, -y0))
+        if footer_image and y1 > layout.size[1] - footer_height:
+            image.paste(footer_image, (-x0, layout.size[1] - footer_height - y0))
+
         return image
 
-    def _add_headers(self, grid_image: Image.Image):
+    # calculate the layout, and render the page header / footer
+    # cell_sizes: (col widths, row heights)
+    def _prepare_layout(
+        self,
+        cell_sizes: tuple[list[int], list[int]],
+        col_headers: list[str],
+        row_headers: list[str],
+        plot_vars: PlotVars,
+    ) -> GridLayout:
+        self.headers = (col_headers, row_headers)
+        self.dims = (len(col_headers), len(row_headers))
+        self.cell_sizes = cell_sizes
+        font, margins = self._prepare_headers()
+        layout = GridLayout(
+            *cell_sizes,
+            self.dims,
+            self.config_grid.gap,
+            font,
+            margins,
+            (0, None),
+            (0, None),
+        )
+        width = layout.size[0]
+        layout.header = self._draw_page_hf(width, plot_vars, self.config_header)
+        layout.footer = self._draw_page_hf(width, plot_vars, self.config_footer)
+        return layout
+
+    # copy a PIL image into a float array (H, W, C), with the same rules as Image.paste()
+    def _paste_array(self, grid: np.ndarray, image: Image.Image, pos: tuple[int, int]):
+        frame = np.asarray(image)
+        if frame.ndim == 2:
+            frame = np.repeat(frame[:, :, np.newaxis], 3, axis=2)
+        h, w = frame.shape[:2]
+        channels = min(frame.shape[2], grid.shape[2])
+        region = grid[pos[1] : pos[1] + h, pos[0] : pos[0] + w, :channels]
+        region[...] = frame[..., :channels]
+        np.divide(region, 255.0, out=region)
+        # RGB image on RGBA grid: opaque
+        if channels < grid.shape[2]:
+            grid[pos[1] : pos[1] + h, pos[0] : pos[0] + w, channels:] = 1.0
+
+    # (col widths, row heights), in a single scan of the image sizes: the max width / height of each column / row,
+    # or of all cells if not packed
+    def _calc_cell_sizes(
+        self, cells: CellStore, dims: tuple[int, int]
+    ) -> tuple[list[int], list[int]]:
+        col_widths = [0] * dims[0]
+        row_heights = [0] * dims[1]
+        for r, c in cells.keys():
+            w, h = cells.size(r, c)
+            col_widths[c] = max(col_widths[c], w)
+            row_heights[r] = max(row_heights[r], h)
+
+        if not self.packed:
+            col_widths = [max(col_widths)] * dims[0]
+            row_heights = [max(row_heights)] * dims[1]
+        return (col_widths, row_heights)
+
+    @property
+    def packed(self) -> bool:
+        return self.config_grid.cell_layout == 'packed'
+
+    def _create_image(self, size: tuple[int, int], bg_color: str) -> Image.Image:
+        return create_image(size, bg_color)
+
+    def _prepare_headers(self) -> tuple[ImageFont, tuple[int, int]]:
         # normalize the headers, to respect the wrap configs
         self.headers = (
             self._normalize_headers(self.headers[0], self.config_grid.wrap_col_headers),
@@ -95,55 +615,74 @@ class Grid:
         font = self._load_font(self.config_grid.font, self.config_grid.font_size)
 
         # calculate height and width of headers at top and left
-        top_margin, left_margin = self._calc_headers_margins(font)
+        margins = self._calc_headers_margins(font)
+
+        return (font, margins)
+
+    def _add_headers(self, grid_image: Image.Image):
+        font, margins = self._prepare_headers()
+        top_margin, left_margin = margins
 
         # build the new image and paste the existing grid
         image = self._create_image(
             (grid_image.size[0] + left_margin, grid_image.size[1] + top_margin),
             self.config_grid.background_color,
         )
-        draw = ImageDraw.Draw(image)
-        draw.font = font
         image.paste(
             grid_image,
             (image.size[0] - grid_image.size[0], image.size[1] - grid_image.size[1]),
         )
 
         # add the headers
+        self._draw_col_headers(image, font, margins)
+        self._draw_row_headers(image, font, margins)
+        return image
+
+    # origin: position of the drawing area in the grid with headers (without page header)
+    def _draw_col_headers(
+        self,
+        image: Image.Image,
+        font: ImageFont,
+        margins: tuple[int, int],
+        origin: tuple[int, int] = (0, 0),
+    ):
+        top_margin, left_margin = margins
+        col_widths = self.cell_sizes[0]
+        col_x = track_offsets(col_widths, self.config_grid.gap)
         for col, header in enumerate(self.headers[0]):
-            pos_x = (
-                left_margin
-                + col * (self.config_grid.gap + self.max_cell_size[0])
-                + self.max_cell_size[0] / 2
-            )
+            pos_x = left_margin + col_x[col] + col_widths[col] / 2
             pos_y = top_margin / 2
             self._draw_header(
-                draw, (pos_x, pos_y), header, font, self.config_grid.font_color
+                image,
+                (pos_x - origin[0], pos_y - origin[1]),
+                header,
+                font,
+                self.config_grid.font_color,
             )
+
+    def _draw_row_headers(
+        self,
+        image: Image.Image,
+        font: ImageFont,
+        margins: tuple[int, int],
+        origin: tuple[int, int] = (0, 0),
+    ):
+        top_margin, left_margin = margins
+        row_heights = self.cell_sizes[1]
+        row_y = track_offsets(row_heights, self.config_grid.gap)
         for row, header in enumerate(self.headers[1]):
             pos_x = left_margin / 2
-            pos_y = (
-                top_margin
-                + row * (self.config_grid.gap + self.max_cell_size[1])
-                + self.max_cell_size[1] / 2
-            )
+            pos_y = top_margin + row_y[row] + row_heights[row] / 2
             self._draw_header(
-                draw, (pos_x, pos_y), header, font, self.config_grid.font_color
+                image,
+                (pos_x - origin[0], pos_y - origin[1]),
+                header,
+                font,
+                self.config_grid.font_color,
             )
-        return image
 
     def _load_font(self, font_name: str, font_size: int) -> ImageFont:
-        full_path = (
-            STATIC_DIR / font_name
-            if not Path(font_name).is_absolute()
-            else Path(font_name)
-        )
-        try:
-            full_path = full_path.resolve(strict=True)
-        except:
-            raise Exception("TTF font not found: '{}'".format(full_path))
-        font = ImageFont.truetype(str(full_path), size=font_size)
-        return font
+        return load_font(font_name, font_size)
 
     def _normalize_headers(self, headers: list[str], wrap: int) -> list[str]:
         normalized = []
@@ -179,16 +718,13 @@ class Grid:
 
     def _draw_header(
         self,
-        draw: ImageDraw,
+        image: Image.Image,
         pos: tuple[int, int],
         text: str,
         font: ImageFont,
         font_color,
     ):
-        # see: https://github.com/python-pillow/Pillow/discussions/7914#discussioncomment-8950499
-        draw.multiline_text(
-            pos, text, font=font, fill=font_color, align='center', anchor='mm'
-        )
+        draw_text(image, pos, text, font, font_color, align='center', anchor='mm')
 
     def _add_page_hf(self, grid_image: Image.Image, plot_vars: PlotVars) -> Image.Image:
         grid_width, grid_height = grid_image.size
@@ -252,18 +788,13 @@ class Grid:
         ]
 
         # draw the texts
-        draw = ImageDraw.Draw(image)
-        draw.font = font
         for i, text in enumerate(texts):
-            if not text:
-                continue
-            # see: https://github.com/python-pillow/Pillow/discussions/7914#discussioncomment-8950499
-            # text anchors: https://pillow.readthedocs.io/en/stable/handbook/text-anchors.html
-            draw.multiline_text(
+            draw_text(
+                image,
                 texts_pos[i][0],
                 text,
-                font=font,
-                fill=config.font_color,
+                font,
+                config.font_color,
                 align=texts_pos[i][1],
                 anchor=texts_pos[i][2],
             )
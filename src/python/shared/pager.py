@@ -1,13 +1,20 @@
 from types import SimpleNamespace
+from PIL import Image
+import time
+import numpy as np
 import torch  # type: ignore
-from .utils import tensor_to_pillow, pillow_to_tensor
+from .utils import tensor_to_pillow, pillow_to_tensor, downscale_image
 from .plot_data import (
     XYPlotQueueData,
     PlotConfigGridData,
     PlotConfigHFData,
+    PlotConfigRenderData,
     PlotVars,
 )
-from .grid import Grid
+from .grid import Grid, GridCanvas, create_image
+from .cell_store import image_nbytes, make_cell_store
+from .tiles import TiledPage
+from .checkpoint import PlotCheckpoint
 
 
 class Pager:
@@ -16,61 +23,219 @@ class Pager:
         xy_plot_data: XYPlotQueueData,
         header_formats: tuple[str, str],
         dim1_as_rows: bool = True,
+        plot_config_grid: PlotConfigGridData = PlotConfigGridData(),
+        plot_config_render: PlotConfigRenderData = PlotConfigRenderData(),
+        checkpoint: PlotCheckpoint = None,
     ):
         self.dim1_as_rows = dim1_as_rows
+        self.checkpoint = checkpoint
+        self.plot_config_render = plot_config_render
         self.header_formats = header_formats
+        # page of the run the pager is for
+        self.page = (xy_plot_data.run_id, xy_plot_data.current_page)
+        # headers are stored by index, as cells may arrive in any order
         self.dim1 = SimpleNamespace(
-            **{'length': xy_plot_data.dim1.length, 'headers': []}
+            **{
+                'length': xy_plot_data.dim1.length,
+                'headers': self._make_headers(xy_plot_data.dim1, 'dim1', 0),
+            }
         )
         self.dim2 = SimpleNamespace(
-            **{'length': xy_plot_data.dim2.length, 'headers': []}
+            **{
+                'length': xy_plot_data.dim2.length,
+                'headers': self._make_headers(xy_plot_data.dim2, 'dim2', 1),
+            }
         )
-        # initialize the 2D list
+        # grid dimensions, as (rows, cols)
         if dim1_as_rows:
-            self.image_matrix = [
-                [None] * self.dim2.length for i in range(self.dim1.length)
-            ]
+            self.dims = (self.dim1.length, self.dim2.length)
+        else:
+            self.dims = (self.dim2.length, self.dim1.length)
+        # completion bitmap, by (row, col): adding a cell again just replaces its image
+        self.filled = np.zeros(self.dims, dtype=bool)
+
+        # max cell size: the page megapixels budget is shared by all cells
+        self.max_cell_size = (
+            plot_config_grid.max_cell_width,
+            plot_config_grid.max_cell_height,
+        )
+        self.max_cell_pixels = int(
+            plot_config_grid.max_page_megapixels * 1e6 / self.expected
+        )
+
+        # incremental compositing: images are pasted into the canvas as they arrive
+        # deferred compositing: images are kept in the cell store until the page is complete
+        self.canvas = None
+        self.cells = None
+        if plot_config_render.compositing == 'incremental':
+            self.canvas = GridCanvas(
+                (self.dims[1], self.dims[0]),
+                plot_config_grid.gap,
+                plot_config_grid.background_color,
+                packed=plot_config_grid.cell_layout == 'packed',
+            )
         else:
-            self.image_matrix = [
-                [None] * self.dim1.length for i in range(self.dim2.length)
-            ]
-        self.accumulated = 0
+            self.cells = make_cell_store(plot_config_render)
+
+        # progress previews: a thumbnail of each cell is kept as it arrives, so a low-res partial grid
+        # can be built without touching the full size images
+        self.bg_color = plot_config_grid.background_color
+        self.thumbnails = None
+        if (
+            plot_config_render.progress_seconds > 0
+            or plot_config_render.progress_cells > 0
+        ):
+            self.thumbnails = {}
+            self.thumbnail_size = (
+                max(1, plot_config_render.preview_size // self.dims[1]),
+                max(1, plot_config_render.preview_size // self.dims[0]),
+            )
+        # time and nb of cells of the last preview
+        self.last_preview = (time.monotonic(), 0)
 
     @property
     def expected(self) -> int:
         return self.dim1.length * self.dim2.length
 
+    # nb of distinct cells received
+    @property
+    def accumulated(self) -> int:
+        return int(self.filled.sum())
+
     @property
     def complete(self) -> bool:
-        return self.accumulated >= self.expected
+        return bool(self.filled.all())
 
-    # calculate the coordinates in dim1 and dim2, given a sequential index
-    def get_coords(self, index: int) -> tuple[int, int]:
+    # grid coordinates (row, col), given the dim1 and dim2 indexes
+    def get_coords(self, dim1_index: int, dim2_index: int) -> tuple[int, int]:
         if self.dim1_as_rows:
-            return (int(index / self.dim2.length), int(index % self.dim2.length))
+            return (dim1_index, dim2_index)
         else:
-            return (int(index % self.dim2.length), int(index / self.dim2.length))
+            return (dim2_index, dim1_index)
 
+    # add one image, or a batch of images (one per cell, along dim2)
+    # the batch may also be a list of images, when their sizes differ
     def add(self, xy_plot_data: XYPlotQueueData, tensor: torch.Tensor):
-        # store dim1 / dim2 headers if not known yet
-        # TODO: catch exception and set default header?
-        if xy_plot_data.dim1.index >= len(self.dim1.headers):
-            self.dim1.headers.append(
-                self.header_formats[0].format(dim1=xy_plot_data.dim1.value)
+        batch = self.batch_values(xy_plot_data, tensor)
+        if (
+            not 0 <= xy_plot_data.dim1.index < self.dim1.length
+            or not 0 <= xy_plot_data.dim2.index
+            or xy_plot_data.dim2.index + len(batch) > self.dim2.length
+        ):
+            raise Exception(
+                'XY Plot: cell ({}, {}) is out of the current page ({} x {})'.format(
+                    xy_plot_data.dim1.index,
+                    xy_plot_data.dim2.index,
+                    self.dim1.length,
+                    self.dim2.length,
+                )
             )
-        if xy_plot_data.dim2.index >= len(self.dim2.headers):
-            self.dim2.headers.append(
-                self.header_formats[1].format(dim2=xy_plot_data.dim2.value)
+
+        # store dim1 / dim2 headers if not known yet (values of the page not sent)
+        # TODO: catch exception and set default header?
+        if self.dim1.headers[xy_plot_data.dim1.index] is None:
+            self.dim1.headers[xy_plot_data.dim1.index] = self.header_formats[0].format(
+                dim1=xy_plot_data.dim1.value
             )
+        for i, value in enumerate(batch):
+            if self.dim2.headers[xy_plot_data.dim2.index + i] is None:
+                self.dim2.headers[xy_plot_data.dim2.index + i] = self.header_formats[
+                    1
+                ].format(dim2=value)
 
-        # store the tensor as image
-        x, y = self.get_coords(xy_plot_data.index)
-        self.image_matrix[x][y] = tensor_to_pillow(tensor)
-        self.accumulated += 1
+        # store each tensor as image, batched cells are consecutive along dim2
+        for i in range(len(batch)):
+            self.add_image(
+                xy_plot_data.dim1.index,
+                xy_plot_data.dim2.index + i,
+                tensor_to_pillow(tensor[i]),
+            )
 
         # return complete status
         return self.complete
 
+    # add the image of a cell, by dim indexes in the page (headers must be known)
+    def add_image(self, dim1_index: int, dim2_index: int, image: Image.Image):
+        x, y = self.get_coords(dim1_index, dim2_index)
+        # downscale once on arrival, so memory and rendering time depend on output size
+        image = downscale_image(image, self.max_cell_size, self.max_cell_pixels)
+        self._store(x, y, image)
+        if self.checkpoint:
+            self.checkpoint.save_cell(x, y, image)
+
+    # dim2 values of the cells processed by a prompt, checking an image was received for each one
+    @staticmethod
+    def batch_values(xy_plot_data: XYPlotQueueData, tensor: torch.Tensor) -> list:
+        batch = xy_plot_data.dim2_batch or [xy_plot_data.dim2.value]
+        if len(tensor) != len(batch):
+            raise Exception(
+                'XY Plot: expected {} image(s) for the current batch, received {}'.format(
+                    len(batch), len(tensor)
+                )
+            )
+        return batch
+
+    # resume support: cells are saved as they arrive, headers and progress once the prompt is processed
+    def save_checkpoint(
+        self, next_index: int, order: str, max_per_page: tuple[int, int]
+    ):
+        self.checkpoint.save_state(
+            {
+                'next_index': next_index,
+                'order': order,
+                'max_per_page': max_per_page,
+                'accumulated': self.accumulated,
+                'dim1_headers': self.dim1.headers,
+                'dim2_headers': self.dim2.headers,
+                'cells': np.argwhere(self.filled).tolist(),
+                'header_formats': list(self.header_formats),
+                'dim1_as_rows': self.dim1_as_rows,
+            }
+        )
+
+    # reload the page cells and headers saved by a previous (interrupted) execution
+    def restore_checkpoint(self, xy_plot_data: XYPlotQueueData):
+        state = self.checkpoint.load_state()
+        if (
+            state is None
+            or state['next_index'] != xy_plot_data.queue_index
+            or state['accumulated'] != xy_plot_data.index
+        ):
+            raise Exception(
+                'XY Plot: cannot resume the plot, the checkpoint does not match the current position'
+            )
+        if (
+            state['header_formats'] != list(self.header_formats)
+            or state['dim1_as_rows'] != self.dim1_as_rows
+        ):
+            raise Exception(
+                'XY Plot: cannot resume the plot, header formats or direction have changed'
+            )
+
+        self.dim1.headers = state['dim1_headers']
+        self.dim2.headers = state['dim2_headers']
+        for x, y in state['cells']:
+            self._store(x, y, self.checkpoint.load_cell(x, y))
+
+    def _make_headers(self, dim_data, name: str, format_index: int) -> list[str]:
+        if dim_data.values is None:
+            return [None] * dim_data.length
+        return [
+            self.header_formats[format_index].format(**{name: value})
+            for value in dim_data.values
+        ]
+
+    def _store(self, row: int, col: int, image: Image.Image):
+        self.filled[row, col] = True
+        if self.thumbnails is not None:
+            thumbnail = image.copy()
+            thumbnail.thumbnail(self.thumbnail_size)
+            self.thumbnails[(row, col)] = thumbnail
+        if self.canvas:
+            self.canvas.paste(col, row, image)
+        else:
+            self.cells.put(row, col, image)
+
     def make_grid(
         self,
         plot_vars: PlotVars,
@@ -79,12 +244,111 @@ class Pager:
         plot_config_footer: PlotConfigHFData = None,
     ) -> torch.Tensor:
         grid = Grid(plot_config_grid, plot_config_header, plot_config_footer)
-        if self.dim1_as_rows:
-            grid_image = grid.make(
-                self.image_matrix, self.dim2.headers, self.dim1.headers, plot_vars
-            )
+        headers = self.grid_headers
+        if self.canvas:
+            # cells are already in place, only headers remain to be drawn
+            grid_image = grid.finish(self.canvas, *headers, plot_vars)
+        elif self.plot_config_render.compositor == 'tensor':
+            return torch.from_numpy(
+                grid.make_array(self.cells, *headers, plot_vars)
+            ).unsqueeze(0)
         else:
-            grid_image = grid.make(
-                self.image_matrix, self.dim1.headers, self.dim2.headers, plot_vars
-            )
+            grid_image = grid.make(self.cells, *headers, plot_vars)
         return pillow_to_tensor(grid_image)
+
+    # stream the grid to a PNG file, instead of building it in memory: return a downscaled preview
+    def save_grid(
+        self,
+        path: str,
+        plot_vars: PlotVars,
+        plot_config_grid: PlotConfigGridData = PlotConfigGridData(),
+        plot_config_header: PlotConfigHFData = None,
+        plot_config_footer: PlotConfigHFData = None,
+    ) -> torch.Tensor:
+        grid = Grid(plot_config_grid, plot_config_header, plot_config_footer)
+        preview = grid.write_png(
+            path,
+            *self.grid_headers,
+            plot_vars,
+            self.cells,
+            self.canvas,
+            self.plot_config_render.preview_size,
+        )
+        return pillow_to_tensor(preview)
+
+    # hand the cells over to a tile pyramid, to browse the page at any zoom level
+    # the pager does not own them anymore, so they are released with the tiled page
+    def detach_tiled_page(
+        self,
+        plot_vars: PlotVars,
+        plot_config_grid: PlotConfigGridData = PlotConfigGridData(),
+        plot_config_header: PlotConfigHFData = None,
+        plot_config_footer: PlotConfigHFData = None,
+    ) -> TiledPage:
+        grid = Grid(plot_config_grid, plot_config_header, plot_config_footer)
+        layout = grid.make_layout(
+            *self.grid_headers, plot_vars, self.cells, self.canvas
+        )
+        page = TiledPage(grid, layout, self.cells, self.canvas)
+        self.cells = None
+        self.canvas = None
+        return page
+
+    # (col headers, row headers)
+    @property
+    def grid_headers(self) -> tuple[list[str], list[str]]:
+        if self.dim1_as_rows:
+            return (self.dim2.headers, self.dim1.headers)
+        return (self.dim1.headers, self.dim2.headers)
+
+    # a progress preview is due: enough time has passed, or enough cells have been received since the last one
+    def preview_due(self) -> bool:
+        if self.thumbnails is None or self.complete:
+            return False
+        seconds = self.plot_config_render.progress_seconds
+        cells = self.plot_config_render.progress_cells
+        return (seconds > 0 and time.monotonic() - self.last_preview[0] >= seconds) or (
+            cells > 0 and self.accumulated - self.last_preview[1] >= cells
+        )
+
+    # low-res partial grid (cells only, without headers), from the thumbnails of the cells received so far
+    def make_preview(self) -> Image.Image:
+        w, h = self.thumbnail_size
+        image = create_image((w * self.dims[1], h * self.dims[0]), self.bg_color)
+        for (row, col), thumbnail in self.thumbnails.items():
+            image.paste(
+                thumbnail,
+                (
+                    col * w + (w - thumbnail.width) // 2,
+                    row * h + (h - thumbnail.height) // 2,
+                ),
+            )
+        self.last_preview = (time.monotonic(), self.accumulated)
+        return image
+
+    # (dim1 index, dim2 index, image) of the cells received
+    def cell_images(self):
+        for row, col in np.argwhere(self.filled).tolist():
+            if self.canvas:
+                image = self.canvas.get(col, row)
+            else:
+                image = self.cells.get(row, col)
+            if self.dim1_as_rows:
+                yield row, col, image
+            else:
+                yield col, row, image
+
+    # RAM used by the images of the page
+    def memory_usage(self) -> int:
+        if self.canvas and self.canvas.image:
+            return image_nbytes(self.canvas.image)
+        if self.cells is not None:
+            return self.cells.memory_usage()
+        return 0
+
+    # release stored images and scratch files
+    def close(self):
+        if self.cells is not None:
+            self.cells.close()
+        self.canvas = None
+        self.thumbnails = None
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+from .pager import Pager
+
+# RAM held by the pages in progress of all plots: beyond, the least recently used ones are released
+MAX_PAGERS_MB = 8192
+# pages not updated for this long (in seconds) belong to abandoned plots
+PAGER_IDLE_TIMEOUT = 3600
+# nb of released keys remembered, to report pages released while in progress
+MAX_RELEASED = 64
+
+
+# a page in progress, and who is processing it
+class PagerEntry:
+    def __init__(self, pager: Pager, owner: str):
+        self.pager = pager
+        self.owner = owner
+        self.last_use = time.monotonic()
+
+
+# pages in progress of XY Plot: Render nodes, by (node id, run id): unlike node attributes, pages of abandoned
+# plots (interruption, error, queue never resumed) do not stay in memory until the node is executed again
+pagers = OrderedDict()
+# keys of the pages released while in progress, see was_released
+released = OrderedDict()
+pagers_lock = threading.Lock()
+
+
+# None if there is no page in progress
+def get_pager(key: tuple) -> Pager:
+    with pagers_lock:
+        entry = pagers.get(key)
+        if entry is None:
+            return None
+        entry.last_use = time.monotonic()
+        pagers.move_to_end(key)
+        return entry.pager
+
+
+# owner: id of the client processing the plot, see release_pagers
+def register_pager(key: tuple, pager: Pager, owner: str = None):
+    with pagers_lock:
+        previous = pagers.pop(key, None)
+        if previous and previous.pager is not pager:
+            previous.pager.close()
+        pagers[key] = PagerEntry(pager, owner)
+        released.pop(key, None)
+
+
+# the page is done with (rendered, or handed over to a background job which closes it)
+def release_pager(key: tuple, close: bool = True):
+    with pagers_lock:
+        entry = pagers.pop(key, None)
+    if entry and close:
+        entry.pager.close()
+
+
+# the plots of a client are abandoned (interruption, error): the frontend restarts them from scratch
+# (or from their saved progress, in resume mode), their pages are not needed anymore
+def release_pagers(owner: str = None):
+    with pagers_lock:
+        keys = [key for key, entry in pagers.items() if entry.owner == owner]
+    for key in keys:
+        _release(key, 'the plot was interrupted')
+
+
+# release idle pages, then the least recently used ones above the RAM budget (except the given one)
+def evict_pagers(keep: tuple = None):
+    now = time.monotonic()
+    with pagers_lock:
+        idle = [
+            key
+            for key, entry in pagers.items()
+            if key != keep and now - entry.last_use > PAGER_IDLE_TIMEOUT
+        ]
+    for key in idle:
+        _release(key, 'it was idle for too long')
+
+    with pagers_lock:
+        usage = [(key, entry.pager.memory_usage()) for key, entry in pagers.items()]
+    total = sum(size for _, size in usage)
+    for key, size in usage:
+        if total <= MAX_PAGERS_MB * 1024 * 1024:
+            break
+        if key != keep:
+            _release(key, 'of the RAM budget')
+            total -= size
+
+
+# True if the page in progress was released (and forget it)
+def was_released(key: tuple) -> bool:
+    with pagers_lock:
+        return released.pop(key, None) is not None
+
+
+def _release(key: tuple, reason: str):
+    with pagers_lock:
+        entry = pagers.pop(key, None)
+        if entry is None:
+            return
+        released[key] = True
+        while len(released) > MAX_RELEASED:
+            released.popitem(last=False)
+    logging.info(
+        'ComfyLab: XY Plot: images of the page in progress released, as {} (node {})'.format(
+            reason, key[0]
+        )
+    )
+    entry.pager.close()
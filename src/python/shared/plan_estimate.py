@@ -0,0 +1,204 @@
+from .plot_data import (
+    PlotConfigGridData,
+    PlotConfigHFData,
+    PlotConfigRenderData,
+    PlotVars,
+)
+from .planner import PlotPlan
+from .grid import Grid
+from .utils import downscaled_size
+
+MB = 1024 * 1024
+
+
+# rough peak memory used by a page: the stored cells, plus the grid being built
+# (individual tensors and downstream nodes are not taken into account)
+def estimate_page_memory(
+    page_size: tuple[int, int],
+    cell_size: tuple[int, int],
+    cell_count: int,
+    row_height: int,
+    plot_config_grid: PlotConfigGridData,
+    plot_config_render: PlotConfigRenderData,
+) -> int:
+    width, height = page_size
+    channels = 4 if plot_config_grid.background_color == 'transparent' else 3
+
+    # cells, as 8-bit images
+    if plot_config_render.compositing == 'incremental':
+        cells = width * height * channels
+    else:
+        cells = cell_count * cell_size[0] * cell_size[1] * 3
+        if plot_config_render.cell_store != 'memory':
+            cells = min(cells, plot_config_render.ram_budget_mb * MB)
+
+    # grid
+    if plot_config_render.output == 'png file':
+        # one band at a time, and its filtered copy
+        grid = width * row_height * channels * 2
+    elif (
+        plot_config_render.compositing == 'deferred'
+        and plot_config_render.compositor == 'tensor'
+    ):
+        # float32 tensor only
+        grid = width * height * channels * 4
+    else:
+        # PIL image, then float32 tensor
+        grid = width * height * channels * 5
+    return cells + grid
+
+
+# predicted schedule, page sizes, memory and duration of an XY plot, before running it
+def estimate_plan(
+    plan: PlotPlan,
+    headers: tuple[list[str], list[str]],
+    cell_size: tuple[int, int],
+    dim1_as_rows: bool = True,
+    plot_config_grid: PlotConfigGridData = PlotConfigGridData(),
+    plot_config_header: PlotConfigHFData = None,
+    plot_config_footer: PlotConfigHFData = None,
+    plot_config_render: PlotConfigRenderData = PlotConfigRenderData(),
+    cell_time: float = 0,
+) -> dict:
+    grid = Grid(plot_config_grid, plot_config_header, plot_config_footer)
+
+    # prompts of each page
+    prompts = {}
+    for index, step in enumerate(plan.steps):
+        first, count = prompts.get(step.page, (index, 0))
+        prompts[step.page] = (first, count + 1)
+
+    pages = []
+    for page, (first_prompt, prompt_count) in prompts.items():
+        offsets = plan.page_offsets(page)
+        dims = plan.page_dims(page)
+        cell_count = dims[0] * dims[1]
+        page_headers = (
+            headers[0][offsets[0] : offsets[0] + dims[0]],
+            headers[1][offsets[1] : offsets[1] + dims[1]],
+        )
+        col_headers, row_headers = page_headers[::-1] if dim1_as_rows else page_headers
+
+        # cells are downscaled on arrival, see Pager
+        page_cell_size = downscaled_size(
+            cell_size,
+            (plot_config_grid.max_cell_width, plot_config_grid.max_cell_height),
+            int(plot_config_grid.max_page_megapixels * 1e6 / cell_count),
+        )
+        layout = grid.make_layout(
+            col_headers,
+            row_headers,
+            PlotVars(plan.page_index(page) + 1, plan.page_count),
+            cell_size=page_cell_size,
+        )
+        memory = estimate_page_memory(
+            layout.size,
+            page_cell_size,
+            cell_count,
+            page_cell_size[1] + plot_config_grid.gap,
+            plot_config_grid,
+            plot_config_render,
+        )
+        pages.append(
+            {
+                'page': plan.page_index(page) + 1,
+                'position': list(page),
+                'dims': [len(row_headers), len(col_headers)],
+                'cell_size': list(page_cell_size),
+                'size': list(layout.size),
+                'megapixels': round(layout.size[0] * layout.size[1] / 1e6, 2),
+                'peak_ram_mb': round(memory / MB, 1),
+                'first_prompt': first_prompt,
+                'prompts': prompt_count,
+            }
+        )
+
+    cells = plan.size[0] * plan.size[1]
+    return {
+        'order': plan.order,
+        'total_prompts': plan.total,
+        'total_pages': plan.page_count,
+        'total_cells': cells,
+        'max_size': [
+            max(page['size'][0] for page in pages),
+            max(page['size'][1] for page in pages),
+        ],
+        'peak_ram_mb': max(page['peak_ram_mb'] for page in pages),
+        'cell_time': cell_time or None,
+        'eta_seconds': round(cells * cell_time) if cell_time else None,
+        'pages': pages,
+        # one entry per prompt: page number, dim1 index, first dim2 index, nb of dim2 values
+        'schedule': [
+            [plan.page_index(step.page) + 1, step.dim1, step.dim2, step.length]
+            for step in plan.steps
+        ],
+    }
+
+
+# largest page shape (dim1 values, dim2 values) fitting a budget in megapixels and / or MB (0: no limit),
+# minimizing the number of pages, then keeping pages as square as possible
+# page sizes are estimated with the margins of the widest headers, dim1 as rows
+def auto_page_dims(
+    size: tuple[int, int],
+    max_per_page: tuple[int, int],
+    max_megapixels: float,
+    max_mb: float,
+    headers: tuple[list[str], list[str]],
+    cell_size: tuple[int, int],
+    plot_config_grid: PlotConfigGridData = PlotConfigGridData(),
+    plot_config_render: PlotConfigRenderData = PlotConfigRenderData(),
+) -> tuple[int, int]:
+    limits = tuple(m if 0 < m < s else s for s, m in zip(size, max_per_page))
+    cell_size = downscaled_size(
+        cell_size, (plot_config_grid.max_cell_width, plot_config_grid.max_cell_height)
+    )
+    gap = plot_config_grid.gap
+    layout = Grid(plot_config_grid).make_layout(
+        headers[1], headers[0], PlotVars(1, 1), cell_size=cell_size
+    )
+    top, left = layout.margins
+
+    def page_size(dims: tuple[int, int]) -> tuple[int, int]:
+        return (
+            left + dims[1] * (cell_size[0] + gap) - gap,
+            top + dims[0] * (cell_size[1] + gap) - gap,
+        )
+
+    def fits(dims: tuple[int, int]) -> bool:
+        width, height = page_size(dims)
+        if max_megapixels > 0 and width * height > max_megapixels * 1e6:
+            return False
+        if max_mb > 0:
+            memory = estimate_page_memory(
+                (width, height),
+                cell_size,
+                dims[0] * dims[1],
+                cell_size[1] + gap,
+                plot_config_grid,
+                plot_config_render,
+            )
+            if memory > max_mb * MB:
+                return False
+        return True
+
+    best = None
+    for dim1 in range(1, limits[0] + 1):
+        if not fits((dim1, 1)):
+            break
+        # the page area grows with the nb of dim2 values: search the largest fitting one
+        low, high = 1, limits[1]
+        while low < high:
+            middle = (low + high + 1) // 2
+            if fits((dim1, middle)):
+                low = middle
+            else:
+                high = middle - 1
+        dim2 = low
+        pages = -(-size[0] // dim1) * -(-size[1] // dim2)
+        width, height = page_size((dim1, dim2))
+        key = (pages, max(width, height) / min(width, height))
+        if best is None or key < best[0]:
+            best = (key, (dim1, dim2))
+
+    # a single cell does not even fit: one cell per page
+    return best[1] if best else (1, 1)
@@ -0,0 +1,203 @@
+from math import ceil
+from .plot_data import PlanStep
+
+# traversal orders: the dim iterated in the outer loop, and whether the direction of the inner loop
+# alternates (snake), so consecutive lines share their boundary value
+ORDERS = {
+    'dim1 outer': ('dim1', False),
+    'dim1 outer, snake': ('dim1', True),
+    'dim2 outer': ('dim2', False),
+    'dim2 outer, snake': ('dim2', True),
+}
+DEFAULT_ORDER = 'dim1 outer'
+
+
+# cost of switching from one step to the next: the dims whose value changes
+def switch_cost(
+    previous: PlanStep, step: PlanStep, switch_costs: tuple[float, float]
+) -> float:
+    if previous is None:
+        return switch_costs[0] + switch_costs[1]
+    return switch_costs[0] * (previous.dim1 != step.dim1) + switch_costs[1] * (
+        previous.dim2 != step.dim2
+    )
+
+
+# schedule of an XY plot: the list of steps, one per queued prompt
+# pages are processed one at a time, so each one is complete before the next starts
+class PlotPlan:
+    def __init__(
+        self,
+        size: tuple[int, int],
+        max_per_page: tuple[int, int] = (0, 0),
+        batch_size: int = 1,
+        order: str = DEFAULT_ORDER,
+        switch_costs: tuple[float, float] = (1, 1),
+    ):
+        if order not in ORDERS:
+            raise ValueError(
+                "invalid order '{}': must be one of {}".format(
+                    order, ', '.join(ORDERS.keys())
+                )
+            )
+        self.size = size
+        self.batch_size = batch_size
+        self.order = order
+        # max page dimensions, but not necessarily the actual ones: the last page may be smaller
+        self.max_page_dims = tuple(
+            m if 0 < m < s else s for s, m in zip(size, max_per_page)
+        )
+        self.total_pages = (
+            ceil(size[0] / self.max_page_dims[0]),
+            ceil(size[1] / self.max_page_dims[1]),
+        )
+        self.steps = self._make_steps(*ORDERS[order], switch_costs)
+
+    @property
+    def total(self) -> int:
+        return len(self.steps)
+
+    @property
+    def page_count(self) -> int:
+        return self.total_pages[0] * self.total_pages[1]
+
+    # sequential page number, in reading order (not processing order)
+    def page_index(self, page: tuple[int, int]) -> int:
+        return page[0] * self.total_pages[1] + page[1]
+
+    def page_offsets(self, page: tuple[int, int]) -> tuple[int, int]:
+        return (page[0] * self.max_page_dims[0], page[1] * self.max_page_dims[1])
+
+    def page_dims(self, page: tuple[int, int]) -> tuple[int, int]:
+        offsets = self.page_offsets(page)
+        return (
+            min(self.max_page_dims[0], self.size[0] - offsets[0]),
+            min(self.max_page_dims[1], self.size[1] - offsets[1]),
+        )
+
+    # estimated cost of the value switches along the schedule
+    def cost(self, switch_costs: tuple[float, float]) -> float:
+        total = 0
+        previous = None
+        for step in self.steps:
+            total += switch_cost(previous, step, switch_costs)
+            previous = step
+        return total
+
+    def _make_steps(
+        self, outer: str, snake: bool, switch_costs: tuple[float, float]
+    ) -> list[PlanStep]:
+        steps = []
+        for page_dim1 in range(self.total_pages[0]):
+            for page_dim2 in range(self.total_pages[1]):
+                page = (page_dim1, page_dim2)
+                lines = self._page_lines(page, outer)
+                if snake:
+                    # start the page from the end closest to the previous step
+                    previous = steps[-1] if steps else None
+                    candidates = [
+                        self._snake(lines, reverse_lines, reverse_first)
+                        for reverse_lines in (False, True)
+                        for reverse_first in (False, True)
+                    ]
+                    cells = min(
+                        candidates,
+                        key=lambda c: switch_cost(
+                            previous, PlanStep(page, 0, *c[0]), switch_costs
+                        ),
+                    )
+                else:
+                    cells = [cell for line in lines for cell in line]
+
+                index = 0
+                for dim1, dim2, length in cells:
+                    steps.append(PlanStep(page, index, dim1, dim2, length))
+                    index += length
+        return steps
+
+    # steps of a page, as lines of (dim1, dim2, length) along the inner dim
+    # dim2 values are grouped in batches: up to batch_size consecutive values, for a given dim1 value
+    def _page_lines(self, page: tuple[int, int], outer: str) -> list[list[tuple]]:
+        offsets = self.page_offsets(page)
+        dims = self.page_dims(page)
+        dim1_values = range(offsets[0], offsets[0] + dims[0])
+        batches = [
+            (offsets[1] + start, min(self.batch_size, dims[1] - start))
+            for start in range(0, dims[1], self.batch_size)
+        ]
+        if outer == 'dim1':
+            return [[(d1, *batch) for batch in batches] for d1 in dim1_values]
+        return [[(d1, *batch) for d1 in dim1_values] for batch in batches]
+
+    def _snake(
+        self, lines: list[list[tuple]], reverse_lines: bool, reverse_first: bool
+    ) -> list[tuple]:
+        if reverse_lines:
+            lines = lines[::-1]
+        cells = []
+        for i, line in enumerate(lines):
+            cells += line[::-1] if (i % 2 == 1) != reverse_first else line
+        return cells
+
+
+# choose the order minimizing the estimated cost of the value switches
+# 'auto': among all orders, the default one being kept on ties
+def make_plan(
+    size: tuple[int, int],
+    max_per_page: tuple[int, int],
+    batch_size: int,
+    order: str = DEFAULT_ORDER,
+    switch_costs: tuple[float, float] = (0, 0),
+) -> PlotPlan:
+    # unknown costs: snake orders still try to continue from the previous page
+    line_costs = switch_costs if any(switch_costs) else (1, 1)
+    if order != 'auto':
+        return PlotPlan(size, max_per_page, batch_size, order, line_costs)
+    best = None
+    for candidate in ORDERS.keys():
+        plan = PlotPlan(size, max_per_page, batch_size, candidate, line_costs)
+        if best is None or plan.cost(switch_costs) < best.cost(switch_costs):
+            best = plan
+    return best
+
+
+# learn the switch costs from the measured duration of the steps:
+# steps are classified by the dims whose value changed, and their mean durations compared
+class SwitchCostEstimator:
+    def __init__(self):
+        # (dim1 switched, dim2 switched) -> (total duration, nb of steps)
+        self.stats = {}
+        # total duration, nb of cells
+        self.cells = (0, 0)
+
+    def record(self, switched: tuple[bool, bool], duration: float, cells: int = 1):
+        total, count = self.stats.get(switched, (0, 0))
+        self.stats[switched] = (total + duration, count + 1)
+        self.cells = (self.cells[0] + duration, self.cells[1] + cells)
+
+    # mean duration per cell, 0 if unknown
+    def cell_time(self) -> float:
+        return self.cells[0] / self.cells[1] if self.cells[1] else 0
+
+    # (dim1, dim2) estimated costs, 0 if unknown
+    def estimate(self) -> tuple[float, float]:
+        return (self._difference(0), self._difference(1))
+
+    def _mean(self, switched: tuple[bool, bool]) -> float:
+        if switched not in self.stats:
+            return None
+        total, count = self.stats[switched]
+        return total / count
+
+    # difference of mean durations, when only the given dim switches
+    def _difference(self, dim: int) -> float:
+        for other in (False, True):
+            with_switch = [other, other]
+            with_switch[dim] = True
+            without_switch = [other, other]
+            without_switch[dim] = False
+            a = self._mean(tuple(with_switch))
+            b = self._mean(tuple(without_switch))
+            if a is not None and b is not None:
+                return max(0, a - b)
+        return 0
@@ -0,0 +1,116 @@
+from pathlib import Path
+import json
+import os
+import shutil
+import time
+import uuid
+from PIL import Image
+
+
+def new_archive_name() -> str:
+    return '{}_{}'.format(time.strftime('%Y%m%d-%H%M%S'), uuid.uuid4().hex[:8])
+
+
+# completed XY plot pages kept on disk, by run: the cells and dim values of each page, so the last runs can be
+# rendered again with other settings (header formats, direction, grid / header / footer configs) in seconds
+class PlotArchive:
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    # names of the complete runs, most recent first
+    def runs(self) -> list[str]:
+        runs = []
+        if self.root.is_dir():
+            for run_dir in self.root.iterdir():
+                info = self._load_json(run_dir / 'run.json')
+                if info:
+                    runs.append((info['time'], run_dir.name))
+        return [name for _, name in sorted(runs, reverse=True)]
+
+    # a run starts again (same name): it is not complete anymore, its pages being replaced as they are rendered
+    def reopen_run(self, name: str):
+        (self.root / name / 'run.json').unlink(missing_ok=True)
+
+    # cells: (dim1 index, dim2 index, image), by dim indexes in the page
+    def save_page(
+        self,
+        name: str,
+        page: int,
+        total_pages: int,
+        dim1_values: list,
+        dim2_values: list,
+        cells,
+    ):
+        page_dir = self._page_dir(name, page)
+        shutil.rmtree(page_dir, ignore_errors=True)
+        page_dir.mkdir(parents=True)
+        for dim1_index, dim2_index, image in cells:
+            image.save(
+                page_dir / '{}_{}.png'.format(dim1_index, dim2_index),
+                'PNG',
+                compress_level=1,
+            )
+        # values which cannot be stored as JSON are kept as text
+        self._save_json(
+            page_dir / 'page.json',
+            {
+                'page': page,
+                'total_pages': total_pages,
+                'dim1_values': dim1_values,
+                'dim2_values': dim2_values,
+            },
+        )
+
+    # once all pages are saved, the run is complete: only the most recent complete runs are kept
+    # (along with the incomplete ones started since the oldest kept one, which may still be in progress)
+    def finish_run(self, name: str, total_pages: int, keep: int) -> bool:
+        run_dir = self.root / name
+        if len(list(run_dir.glob('page_*/page.json'))) < total_pages:
+            return False
+        self._save_json(run_dir / 'run.json', {'time': time.time()})
+
+        runs = self.runs()
+        for old_name in runs[keep:]:
+            shutil.rmtree(self.root / old_name, ignore_errors=True)
+        if len(runs) >= keep:
+            oldest = (self.root / runs[keep - 1] / 'run.json').stat().st_mtime
+            for run_dir in self.root.iterdir():
+                if (
+                    not (run_dir / 'run.json').exists()
+                    and run_dir.stat().st_mtime < oldest
+                ):
+                    shutil.rmtree(run_dir, ignore_errors=True)
+        return True
+
+    # page info, by page number
+    def load_pages(self, name: str) -> list[dict]:
+        pages = [
+            self._load_json(path)
+            for path in (self.root / name).glob('page_*/page.json')
+        ]
+        return sorted((page for page in pages if page), key=lambda p: p['page'])
+
+    # (dim1 index, dim2 index, image) of the cells of a page
+    def load_cells(self, name: str, page: int):
+        for path in self._page_dir(name, page).glob('*.png'):
+            dim1_index, dim2_index = (int(i) for i in path.stem.split('_'))
+            with Image.open(path) as image:
+                image.load()
+            yield dim1_index, dim2_index, image
+
+    def _page_dir(self, name: str, page: int) -> Path:
+        return self.root / name / 'page_{}'.format(page)
+
+    def _load_json(self, path: Path) -> dict:
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    # write then rename, so an interruption never leaves a truncated file
+    def _save_json(self, path: Path, data: dict):
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, default=str)
+        os.replace(tmp_path, path)
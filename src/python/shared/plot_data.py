@@ -8,6 +8,18 @@ class DimData:
     index: int
     length: int
     value: Any
+    # all values of the dim in the current page, so headers do not depend on the order cells arrive
+    values: list = None
+
+
+# one prompt of an XY plot schedule: the cells processed, and where they go
+@dataclass
+class PlanStep:
+    page: tuple[int, int]  # page position, along dim1 and dim2
+    index: int  # nb of cells processed before, in the page
+    dim1: int  # dim1 index (in the whole list)
+    dim2: int  # dim2 index of the first cell (in the whole list)
+    length: int  # nb of cells, i.e. consecutive dim2 values
 
 
 # data sent from XYPlotQueue to XYPlotRender
@@ -19,6 +31,21 @@ class XYPlotQueueData:
     complete: bool
     dim1: DimData
     dim2: DimData
+    # batch mode: dim2 values of all cells processed by the current prompt,
+    # starting at dim2.index (None: a single cell)
+    dim2_batch: list = None
+    # resume / multi-worker modes: id of the run, and sequential index of the prompt in the run of the queue
+    run_id: str = None
+    queue_index: int = 0
+    # plan of the run (traversal order, max nb of dim1 / dim2 values per page), see PlotPlan
+    order: str = None
+    max_per_page: tuple[int, int] = None
+    # the progress is saved after each prompt, see PlotCheckpoint
+    resume: bool = False
+    # multi-worker mode: (worker id, worker count), the run id identifying the shared store
+    worker: tuple[int, int] = None
+    # multi-worker mode: session of the run in the shared store, see ShardStore.join
+    shard_session: str = None
 
 
 @dataclass
@@ -32,6 +59,12 @@ class PlotConfigGridData:
     pad_row_headers: int = 50
     wrap_col_headers: int = 0
     wrap_row_headers: int = 0
+    # cells are downscaled when received, to fit these limits (0: no limit)
+    max_cell_width: int = 0
+    max_cell_height: int = 0
+    max_page_megapixels: float = 0
+    # 'uniform': all cells are as large as the largest image, 'packed': each column / row is as large as its largest image
+    cell_layout: str = 'uniform'
 
 
 @dataclass
@@ -46,6 +79,37 @@ class PlotConfigHFData:
     padding: int = 30
 
 
+@dataclass
+class PlotConfigRenderData:
+    # 'deferred': keep all images and build the grid once the page is complete
+    # 'incremental': paste each image into the grid as soon as it is received
+    compositing: str = 'deferred'
+    # where images are kept until the grid is built, in deferred mode:
+    # 'memory', or spilled to disk above the RAM budget: 'mmap' (single scratch file) or 'disk' (one file per cell)
+    cell_store: str = 'memory'
+    ram_budget_mb: int = 2048
+    scratch_dir: str = ''  # empty: system temp dir
+    # how the grid is built in deferred mode:
+    # 'tensor': cells copied into a preallocated array, 'pil': PIL image converted at the end
+    compositor: str = 'tensor'
+    # 'image': grid sent as IMAGE output, 'png file': grid streamed to a PNG file, only a preview is sent
+    output: str = 'image'
+    filename_prefix: str = 'ComfyLab/xy_plot'
+    preview_size: int = 1024
+    # keep completed pages browsable as deep zoom tiles, served by the /comfylab/tiles routes
+    tiles: bool = False
+    # 'png file' output only: write the grid in a background thread
+    background: bool = False
+    # keep generated images on disk, to reuse them when a plot is run again
+    cell_cache: bool = False
+    cell_cache_mb: int = 4096
+    # nb of complete runs whose cells are kept on disk, to render them again with XY Plot: Re-render (0: none)
+    keep_runs: int = 0
+    # progress previews of the page in progress: every n seconds and / or every n cells (0: never)
+    progress_seconds: int = 0
+    progress_cells: int = 0
+
+
 @dataclass
 class PlotVars:
     current_page: int
@@ -0,0 +1,101 @@
+from pathlib import Path
+import struct
+import zlib
+from PIL import Image
+import numpy as np
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_COLOR_TYPES = {'L': 0, 'RGB': 2, 'RGBA': 6}
+PNG_FILTER_UP = 2
+IDAT_MAX_SIZE = 1 << 20
+
+
+# write a PNG file band by band (rows of pixels, top to bottom),
+# so the full image never has to be held in memory
+class PngWriter:
+    def __init__(
+        self,
+        path: str,
+        size: tuple[int, int],
+        mode: str = 'RGB',
+        compress_level: int = 6,
+    ):
+        if mode not in PNG_COLOR_TYPES:
+            raise ValueError(
+                "invalid mode '{}': must be one of {}".format(
+                    mode, ', '.join(PNG_COLOR_TYPES.keys())
+                )
+            )
+        self.path = Path(path)
+        self.size = size
+        self.mode = mode
+        self.rows_written = 0
+        self.compressor = zlib.compressobj(compress_level)
+        self.pending = bytearray()
+        # previous row of pixels, needed by the 'up' filter
+        self.previous_row = None
+
+        self.file = open(self.path, 'wb')
+        self.file.write(PNG_SIGNATURE)
+        self._write_chunk(
+            b'IHDR',
+            struct.pack(
+                '>IIBBBBB', size[0], size[1], 8, PNG_COLOR_TYPES[mode], 0, 0, 0
+            ),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # do not leave a truncated file behind
+            self.file.close()
+            self.path.unlink(missing_ok=True)
+
+    def write(self, band: Image.Image):
+        if band.size[0] != self.size[0]:
+            raise ValueError(
+                'band width {} does not match image width {}'.format(
+                    band.size[0], self.size[0]
+                )
+            )
+        if band.mode != self.mode:
+            band = band.convert(self.mode)
+        pixels = np.asarray(band).reshape(band.size[1], -1)
+
+        # 'up' filter: difference with the row above (uint8 arithmetic wraps as expected)
+        previous = np.empty_like(pixels)
+        previous[0] = 0 if self.previous_row is None else self.previous_row
+        previous[1:] = pixels[:-1]
+        filtered = np.empty((pixels.shape[0], pixels.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = PNG_FILTER_UP
+        filtered[:, 1:] = pixels - previous
+        self.previous_row = pixels[-1].copy()
+
+        self._write_data(self.compressor.compress(filtered.tobytes()))
+        self.rows_written += pixels.shape[0]
+
+    def close(self):
+        if self.rows_written != self.size[1]:
+            raise ValueError(
+                '{} rows written, {} expected'.format(self.rows_written, self.size[1])
+            )
+        self._write_data(self.compressor.flush(), final=True)
+        self._write_chunk(b'IEND', b'')
+        self.file.close()
+
+    # group compressed data into IDAT chunks of reasonable size
+    def _write_data(self, data: bytes, final: bool = False):
+        self.pending += data
+        while len(self.pending) >= IDAT_MAX_SIZE or (final and self.pending):
+            self._write_chunk(b'IDAT', bytes(self.pending[:IDAT_MAX_SIZE]))
+            del self.pending[:IDAT_MAX_SIZE]
+
+    def _write_chunk(self, chunk_type: bytes, data: bytes):
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(chunk_type)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(chunk_type + data)))
@@ -0,0 +1,37 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import threading
+
+# max number of pages waiting to be rendered: beyond, submitting blocks until the oldest is done,
+# so pages cannot pile up in memory if rendering is slower than generation
+MAX_PENDING = 2
+
+# a single worker thread: pages are rendered one at a time, in order
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='comfylab_render')
+pending = deque()
+pending_lock = threading.Lock()
+
+
+def run_logged(fn, *args):
+    try:
+        return fn(*args)
+    except Exception:
+        logging.exception('ComfyLab: background rendering failed')
+        raise
+
+
+# run a rendering job in the background
+def submit_render(fn, *args) -> Future:
+    with pending_lock:
+        while pending and pending[0].done():
+            pending.popleft()
+        oldest = pending[0] if len(pending) >= MAX_PENDING else None
+    if oldest:
+        # errors are already logged by the job itself
+        oldest.exception()
+
+    future = executor.submit(run_logged, fn, *args)
+    with pending_lock:
+        pending.append(future)
+    return future
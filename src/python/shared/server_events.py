@@ -0,0 +1,35 @@
+import logging
+import threading
+from server import PromptServer  # type: ignore
+
+# listeners of the messages sent by the ComfyUI server to the frontend (execution events), see add_event_listener
+listeners = []
+listeners_lock = threading.Lock()
+hooked = False
+
+
+# listener(event, data, sid): called for each message sent by PromptServer.send_sync, before it is sent
+# (from the execution thread): ComfyUI has no other hook for these events, so send_sync is wrapped,
+# once for all the listeners of the extension
+def add_event_listener(listener):
+    global hooked
+    with listeners_lock:
+        listeners.append(listener)
+        if hooked:
+            return
+        hooked = True
+    server = PromptServer.instance
+    send_sync = server.send_sync
+
+    def send_sync_hook(event, data, sid=None):
+        with listeners_lock:
+            current = list(listeners)
+        for listener in current:
+            # a failing listener must not prevent the message from being sent
+            try:
+                listener(event, data, sid)
+            except Exception:
+                logging.exception('ComfyLab: failed to handle {} event'.format(event))
+        send_sync(event, data, sid)
+
+    server.send_sync = send_sync_hook
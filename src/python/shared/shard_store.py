@@ -0,0 +1,165 @@
+from pathlib import Path
+import json
+import os
+import shutil
+import uuid
+from PIL import Image
+
+# identifies this process in the claims of pages: a claim left by a previous process of the same worker
+# (crash or interruption while rendering) can be taken again
+PROCESS_TOKEN = uuid.uuid4().hex
+
+
+# multi-worker XY plot: cells generated by several ComfyUI instances of the same host, gathered in a shared folder
+# workers only coordinate through files: writes are atomic (write then rename), and the worker completing a page
+# claims it by creating a marker file, which only one of them can do
+# each execution of a run is a session (numbered sub-folder of the run folder), so a new execution does not reuse
+# the plan, cells and claims left by an interrupted one: see join
+class ShardStore:
+    def __init__(self, root: str, run_id: str, session: str = None):
+        self.run_id = run_id
+        self.run_dir = Path(root) / run_id
+        self.session = None
+        if session:
+            self._set_session(session)
+
+    # the worker takes part in the current session of the run, returning its name
+    # restart: the worker starts the run from the beginning; if it already took part in the current session,
+    # that one is abandoned and a new one is started, which the other workers join when they start again
+    def join(self, worker_id: int, restart: bool) -> str:
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        while True:
+            sessions = self._sessions()
+            latest = sessions[-1] if sessions else None
+            if latest is not None and not (
+                restart and (self._workers_dir(latest) / str(worker_id)).exists()
+            ):
+                session = latest
+            else:
+                session = (latest or 0) + 1
+                try:
+                    (self.run_dir / str(session)).mkdir()
+                except FileExistsError:
+                    # another worker started it meanwhile: join it
+                    continue
+                for old_session in sessions:
+                    shutil.rmtree(self.run_dir / str(old_session), ignore_errors=True)
+            try:
+                self._workers_dir(session).mkdir(exist_ok=True)
+                (self._workers_dir(session) / str(worker_id)).touch()
+            except FileNotFoundError:
+                # removed meanwhile (complete, or abandoned)
+                continue
+            self._set_session(str(session))
+            return self.session
+
+    # the plan of the first worker to start is used by all the others, so they share the same schedule
+    def agree_plan(self, plan: dict) -> dict:
+        tmp_path = self._tmp_path(self.plan_path)
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(plan, file)
+        try:
+            # unlike a rename, a link fails if the file already exists
+            os.link(tmp_path, self.plan_path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+        with open(self.plan_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    # cells are stored by dim indexes in their page
+    def put_cell(self, page: int, dim1_index: int, dim2_index: int, image: Image.Image):
+        path = self._cell_path(page, dim1_index, dim2_index)
+        try:
+            path.parent.mkdir(exist_ok=True)
+        except FileNotFoundError:
+            raise Exception(
+                'XY Plot: the run was restarted by another worker (or is complete), please restart this worker too'
+            )
+        # another worker may write the same cell (duplicated prompt): temp file names must differ
+        tmp_path = self._tmp_path(path)
+        image.save(tmp_path, 'PNG', compress_level=1)
+        os.replace(tmp_path, path)
+
+    def load_cell(self, page: int, dim1_index: int, dim2_index: int) -> Image.Image:
+        with Image.open(self._cell_path(page, dim1_index, dim2_index)) as image:
+            image.load()
+            return image
+
+    # (dim1 index, dim2 index) of the cells received for a page
+    def cells(self, page: int) -> list[tuple[int, int]]:
+        page_dir = self._page_dir(page)
+        if not page_dir.is_dir():
+            return []
+        return [
+            tuple(int(i) for i in path.stem.split('_'))
+            for path in page_dir.glob('*.png')
+        ]
+
+    # True for the single worker which must render the page: all its cells are there, and no one claimed it yet
+    # (or this worker did, from a previous process which never finished the page)
+    def claim_page(self, page: int, cell_count: int, worker_id: int) -> bool:
+        if len(self.cells(page)) < cell_count:
+            return False
+        self.claimed_dir.mkdir(exist_ok=True)
+        path = self.claimed_dir / str(page)
+        owner = '{} {}'.format(worker_id, PROCESS_TOKEN)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                claimed_by = path.read_text(encoding='utf-8').split()
+            except OSError:
+                return False
+            if claimed_by[:1] != [str(worker_id)] or claimed_by[1:] == [PROCESS_TOKEN]:
+                return False
+            tmp_path = self._tmp_path(path)
+            tmp_path.write_text(owner, encoding='utf-8')
+            os.replace(tmp_path, path)
+            return True
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(owner)
+        return True
+
+    # the page could not be rendered: another cell of the page (retried prompt) may claim it again
+    def release_page(self, page: int):
+        (self.claimed_dir / str(page)).unlink(missing_ok=True)
+
+    # the page is rendered: its cells are not needed anymore, nor the session once all pages are rendered
+    def finish_page(self, page: int, total_pages: int):
+        shutil.rmtree(self._page_dir(page), ignore_errors=True)
+        self.rendered_dir.mkdir(exist_ok=True)
+        (self.rendered_dir / str(page)).touch()
+        if len(os.listdir(self.rendered_dir)) >= total_pages:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            try:
+                self.run_dir.rmdir()
+            except OSError:
+                # a new session was started meanwhile
+                pass
+
+    def _set_session(self, session: str):
+        self.session = session
+        self.dir = self.run_dir / session
+        self.plan_path = self.dir / 'plan.json'
+        self.claimed_dir = self.dir / 'claimed'
+        self.rendered_dir = self.dir / 'rendered'
+
+    # session numbers, in order
+    def _sessions(self) -> list[int]:
+        return sorted(
+            int(path.name) for path in self.run_dir.iterdir() if path.name.isdigit()
+        )
+
+    def _workers_dir(self, session: int) -> Path:
+        return self.run_dir / str(session) / 'workers'
+
+    def _page_dir(self, page: int) -> Path:
+        return self.dir / 'page_{}'.format(page)
+
+    def _cell_path(self, page: int, dim1_index: int, dim2_index: int) -> Path:
+        return self._page_dir(page) / '{}_{}.png'.format(dim1_index, dim2_index)
+
+    def _tmp_path(self, path: Path) -> Path:
+        return path.with_name('{}.{}.tmp'.format(path.name, os.getpid()))
@@ -0,0 +1,177 @@
+from collections import OrderedDict
+import io
+import math
+import threading
+import uuid
+from PIL import Image
+
+from .cell_store import CellStore
+from .grid import Grid, GridCanvas, GridLayout
+
+TILE_SIZE = 256
+TILE_CACHE_SIZE = 64  # per page and level
+# the zoomed out levels are cut from a downscaled copy of the whole page, at most this size
+OVERVIEW_MAX_SIZE = 2048
+# full resolution regions are rendered by blocks of at most this size
+RENDER_BLOCK_SIZE = 2048
+MAX_TILED_PAGES = 8
+
+
+# a completed grid page, kept as a deep zoom (DZI) tile pyramid: tiles are rendered on demand,
+# from the cells for the zoomed in levels, and from a downscaled overview of the page for the others
+class TiledPage:
+    def __init__(
+        self,
+        grid: Grid,
+        layout: GridLayout,
+        cells: CellStore = None,
+        canvas: GridCanvas = None,
+        tile_size: int = TILE_SIZE,
+    ):
+        self.grid = grid
+        self.layout = layout
+        self.cells = cells
+        self.canvas = canvas
+        self.tile_size = tile_size
+        self.size = layout.size
+        self.max_level = math.ceil(math.log2(max(self.size)))
+        self.transparent = grid.config_grid.background_color == 'transparent'
+        self.format = 'png' if self.transparent else 'jpeg'
+        # level -> (col, row) -> tile
+        self.tile_caches = {}
+        self.cache_lock = threading.Lock()
+        # highest level fitting in the overview, built with the first tile needing it
+        self.overview_level = self.max_level
+        while max(self.level_size(self.overview_level)) > OVERVIEW_MAX_SIZE:
+            self.overview_level -= 1
+        self.overview = None
+        self.overview_lock = threading.Lock()
+
+    # DZI descriptor, see: https://learn.microsoft.com/en-us/previous-versions/windows/silverlight/dotnet-windows-silverlight/cc645077(v=vs.95)
+    def dzi(self) -> str:
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="{}" Overlap="0" TileSize="{}">'
+            '<Size Width="{}" Height="{}"/>'
+            '</Image>'
+        ).format(self.format, self.tile_size, *self.size)
+
+    def level_size(self, level: int) -> tuple[int, int]:
+        scale = 2 ** (self.max_level - level)
+        return (math.ceil(self.size[0] / scale), math.ceil(self.size[1] / scale))
+
+    # encoded tile, as served to the browser
+    def tile_bytes(self, level: int, col: int, row: int) -> bytes:
+        image = self.tile(level, col, row)
+        buffer = io.BytesIO()
+        if self.format == 'jpeg':
+            image.save(buffer, 'JPEG', quality=90)
+        else:
+            image.save(buffer, 'PNG', compress_level=1)
+        return buffer.getvalue()
+
+    def tile(self, level: int, col: int, row: int) -> Image.Image:
+        level_w, level_h = self.level_size(level)
+        x0, y0 = col * self.tile_size, row * self.tile_size
+        if level < 0 or level > self.max_level or x0 >= level_w or y0 >= level_h:
+            raise KeyError('tile {}/{}_{} out of range'.format(level, col, row))
+        box = (
+            x0,
+            y0,
+            min(x0 + self.tile_size, level_w),
+            min(y0 + self.tile_size, level_h),
+        )
+
+        # the locks are only held to access the caches: tiles are rendered concurrently
+        with self.cache_lock:
+            cache = self.tile_caches.setdefault(level, OrderedDict())
+            image = cache.get((col, row))
+            if image is not None:
+                cache.move_to_end((col, row))
+                return image
+
+        if level <= self.overview_level:
+            image = self._overview_tile(level, box)
+        else:
+            image = self._render_scaled(box, 2 ** (self.max_level - level))
+
+        with self.cache_lock:
+            cache = self.tile_caches.setdefault(level, OrderedDict())
+            cache[(col, row)] = image
+            while len(cache) > TILE_CACHE_SIZE:
+                cache.popitem(last=False)
+        return image
+
+    def close(self):
+        if self.cells is not None:
+            self.cells.close()
+        self.cells = None
+        self.canvas = None
+        with self.cache_lock:
+            self.tile_caches = {}
+        self.overview = None
+
+    # tile of a zoomed out level, cut from the overview
+    def _overview_tile(self, level: int, box: tuple[int, int, int, int]) -> Image.Image:
+        with self.overview_lock:
+            if self.overview is None:
+                self.overview = self._render_scaled(
+                    (0, 0, *self.level_size(self.overview_level)),
+                    2 ** (self.max_level - self.overview_level),
+                )
+            overview = self.overview
+        scale = 2 ** (self.overview_level - level)
+        # the last pixels of the level are averaged from what remains of the overview
+        overview_box = (
+            box[0] * scale,
+            box[1] * scale,
+            min(box[2] * scale, overview.size[0]),
+            min(box[3] * scale, overview.size[1]),
+        )
+        return overview.crop(overview_box).reduce(scale)
+
+    # region of the page downscaled by the given factor (box in downscaled coordinates),
+    # rendered at full resolution by blocks, so memory stays bounded
+    def _render_scaled(self, box: tuple[int, int, int, int], scale: int) -> Image.Image:
+        if scale == 1:
+            return self.grid.render_region(self.layout, box, self.cells, self.canvas)
+
+        size = (box[2] - box[0], box[3] - box[1])
+        image = Image.new('RGBA' if self.transparent else 'RGB', size)
+        # block size, in downscaled pixels
+        block = max(1, RENDER_BLOCK_SIZE // scale)
+        for y in range(box[1], box[3], block):
+            for x in range(box[0], box[2], block):
+                x1, y1 = min(x + block, box[2]), min(y + block, box[3])
+                # the last pixels of the level are averaged from what remains of the page
+                full_box = (
+                    x * scale,
+                    y * scale,
+                    min(x1 * scale, self.size[0]),
+                    min(y1 * scale, self.size[1]),
+                )
+                region = self.grid.render_region(
+                    self.layout, full_box, self.cells, self.canvas
+                )
+                image.paste(region.reduce(scale), (x - box[0], y - box[1]))
+        return image
+
+
+# completed pages available as tiles, the oldest ones being released
+tiled_pages = OrderedDict()
+tiled_pages_lock = threading.Lock()
+
+
+def register_tiled_page(page: TiledPage) -> str:
+    page_id = uuid.uuid4().hex
+    with tiled_pages_lock:
+        tiled_pages[page_id] = page
+        while len(tiled_pages) > MAX_TILED_PAGES:
+            _, old_page = tiled_pages.popitem(last=False)
+            old_page.close()
+    return page_id
+
+
+def get_tiled_page(page_id: str) -> TiledPage:
+    with tiled_pages_lock:
+        return tiled_pages.get(page_id)
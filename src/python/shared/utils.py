@@ -1,6 +1,7 @@
 import torch  # type: ignore
 from PIL import Image
 import numpy as np
+import math
 
 
 class AnyType(str):
@@ -10,6 +11,17 @@ class AnyType(str):
 
 ANY_TYPE = AnyType('*')
 
+# optional input of the queue nodes, sent back to the QUEUE_STATUS widget (and auto queue driver) with the progress
+PREFETCH_INPUT = (
+    'INT',
+    {
+        'default': 1,
+        'min': 1,
+        'max': 64,
+        'tooltip': 'nb of prompts queued ahead of the current one: > 1 keeps the GPU busy while the next prompts are validated / set up\npending prompts are removed from the ComfyUI queue on interruption or error',
+    },
+)
+
 
 class AnyReturnTypes(tuple):
     def __getitem__(self, key):
@@ -26,6 +38,34 @@ def pillow_to_tensor(image: Image.Image) -> torch.Tensor:
     return torch.from_numpy(np.array(image).astype(np.float32) / 255.0).unsqueeze(0)
 
 
+# size of an image downscaled (keeping ratio) to fit max dimensions and / or max number of pixels
+# 0 means no limit; images are never upscaled
+def downscaled_size(
+    size: tuple[int, int], max_size: tuple[int, int] = (0, 0), max_pixels: int = 0
+) -> tuple[int, int]:
+    w, h = size
+    scale = 1.0
+    if max_size[0] > 0:
+        scale = min(scale, max_size[0] / w)
+    if max_size[1] > 0:
+        scale = min(scale, max_size[1] / h)
+    if max_pixels > 0:
+        scale = min(scale, math.sqrt(max_pixels / (w * h)))
+    if scale >= 1:
+        return size
+    return (max(1, int(w * scale)), max(1, int(h * scale)))
+
+
+def downscale_image(
+    image: Image.Image, max_size: tuple[int, int] = (0, 0), max_pixels: int = 0
+) -> Image.Image:
+    size = downscaled_size(image.size, max_size, max_pixels)
+    if size == image.size:
+        return image
+    # reducing_gap: fast integer reduction first (Image.reduce), then final resampling
+    return image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+
 def tensor_to_cv(tensor: torch.Tensor):
     # return np.clip(255 * tensor.cpu().numpy().squeeze(), 0, 255).astype(np.uint8)
     return (tensor.numpy().squeeze(0) * 255).astype(np.uint8)  # <- works
@@ -7,10 +7,14 @@ import type { InputSpec } from '~/.d.ts/comfyui-frontend-types_alt.js'
 interface IQueueData {
 	index: number
 	total: number
+	prefetch: number
+	waiting?: number
 }
 interface IQueueMessage {
 	index: [number]
 	total: [number]
+	prefetch?: [number]
+	waiting?: [number]
 }
 function isQueueMessage(message: unknown): message is IQueueMessage {
 	const msg = message as IQueueMessage
@@ -20,16 +24,61 @@ function isQueueMessage(message: unknown): message is IQueueMessage {
 		typeof msg.index[0] === 'number' &&
 		Array.isArray(msg.total) &&
 		msg.total.length === 1 &&
-		typeof msg.total[0] === 'number'
+		typeof msg.total[0] === 'number' &&
+		(msg.prefetch === undefined ||
+			(Array.isArray(msg.prefetch) &&
+				msg.prefetch.length === 1 &&
+				typeof msg.prefetch[0] === 'number')) &&
+		(msg.waiting === undefined ||
+			(Array.isArray(msg.waiting) &&
+				msg.waiting.length === 1 &&
+				typeof msg.waiting[0] === 'number'))
 	)
 }
 function queueMessageToData(message: IQueueMessage): IQueueData {
 	return {
 		index: message.index[0],
 		total: message.total[0],
+		// nb of prompts queued ahead of the current one
+		prefetch: Math.max(1, message.prefetch?.[0] ?? 1),
+		// watch mode: nothing to process yet, delay (in seconds) before queuing the same index again
+		waiting: message.waiting?.[0],
 	}
 }
 
+// prompt ids returned by api.queuePrompt while queuing through queueTracked
+let captured: string[] | undefined = undefined
+let queueHooked = false
+let queueLock = Promise.resolve()
+
+// queue the workflow, returning the ids of the prompts queued: calls are serialized,
+// so the ids of several queue nodes queuing at the same time are not mixed up
+function queueTracked(app: ComfyApp): Promise<string[]> {
+	if (!queueHooked) {
+		queueHooked = true
+		const originalQueuePrompt = api.queuePrompt
+		api.queuePrompt = async function (...args) {
+			const response = await originalQueuePrompt.apply(this, args)
+			captured?.push(response.prompt_id)
+			return response
+		}
+	}
+	const ids = queueLock.then(async () => {
+		captured = []
+		try {
+			await app.queuePrompt(0, 1)
+			return captured
+		} finally {
+			captured = undefined
+		}
+	})
+	queueLock = ids.then(
+		() => {},
+		() => {},
+	)
+	return ids
+}
+
 export function QUEUE_STATUS(
 	node: LGraphNode,
 	inputName: string,
@@ -39,10 +88,75 @@ export function QUEUE_STATUS(
 	if (!app) throw new Error('QUEUE_STATUS: app is undefined')
 	const widget = node.addWidget('button', inputName, 0, () => {})
 
+	// last index queued
+	let queued: number | undefined = undefined
+	// incremented when the run is reset, so a delayed queuing does not apply to another run
+	let run = 0
+	// ids of the prompts queued ahead by this widget, not executed yet
+	const ahead = new Set<string>()
+	// after an interruption or an error, prompts queued ahead which could not be removed may still execute:
+	// they must not resume the run
+	const stale = new Set<string>()
+	let stopping = false
+	// prompt being executed, the node messages belong to it
+	let executingPrompt: string | undefined = undefined
+	api.addEventListener('execution_start', ({ detail }) => {
+		executingPrompt = detail.prompt_id
+	})
 	const reset = () => {
 		// set widget value to a random negative value, to ensure we can restart in any case
 		widget.value = Math.floor(Math.random() * 10e9) * -1
 		widget.total = undefined
+		queued = undefined
+		run += 1
+	}
+
+	// queue the next indexes, up to the given one: prompts are queued one at a time, in order,
+	// as each one takes its index from the widget value
+	let queuing = Promise.resolve()
+	const queueUntil = (last: number) => {
+		queuing = queuing.then(async () => {
+			while (queued !== undefined && queued < last) {
+				queued += 1
+				widget.value = queued
+				for (const id of await queueTracked(app)) ahead.add(id)
+			}
+		})
+	}
+
+	// watch mode: queue the same index again after a delay, unless the run was stopped meanwhile
+	const queueLater = (index: number, delay: number) => {
+		const current = run
+		setTimeout(() => {
+			if (run !== current || queued === undefined) return
+			queuing = queuing.then(async () => {
+				if (run !== current) return
+				widget.value = index
+				for (const id of await queueTracked(app)) ahead.add(id)
+			})
+		}, delay * 1000)
+	}
+
+	// stop the run, and remove the prompts queued ahead by this widget, not started yet
+	// (prompts queued by hand are left in the queue)
+	const stop = async (label: string) => {
+		widget.label = label
+		const running = queued !== undefined
+		reset()
+		if (!running) return
+		stopping = true
+		try {
+			await queuing
+			for (const id of ahead) stale.add(id)
+			ahead.clear()
+			const { Pending } = await api.getQueue()
+			for (const item of Pending) {
+				if (stale.delete(item.prompt[1]))
+					await api.deleteItem('queue', item.prompt[1])
+			}
+		} finally {
+			stopping = false
+		}
 	}
 
 	// set initial value
@@ -61,13 +175,22 @@ export function QUEUE_STATUS(
 		originalOnExecuted?.apply(this, message)
 		if (isQueueMessage(message)) {
 			const data = queueMessageToData(message as IQueueMessage)
-			if (!widget.total) widget.total = data.total
+			// any other prompt starts a new run, whatever its index (resume mode)
+			if (stopping || (executingPrompt && stale.delete(executingPrompt)))
+				return
+			if (executingPrompt) ahead.delete(executingPrompt)
+			// the total may grow during the run (lazy folder index)
+			widget.total = data.total
+			queued = Math.max(queued ?? data.index, data.index)
+			if (data.waiting !== undefined) {
+				widget.label = `Waiting for files: ${data.index} processed`
+				queueLater(data.index, data.waiting)
+				return
+			}
+			widget.label = `Processing: ${data.index + 1} / ${widget.total}`
 			if (data.index < data.total - 1) {
-				widget.value = data.index + 1
-				widget.label = `Processing: ${widget.value} / ${widget.total}`
-				app.queuePrompt(0, 1)
+				queueUntil(Math.min(data.index + data.prefetch, data.total - 1))
 			} else {
-				widget.label = `Processing: ${widget.value + 1} / ${widget.total}`
 				// wait for the execution to end before displaying the "Complete" label; note: the listener will be automatically deleted after use
 				api.addEventListener(
 					'execution_success',
@@ -85,13 +208,9 @@ export function QUEUE_STATUS(
 	const original_api_interrupt = api.interrupt
 	api.interrupt = async function (...args) {
 		await original_api_interrupt.apply(this, ...args)
-		widget.label = 'Interrupted'
-		reset()
+		await stop('Interrupted')
 	}
-	api.addEventListener('execution_error', () => {
-		widget.label = 'Error detected'
-		reset()
-	})
+	api.addEventListener('execution_error', () => stop('Error detected'))
 
 	return widget
 }
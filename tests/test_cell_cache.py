@@ -0,0 +1,99 @@
+import copy
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from src.python.shared.cell_cache import (
+    CellCache,
+    make_cell_key,
+    workflow_fingerprint,
+)
+
+# lists -> XY Plot: Queue -> sampler -> XY Plot: Render, the model loader feeding both the queue and the sampler
+PROMPT = {
+    '1': {'class_type': 'List', 'inputs': {'values': 'a, b'}},
+    '2': {'class_type': 'Loader', 'inputs': {'ckpt_name': 'model.safetensors'}},
+    '3': {
+        'class_type': 'XY Plot: Queue',
+        'inputs': {'dim1': ['1', 0], 'model': ['2', 0], 'index': 0},
+    },
+    '4': {'class_type': 'Sampler', 'inputs': {'model': ['2', 0], 'seed': ['3', 1]}},
+    '5': {
+        'class_type': 'XY Plot: Render',
+        'inputs': {'image': ['4', 0], 'xy_plot_data': ['3', 0]},
+    },
+}
+
+
+def fingerprint(prompt: dict) -> str:
+    return workflow_fingerprint(prompt, '5', 'image', '3')
+
+
+def frame(value: int, size: int = 16) -> np.ndarray:
+    return np.full((size, size, 3), value, dtype=np.uint8)
+
+
+class FingerprintTest(unittest.TestCase):
+    def changed(self, node_id: str, input_name: str, value) -> str:
+        prompt = copy.deepcopy(PROMPT)
+        prompt[node_id]['inputs'][input_name] = value
+        return fingerprint(prompt)
+
+    def test_generation_settings_change_the_fingerprint(self):
+        self.assertNotEqual(self.changed('4', 'model', ['1', 0]), fingerprint(PROMPT))
+        # also feeds the queue, but the image too
+        self.assertNotEqual(
+            self.changed('2', 'ckpt_name', 'other.safetensors'), fingerprint(PROMPT)
+        )
+
+    def test_queue_and_dim_lists_are_left_out(self):
+        self.assertEqual(self.changed('3', 'index', 5), fingerprint(PROMPT))
+        self.assertEqual(self.changed('1', 'values', 'c, d'), fingerprint(PROMPT))
+
+    def test_cell_key(self):
+        key = make_cell_key('fingerprint', 'a', 1)
+        self.assertEqual(key, make_cell_key('fingerprint', 'a', 1))
+        self.assertNotEqual(key, make_cell_key('fingerprint', 'a', 2))
+        self.assertNotEqual(key, make_cell_key('other', 'a', 1))
+
+
+class CellCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp_dir.name, 'cache')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_hit_and_miss(self):
+        cache = CellCache(self.root, 1 << 20)
+        self.assertNotIn('a', cache)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', frame(1))
+        self.assertIn('a', cache)
+        np.testing.assert_array_equal(cache.get('a'), frame(1))
+        # replaced
+        cache.put('a', frame(2))
+        np.testing.assert_array_equal(cache.get('a'), frame(2))
+
+    def test_persisted(self):
+        CellCache(self.root, 1 << 20).put('a', frame(1))
+        np.testing.assert_array_equal(CellCache(self.root, 1 << 20).get('a'), frame(1))
+
+    def test_least_recently_used_evicted(self):
+        cache = CellCache(self.root, 1 << 20)
+        cache.put('a', frame(1))
+        entry_size = cache.size
+        cache.max_size = entry_size * 2
+        cache.put('b', frame(2))
+        cache.get('a')
+        cache.put('c', frame(3))
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.size, entry_size * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
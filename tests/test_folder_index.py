@@ -0,0 +1,119 @@
+# run from the repository root: python -m unittest discover -s tests -t .
+# (the root __init__.py loads the extension into ComfyUI, tests only import the modules they need)
+from pathlib import Path
+import glob
+import os
+import tempfile
+import unittest
+
+from src.python.shared.folder_index import INDEX_MAX_AGE, FolderIndex, FolderWatch
+
+
+# previous scan of File Queue: one glob per pattern
+def glob_scan(root: Path, patterns: str, recursive: bool) -> list[Path]:
+    files = set()
+    for pattern in patterns.split(','):
+        path = root / '**' / pattern.strip() if recursive else root / pattern.strip()
+        for match in glob.glob(str(path), recursive=recursive):
+            if Path(match).is_file():
+                files.add(Path(match))
+    return sorted(files, key=lambda f: [f.parent, f.name])
+
+
+class FolderIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name) / 'root'
+        self.cache_dir = Path(self.tmp_dir.name) / 'index'
+        for rel_dir in ('', 'a', 'a/b', '.hid', '.hid/sub', 'a/.hid', 'sub2'):
+            (self.root / rel_dir).mkdir(parents=True, exist_ok=True)
+            for name in ('x.png', 'y.jpg', '.z.png', 't.txt'):
+                (self.root / rel_dir / name).touch()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_same_files_as_glob(self):
+        for patterns in (
+            '*',
+            '*.png, *.jpg',
+            '.*',
+            'a/*',
+            'sub*/*.txt',
+            '.hid/*',
+            '.hid/*.png',
+            '.hid*/*',
+            '*/.hid/*',
+            '.hid/.*',
+            '**/*.png',
+            'a/**/*.png',
+            '.hid/**',
+        ):
+            for recursive in (True, False):
+                with self.subTest(patterns=patterns, recursive=recursive):
+                    index = FolderIndex(str(self.root), patterns.split(','), recursive)
+                    self.assertEqual(
+                        index.scan(), glob_scan(self.root, patterns, recursive)
+                    )
+
+    def test_hidden_dir_named_by_pattern(self):
+        index = FolderIndex(str(self.root), ['.hid/*.png'], False)
+        self.assertEqual(index.scan(), [self.root / '.hid' / 'x.png'])
+
+    def test_rescan_lists_new_files(self):
+        index = FolderIndex(str(self.root), ['*.png'], True, str(self.cache_dir))
+        self.assertEqual(len(index.scan()), 4)
+        (self.root / 'a' / 'b' / 'new.png').touch()
+        # the persisted listing is reused, except for modified directories
+        index = FolderIndex(str(self.root), ['*.png'], True, str(self.cache_dir))
+        self.assertTrue(index.dirs)
+        self.assertIn(self.root / 'a' / 'b' / 'new.png', index.scan())
+
+    def test_scan_new_only_lists_modified_dirs(self):
+        # directories modified long ago: their listings are trusted
+        old = os.stat(self.root).st_mtime - 3600
+        for path in [self.root, *self.root.rglob('*')]:
+            os.utime(path, (old, old))
+        index = FolderIndex(str(self.root), ['*.png'], True)
+        index.scan()
+        listed = []
+        list_dir = index._list_dir
+        index._list_dir = lambda path, rel_dir: (
+            listed.append(rel_dir) or list_dir(path, rel_dir)
+        )
+        self.assertEqual(index.scan_new(), [])
+        self.assertEqual(listed, [])
+        (self.root / 'a' / 'b' / 'new.png').touch()
+        (self.root / 'c').mkdir()
+        (self.root / 'c' / 'w.png').touch()
+        self.assertEqual(
+            index.scan_new(),
+            [self.root / 'a' / 'b' / 'new.png', self.root / 'c' / 'w.png'],
+        )
+        self.assertEqual(sorted(listed), ['', 'a/b', 'c'])
+
+    def test_watch_appends_new_files(self):
+        watch = FolderWatch(str(self.root), ['*.png'], False)
+        self.assertEqual(watch.files, [self.root / 'x.png'])
+        self.assertEqual(watch.poll(), 0)
+        (self.root / 'w.png').touch()
+        (self.root / 'a.png').touch()
+        self.assertEqual(watch.poll(), 2)
+        # the indexes of the files already listed do not change
+        self.assertEqual(
+            watch.files, [self.root / f for f in ('x.png', 'a.png', 'w.png')]
+        )
+
+    def test_unused_indexes_are_pruned(self):
+        self.cache_dir.mkdir()
+        stale = self.cache_dir / 'stale.json'
+        stale.write_text('{}')
+        old = os.stat(stale).st_mtime - INDEX_MAX_AGE - 1
+        os.utime(stale, (old, old))
+        FolderIndex(str(self.root), ['*'], True, str(self.cache_dir)).scan()
+        self.assertFalse(stale.exists())
+        self.assertEqual(len(list(self.cache_dir.glob('*.json'))), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
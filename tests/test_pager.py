@@ -0,0 +1,122 @@
+import random
+import tempfile
+import unittest
+import torch
+
+from src.python.shared.checkpoint import PlotCheckpoint
+from src.python.shared.pager import Pager
+from src.python.shared.plot_data import (
+    DimData,
+    PlotConfigRenderData,
+    PlotVars,
+    XYPlotQueueData,
+)
+
+DIM1 = ['a', 'b']
+DIM2 = [1, 2, 3]
+
+
+# one prompt of a single page plot, the dim values of the page being known
+def cell_data(dim1_index: int, dim2_index: int, index: int = 0) -> XYPlotQueueData:
+    return XYPlotQueueData(
+        index=index,
+        current_page=0,
+        total_pages=1,
+        complete=False,
+        dim1=DimData(dim1_index, len(DIM1), DIM1[dim1_index], DIM1),
+        dim2=DimData(dim2_index, len(DIM2), DIM2[dim2_index], DIM2),
+        run_id='run',
+        queue_index=index,
+    )
+
+
+# a distinct image per cell, with sizes differing along both dims
+def cell_image(dim1_index: int, dim2_index: int) -> torch.Tensor:
+    generator = torch.Generator().manual_seed(dim1_index * 10 + dim2_index)
+    return torch.rand(1, 8 + dim1_index, 12 + dim2_index, 3, generator=generator)
+
+
+ALL_CELLS = [(d1, d2) for d1 in range(len(DIM1)) for d2 in range(len(DIM2))]
+PLOT_VARS = PlotVars(1, 1)
+
+
+class PagerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def make_pager(self, compositing='deferred', checkpoint=None) -> Pager:
+        return Pager(
+            cell_data(0, 0),
+            ('{dim1}', '{dim2}'),
+            plot_config_render=PlotConfigRenderData(compositing=compositing),
+            checkpoint=checkpoint,
+        )
+
+    def reference_grid(self, compositing: str) -> torch.Tensor:
+        pager = self.make_pager(compositing)
+        for d1, d2 in ALL_CELLS:
+            pager.add(cell_data(d1, d2), cell_image(d1, d2))
+        return pager.make_grid(PLOT_VARS)
+
+    def test_cells_in_any_order(self):
+        for compositing in ('deferred', 'incremental'):
+            with self.subTest(compositing=compositing):
+                pager = self.make_pager(compositing)
+                order = ALL_CELLS[::-1]
+                random.Random(1).shuffle(order)
+                for d1, d2 in order[:-1]:
+                    self.assertFalse(pager.add(cell_data(d1, d2), cell_image(d1, d2)))
+                # a retried prompt replaces its cell, without completing the page
+                d1, d2 = order[0]
+                self.assertFalse(pager.add(cell_data(d1, d2), cell_image(d1, d2)))
+                self.assertEqual(pager.accumulated, len(ALL_CELLS) - 1)
+                d1, d2 = order[-1]
+                self.assertTrue(pager.add(cell_data(d1, d2), cell_image(d1, d2)))
+                self.assertTrue(
+                    torch.equal(
+                        pager.make_grid(PLOT_VARS), self.reference_grid(compositing)
+                    )
+                )
+
+    def test_cell_out_of_page(self):
+        pager = self.make_pager()
+        data = cell_data(0, 2)
+        data.dim2.index = 3
+        with self.assertRaises(Exception):
+            pager.add(data, cell_image(0, 2))
+
+    def test_checkpoint_restore(self):
+        checkpoint = PlotCheckpoint(self.tmp_dir.name, 'run')
+        pager = self.make_pager(checkpoint=checkpoint)
+        for index, (d1, d2) in enumerate(ALL_CELLS[:4]):
+            pager.add(cell_data(d1, d2, index), cell_image(d1, d2))
+        pager.save_checkpoint(4, 'dim1 outer', (0, 0))
+
+        # the interrupted run is resumed by a new pager, from the next prompt
+        resumed = self.make_pager(checkpoint=checkpoint)
+        resumed.restore_checkpoint(cell_data(*ALL_CELLS[4], 4))
+        self.assertEqual(resumed.accumulated, 4)
+        self.assertEqual(resumed.dim1.headers, pager.dim1.headers)
+        for index, (d1, d2) in enumerate(ALL_CELLS[4:], 4):
+            resumed.add(cell_data(d1, d2, index), cell_image(d1, d2))
+        self.assertTrue(resumed.complete)
+        self.assertTrue(
+            torch.equal(resumed.make_grid(PLOT_VARS), self.reference_grid('deferred'))
+        )
+
+    def test_checkpoint_mismatch(self):
+        checkpoint = PlotCheckpoint(self.tmp_dir.name, 'run')
+        pager = self.make_pager(checkpoint=checkpoint)
+        pager.add(cell_data(0, 0), cell_image(0, 0))
+        pager.save_checkpoint(1, 'dim1 outer', (0, 0))
+        with self.assertRaises(Exception):
+            self.make_pager(checkpoint=checkpoint).restore_checkpoint(
+                cell_data(0, 2, 2)
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
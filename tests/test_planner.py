@@ -0,0 +1,98 @@
+import unittest
+
+from src.python.shared.planner import (
+    ORDERS,
+    PlotPlan,
+    SwitchCostEstimator,
+    make_plan,
+)
+
+
+def cells(plan: PlotPlan) -> list[tuple[int, int]]:
+    return [(step.dim1, step.dim2) for step in plan.steps]
+
+
+class PlannerTest(unittest.TestCase):
+    def test_orders(self):
+        expected = {
+            'dim1 outer': [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2)],
+            'dim1 outer, snake': [(0, 0), (0, 1), (0, 2), (1, 2), (1, 1), (1, 0)],
+            'dim2 outer': [(0, 0), (1, 0), (0, 1), (1, 1), (0, 2), (1, 2)],
+            'dim2 outer, snake': [(0, 0), (1, 0), (1, 1), (0, 1), (0, 2), (1, 2)],
+        }
+        for order, order_cells in expected.items():
+            with self.subTest(order=order):
+                self.assertEqual(cells(PlotPlan((2, 3), order=order)), order_cells)
+
+    def test_invalid_order(self):
+        with self.assertRaises(ValueError):
+            PlotPlan((2, 3), order='diagonal')
+
+    def test_each_cell_once_per_page(self):
+        for order in ORDERS:
+            with self.subTest(order=order):
+                plan = PlotPlan((5, 7), (2, 3), 2, order)
+                self.assertEqual(plan.total_pages, (3, 3))
+                self.assertEqual(plan.page_dims((2, 2)), (1, 1))
+                seen = []
+                for step in plan.steps:
+                    for dim2 in range(step.dim2, step.dim2 + step.length):
+                        seen.append((step.dim1, dim2))
+                    # batches never cross a page boundary
+                    offsets = plan.page_offsets(step.page)
+                    dims = plan.page_dims(step.page)
+                    self.assertLessEqual(step.dim2 + step.length, offsets[1] + dims[1])
+                self.assertEqual(
+                    sorted(seen), [(a, b) for a in range(5) for b in range(7)]
+                )
+                # pages are processed one at a time
+                pages = [step.page for step in plan.steps]
+                self.assertEqual(
+                    [p for i, p in enumerate(pages) if i == 0 or pages[i - 1] != p],
+                    sorted(set(pages)),
+                )
+
+    def test_step_index_in_page(self):
+        plan = PlotPlan((2, 5), batch_size=2)
+        self.assertEqual(
+            [(step.dim1, step.dim2, step.length, step.index) for step in plan.steps],
+            [
+                (0, 0, 2, 0),
+                (0, 2, 2, 2),
+                (0, 4, 1, 4),
+                (1, 0, 2, 5),
+                (1, 2, 2, 7),
+                (1, 4, 1, 9),
+            ],
+        )
+
+    def test_auto_order_from_switch_costs(self):
+        # the expensive dim is kept in the outer loop, and the snake saves a switch of the other one per line
+        self.assertEqual(
+            make_plan((3, 4), (0, 0), 1, 'auto', (10, 1)).order, 'dim1 outer, snake'
+        )
+        self.assertEqual(
+            make_plan((3, 4), (0, 0), 1, 'auto', (1, 10)).order, 'dim2 outer, snake'
+        )
+        # unknown costs: the default order
+        self.assertEqual(make_plan((3, 4), (0, 0), 1, 'auto').order, 'dim1 outer')
+
+    def test_plan_cost(self):
+        plan = PlotPlan((2, 3), order='dim1 outer')
+        # first step + 2 dim2 switches per line + 1 line change
+        self.assertEqual(plan.cost((10, 1)), 11 + 4 + 11)
+        snake = PlotPlan((2, 3), order='dim1 outer, snake')
+        self.assertEqual(snake.cost((10, 1)), 11 + 4 + 10)
+
+    def test_switch_cost_estimate(self):
+        estimator = SwitchCostEstimator()
+        for _ in range(3):
+            estimator.record((False, True), 2.0)
+            estimator.record((True, True), 7.0)
+        self.assertEqual(estimator.estimate(), (5.0, 0))
+        self.assertEqual(estimator.cell_time(), 4.5)
+        self.assertEqual(SwitchCostEstimator().estimate(), (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
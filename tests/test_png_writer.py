@@ -0,0 +1,74 @@
+from pathlib import Path
+import tempfile
+import unittest
+from unittest import mock
+from PIL import Image
+import numpy as np
+
+from src.python.shared import png_writer
+from src.python.shared.png_writer import PngWriter
+
+
+class PngWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / 'grid.png'
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    # write the image in bands of the given heights, and read it back
+    def round_trip(self, image: Image.Image, band_heights: list[int]) -> Image.Image:
+        with PngWriter(str(self.path), image.size, image.mode) as writer:
+            top = 0
+            for height in band_heights:
+                writer.write(image.crop((0, top, image.width, top + height)))
+                top += height
+        with Image.open(self.path) as written:
+            written.load()
+            return written
+
+    def test_exact_pixels(self):
+        shapes = {'L': (37, 53), 'RGB': (37, 53, 3), 'RGBA': (37, 53, 4)}
+        for mode, shape in shapes.items():
+            with self.subTest(mode=mode):
+                pixels = self.rng.integers(0, 256, shape, dtype=np.uint8)
+                written = self.round_trip(Image.fromarray(pixels, mode), [1, 20, 16])
+                self.assertEqual(written.mode, mode)
+                np.testing.assert_array_equal(np.asarray(written), pixels)
+
+    def test_bands_converted_to_mode(self):
+        pixels = self.rng.integers(0, 256, (10, 8, 4), dtype=np.uint8)
+        image = Image.fromarray(pixels, 'RGBA')
+        with PngWriter(str(self.path), image.size, 'RGB') as writer:
+            writer.write(image)
+        with Image.open(self.path) as written:
+            np.testing.assert_array_equal(
+                np.asarray(written), np.asarray(image.convert('RGB'))
+            )
+
+    def test_several_idat_chunks(self):
+        pixels = self.rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        with mock.patch.object(png_writer, 'IDAT_MAX_SIZE', 1000):
+            written = self.round_trip(Image.fromarray(pixels), [16] * 4)
+        np.testing.assert_array_equal(np.asarray(written), pixels)
+        self.assertGreater(self.path.read_bytes().count(b'IDAT'), 10)
+
+    def test_wrong_band_width(self):
+        with self.assertRaises(ValueError):
+            with PngWriter(str(self.path), (8, 8)) as writer:
+                writer.write(Image.new('RGB', (4, 8)))
+        # no truncated file left behind
+        self.assertFalse(self.path.exists())
+
+    def test_missing_rows(self):
+        writer = PngWriter(str(self.path), (8, 8))
+        writer.write(Image.new('RGB', (8, 4)))
+        with self.assertRaises(ValueError):
+            writer.close()
+        writer.file.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import tempfile
+import unittest
+from unittest import mock
+from PIL import Image
+
+from src.python.shared import shard_store
+from src.python.shared.shard_store import ShardStore
+
+
+def put_cells(store: ShardStore, page: int, count: int):
+    for i in range(count):
+        store.put_cell(page, 0, i, Image.new('RGB', (4, 4), (i, 0, 0)))
+
+
+class ShardStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    # the stores of 2 workers, in the same session
+    def join(self) -> tuple[ShardStore, ShardStore]:
+        first = ShardStore(self.root, 'run')
+        second = ShardStore(self.root, 'run')
+        session = first.join(1, True)
+        self.assertEqual(second.join(2, True), session)
+        return first, second
+
+    def test_plan_of_first_worker(self):
+        first, second = self.join()
+        self.assertEqual(
+            first.agree_plan({'order': 'dim1 outer'}), {'order': 'dim1 outer'}
+        )
+        self.assertEqual(
+            second.agree_plan({'order': 'dim2 outer'}), {'order': 'dim1 outer'}
+        )
+
+    def test_single_claim_once_complete(self):
+        first, second = self.join()
+        put_cells(first, 0, 2)
+        self.assertFalse(first.claim_page(0, 3, 1))
+        put_cells(second, 0, 3)
+        self.assertEqual(sorted(second.cells(0)), [(0, 0), (0, 1), (0, 2)])
+        self.assertTrue(second.claim_page(0, 3, 2))
+        self.assertFalse(first.claim_page(0, 3, 1))
+        self.assertFalse(second.claim_page(0, 3, 2))
+        # rendering failed: the page can be claimed again
+        second.release_page(0)
+        self.assertTrue(first.claim_page(0, 3, 1))
+
+    def test_claim_retaken_by_restarted_worker(self):
+        first, second = self.join()
+        put_cells(first, 0, 1)
+        self.assertTrue(first.claim_page(0, 1, 1))
+        # the same worker, from a new process (the previous one never finished the page)
+        with mock.patch.object(shard_store, 'PROCESS_TOKEN', 'restarted'):
+            self.assertFalse(second.claim_page(0, 1, 2))
+            self.assertTrue(first.claim_page(0, 1, 1))
+
+    def test_finished_run_removed(self):
+        first, second = self.join()
+        put_cells(first, 0, 1)
+        put_cells(second, 1, 1)
+        first.finish_page(0, 2)
+        self.assertTrue(first.dir.is_dir())
+        second.finish_page(1, 2)
+        self.assertFalse(first.run_dir.exists())
+
+    def test_restart_starts_new_session(self):
+        first, second = self.join()
+        session = first.session
+        # the first worker starts the run again: the other one must restart too
+        self.assertNotEqual(first.join(1, True), session)
+        with self.assertRaises(Exception):
+            put_cells(second, 0, 1)
+        self.assertEqual(second.join(2, True), first.session)
+        put_cells(second, 0, 1)
+        self.assertEqual(first.cells(0), [(0, 0)])
+        # a worker joining without restarting continues the current session
+        self.assertEqual(ShardStore(self.root, 'run').join(3, False), first.session)
+
+
+if __name__ == '__main__':
+    unittest.main()